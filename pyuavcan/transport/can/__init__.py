@@ -49,9 +49,12 @@ from ._can import CANTransport as CANTransport
 
 from ._session import CANInputSession as CANInputSession
 from ._session import CANOutputSession as CANOutputSession
+from ._session import FrameQueuePolicy as FrameQueuePolicy
 
 # Statistics.
 from ._can import CANTransportStatistics as CANTransportStatistics
+from ._can import CANTransmissionQueueLatency as CANTransmissionQueueLatency
+from ._can import CANTrafficCounters as CANTrafficCounters
 
 from ._session import CANInputSessionStatistics as CANInputSessionStatistics
 from ._session import TransferReassemblyErrorID as TransferReassemblyErrorID
@@ -0,0 +1,193 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from __future__ import annotations
+import typing
+import numpy
+from .media import FrameFormat
+
+
+class SlidingWindowCounter:
+    """
+    Approximates the sum of the values added during the last window using two fixed buckets:
+    the value accumulated in the current bucket plus the previous bucket weighted by its overlap with the window.
+    This is the usual approach in rate limiters; the memory and time complexity are constant regardless of the rate.
+    """
+
+    def __init__(self, window_ns: int) -> None:
+        if window_ns <= 0:
+            raise ValueError(f'Invalid window: {window_ns} ns')
+        self._window_ns = int(window_ns)
+        self._start_ns = 0
+        self._current = 0.0
+        self._previous = 0.0
+
+    @property
+    def window_ns(self) -> int:
+        return self._window_ns
+
+    def add(self, value: float, monotonic_ns: int) -> None:
+        self._roll(monotonic_ns)
+        self._current += value
+
+    def sample(self, monotonic_ns: int) -> float:
+        """
+        The estimated sum of the values added during the window that ends at the specified time.
+        """
+        self._roll(monotonic_ns)
+        overlap = 1.0 - (monotonic_ns - self._start_ns) / self._window_ns
+        return self._current + self._previous * overlap
+
+    def _roll(self, monotonic_ns: int) -> None:
+        elapsed = monotonic_ns - self._start_ns
+        if elapsed >= self._window_ns:
+            self._previous = self._current if elapsed < self._window_ns * 2 else 0.0
+            self._current = 0.0
+            self._start_ns = monotonic_ns - elapsed % self._window_ns
+
+
+class BusLoadEstimator:
+    """
+    Estimates the bus utilization from the lengths of the observed frames.
+    The length of a frame is computed assuming the worst-case bit stuffing, so the estimate is conservative
+    (it may slightly exceed the true utilization, and under saturation it may exceed 1).
+    For CAN FD frames, the data phase is assumed to be transmitted at the data bit rate.
+    Only the frames that reach the transport are accounted for; those rejected by the acceptance filters of the
+    media are invisible, so on a bus that carries much irrelevant traffic the estimate is a lower bound.
+    """
+
+    def __init__(self,
+                 nominal_bit_rate: int,
+                 data_bit_rate:    int,
+                 fd:               bool,
+                 windows:          typing.Sequence[float]) -> None:
+        if nominal_bit_rate <= 0 or data_bit_rate <= 0:
+            raise ValueError(f'Invalid bit rate: {nominal_bit_rate}/{data_bit_rate}')
+        self._bit_rates = int(nominal_bit_rate), int(data_bit_rate)
+        self._windows = [float(w) for w in windows]
+        self._counters = [SlidingWindowCounter(round(w * 1e9)) for w in self._windows]
+        self._duration_table = [0] * CODE_TABLE_SIZE
+        for length in range(MAX_DATA_LENGTH + 1):
+            for fmt in FrameFormat:
+                nominal_bits, data_bits = estimate_frame_length_bits(fmt, length, fd)
+                self._duration_table[encode_frame(fmt, length)] = \
+                    round(nominal_bits * 1e9 / nominal_bit_rate + data_bits * 1e9 / data_bit_rate)
+        self._duration_array = numpy.array(self._duration_table, dtype=numpy.int64)
+
+    @property
+    def bit_rates(self) -> typing.Tuple[int, int]:
+        return self._bit_rates
+
+    @property
+    def duration_array(self) -> numpy.ndarray:
+        """
+        Frame duration [nanosecond] indexed by :func:`encode_frame`; used for vectorized batch processing.
+        """
+        return self._duration_array
+
+    def get_frame_duration_ns(self, fmt: FrameFormat, data_length: int) -> int:
+        return self._duration_table[encode_frame(fmt, data_length)]
+
+    def add(self, busy_ns: int, monotonic_ns: int) -> None:
+        for c in self._counters:
+            c.add(busy_ns, monotonic_ns)
+
+    def sample(self, monotonic_ns: int) -> typing.Dict[float, float]:
+        """
+        Bus utilization (1.0 means 100%) keyed by the window duration [second].
+        """
+        return {w: c.sample(monotonic_ns) / c.window_ns for w, c in zip(self._windows, self._counters)}
+
+
+MAX_DATA_LENGTH = 64
+
+CODE_TABLE_SIZE = 256
+
+_EXTENDED_CODE_OFFSET = 128
+
+
+def encode_frame(fmt: FrameFormat, data_length: int) -> int:
+    """
+    Packs the frame format and the data length into a small integer used for indexing the duration tables.
+    """
+    return data_length + (_EXTENDED_CODE_OFFSET if fmt == FrameFormat.EXTENDED else 0)
+
+
+def get_encoded_data_length(code: numpy.ndarray) -> numpy.ndarray:
+    return code & (_EXTENDED_CODE_OFFSET - 1)
+
+
+def estimate_frame_length_bits(fmt: FrameFormat, data_length: int, fd: bool) -> typing.Tuple[int, int]:
+    """
+    Returns the number of bits transmitted at the nominal bit rate and at the data bit rate, respectively,
+    including the interframe space and the worst-case number of stuff bits.
+    For Classic CAN frames, the second value is always zero.
+    """
+    extended = fmt == FrameFormat.EXTENDED
+    if not fd:
+        # SOF through the end of the CRC sequence are subject to stuffing.
+        stuffable = (54 if extended else 34) + data_length * 8
+        overhead = 67 if extended else 47
+        return overhead + data_length * 8 + (stuffable - 1) // 4, 0
+
+    # Arbitration phase: SOF, ID (plus SRR, IDE, and the ID extension for extended frames), RRS, FDF, res, BRS.
+    arbitration = 36 if extended else 17
+    # Data phase: ESI, DLC, data; then the stuff count and the CRC followed by its delimiter.
+    data = 5 + data_length * 8
+    crc = 17 if data_length <= 16 else 21
+    arbitration_stuff = arbitration // 4
+    data_stuff = (arbitration + data - 1) // 4 - arbitration_stuff
+    fixed_stuff = (4 + crc + 3) // 4
+    trailer = 12                        # ACK, ACK delimiter, EOF, IFS.
+    return arbitration + arbitration_stuff + trailer, data + data_stuff + 4 + crc + fixed_stuff + 1
+
+
+def _unittest_can_bus_load_frame_length() -> None:
+    # Classic CAN: 8 data bytes take 111/131 bits without stuffing; worst case adds 24/29 stuff bits.
+    assert estimate_frame_length_bits(FrameFormat.BASE, 8, False) == (111 + 24, 0)
+    assert estimate_frame_length_bits(FrameFormat.EXTENDED, 8, False) == (131 + 29, 0)
+    assert estimate_frame_length_bits(FrameFormat.EXTENDED, 0, False) == (67 + 13, 0)
+
+    nominal, data = estimate_frame_length_bits(FrameFormat.EXTENDED, 64, True)
+    assert nominal == 36 + 9 + 12
+    assert data == 5 + 512 + (36 + 517 - 1) // 4 - 9 + 4 + 21 + 7 + 1
+    nominal_short, data_short = estimate_frame_length_bits(FrameFormat.EXTENDED, 16, True)
+    assert nominal_short == nominal and data_short < data
+
+    est = BusLoadEstimator(1_000_000, 4_000_000, True, [1.0])
+    assert est.bit_rates == (1_000_000, 4_000_000)
+    assert est.get_frame_duration_ns(FrameFormat.EXTENDED, 64) == round(nominal * 1e3 + data * 250)
+    assert est.duration_array[encode_frame(FrameFormat.EXTENDED, 64)] == est.get_frame_duration_ns(
+        FrameFormat.EXTENDED, 64)
+    assert get_encoded_data_length(numpy.array([encode_frame(FrameFormat.EXTENDED, 12),
+                                                encode_frame(FrameFormat.BASE, 64)])).tolist() == [12, 64]
+
+
+def _unittest_can_bus_load_sliding_window() -> None:
+    from pytest import approx, raises
+
+    with raises(ValueError):
+        SlidingWindowCounter(0)
+    sec = 1_000_000_000
+    c = SlidingWindowCounter(sec)
+    assert c.sample(100 * sec) == 0
+    c.add(10, 100 * sec)
+    c.add(10, 100 * sec + sec // 2)
+    assert c.sample(100 * sec + sec // 2) == approx(20)
+    assert c.sample(101 * sec) == approx(20)                # The previous bucket fully overlaps with the window.
+    assert c.sample(101 * sec + sec // 4) == approx(15)     # Three quarters of it overlap.
+    c.add(4, 101 * sec + sec // 2)
+    assert c.sample(101 * sec + sec // 2) == approx(14)
+    assert c.sample(103 * sec) == 0                         # Everything is outdated.
+
+    est = BusLoadEstimator(1_000_000, 1_000_000, False, [1.0, 10.0])
+    duration = est.get_frame_duration_ns(FrameFormat.EXTENDED, 8)
+    assert duration == 160_000
+    for i in range(5000):     # 5000 frames in one second is 80% utilization.
+        est.add(duration, 200 * sec + i * 200_000)
+    assert est.sample(201 * sec) == {1.0: approx(0.8), 10.0: approx(0.08)}
+    with raises(ValueError):
+        BusLoadEstimator(0, 1, False, [1.0])
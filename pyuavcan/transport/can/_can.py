@@ -6,22 +6,56 @@
 
 from __future__ import annotations
 import copy
+import time
 import typing
 import asyncio
 import logging
+import functools
+import contextlib
 import dataclasses
+import numpy
 import pyuavcan.transport
 from .media import Media, TimestampedDataFrame, optimize_filter_configurations, FilterConfiguration
+from .media import DataFrame, FrameFormat
 from ._session import CANInputSession, CANOutputSession
 from ._session import BroadcastCANOutputSession, UnicastCANOutputSession
 from ._frame import UAVCANFrame, TimestampedUAVCANFrame, TRANSFER_ID_MODULO
 from ._identifier import CANID, generate_filter_configurations
 from ._input_dispatch_table import InputDispatchTable
+from ._transmission_scheduler import TransmissionScheduler
+from ._bus_load import BusLoadEstimator, SlidingWindowCounter, encode_frame, get_encoded_data_length
 
 
 _logger = logging.getLogger(__name__)
 
 
+@dataclasses.dataclass
+class CANTransmissionQueueLatency:
+    """
+    The time a transfer spends in the transmission queue before its first frame is handed over to the media [second].
+    """
+    transfers: int = 0          #: Number of transfers that have reached the media.
+    total:     float = 0.0      #: Sum of the queueing latencies of the above.
+    max:       float = 0.0      #: Worst observed queueing latency.
+
+    @property
+    def mean(self) -> float:
+        return (self.total / self.transfers) if self.transfers > 0 else 0.0
+
+
+@dataclasses.dataclass
+class CANTrafficCounters:
+    """
+    Traffic observed on the bus for one data specifier, both received and transmitted by the local node.
+    The byte counts include the tail byte and the padding.
+    The rates are averaged over the last second.
+    """
+    frames:     int = 0             #: Number of frames.
+    bytes:      int = 0             #: Number of bytes in the data field of the above.
+    frame_rate: float = 0.0         #: Frames per second.
+    byte_rate:  float = 0.0         #: Bytes per second.
+
+
 @dataclasses.dataclass
 class CANTransportStatistics(pyuavcan.transport.TransportStatistics):
     """
@@ -41,6 +75,31 @@ class CANTransportStatistics(pyuavcan.transport.TransportStatistics):
     out_frames_timeout:  int = 0        #: Number of frames that were supposed to be sent but timed out.
     out_frames_loopback: int = 0        #: Number of sent frames that we requested loopback for.
 
+    out_queue_latency: typing.Dict[pyuavcan.transport.Priority, CANTransmissionQueueLatency] = \
+        dataclasses.field(default_factory=lambda: {p: CANTransmissionQueueLatency()
+                                                   for p in pyuavcan.transport.Priority},
+                          compare=False)
+    """
+    Per-priority transmission queue latency. Not compared because it is not deterministic.
+    Frames are handed over to the media in the order of their CAN ID values, so under load the
+    lower priority levels are expected to show higher latencies.
+    """
+
+    bus_utilization: typing.Dict[float, float] = dataclasses.field(default_factory=dict, compare=False)
+    """
+    Estimated bus utilization (1.0 means 100%) keyed by the duration of the averaging window [second].
+    Empty unless the bit rate is configured; see :attr:`CANTransport.bit_rate`. Not compared because it is time-based.
+    """
+
+    traffic: typing.Dict[pyuavcan.transport.DataSpecifier, CANTrafficCounters] = \
+        dataclasses.field(default_factory=dict, compare=False)
+    """
+    Per-data-specifier traffic counters; only the data specifiers that have been observed are listed.
+    Empty unless enabled; see :attr:`CANTransport.traffic_accounting`.
+    Loopback frames are not counted twice. Not compared because the rates are time-based.
+    This table helps one to find out which subjects and services are responsible for the bus load.
+    """
+
     @property
     def media_acceptance_filtering_efficiency(self) -> float:
         """
@@ -80,8 +139,8 @@ class CANTransport(pyuavcan.transport.Transport):
         """
         self._maybe_media: typing.Optional[Media] = media
         self._local_node_id = int(local_node_id) if local_node_id is not None else None
-        self._media_lock = asyncio.Lock(loop=loop)
         self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._tx_scheduler = TransmissionScheduler(self._loop)
 
         # Lookup performance for the output registry is not important because it's only used for loopback frames.
         # Hence we don't trade-off memory for speed here.
@@ -89,10 +148,16 @@ class CANTransport(pyuavcan.transport.Transport):
 
         # Input lookup must be fast, so we use constant-complexity static lookup table.
         self._input_dispatch_table = InputDispatchTable()
+        # Used by the batch reception pipeline. Invalidated whenever the set of input sessions is changed.
+        self._route_cache: typing.Dict[int, _Route] = {}
 
         self._last_filter_configuration_set: typing.Optional[typing.Sequence[FilterConfiguration]] = None
+        self._reconfiguration_batch_depth = 0
+        self._reconfiguration_pending = False
 
         self._frame_stats = CANTransportStatistics()
+        self._maybe_traffic: typing.Optional[typing.Dict[pyuavcan.transport.DataSpecifier, _TrafficAccumulator]] = None
+        self._maybe_bus_load_estimator: typing.Optional[BusLoadEstimator] = None
 
         if self._local_node_id is not None and not (0 <= self._local_node_id <= CANID.NODE_ID_MASK):
             raise ValueError(f'Invalid node ID for CAN: {self._local_node_id}')
@@ -102,6 +167,7 @@ class CANTransport(pyuavcan.transport.Transport):
                 f'The MTU value {media.mtu} is not a member of {Media.VALID_MTU_SET}')
         self._mtu = media.mtu - 1
         assert self._mtu > 0
+        self._fd = media.mtu > 8
 
         if media.number_of_acceptance_filters < 1:
             raise pyuavcan.transport.InvalidMediaConfigurationError(
@@ -161,7 +227,79 @@ class CANTransport(pyuavcan.transport.Transport):
             media.close()
 
     def sample_statistics(self) -> CANTransportStatistics:
-        return copy.copy(self._frame_stats)
+        out = copy.deepcopy(self._frame_stats)
+        now = time.monotonic_ns()
+        if self._maybe_bus_load_estimator is not None:
+            out.bus_utilization = self._maybe_bus_load_estimator.sample(now)
+        if self._maybe_traffic is not None:
+            out.traffic = {ds: acc.sample(now) for ds, acc in self._maybe_traffic.items()}
+        return out
+
+    @property
+    def bit_rate(self) -> typing.Optional[typing.Tuple[int, int]]:
+        """
+        The nominal (arbitration phase) and the data phase bit rates of the bus [bit/second];
+        for Classic CAN, both should be the same.
+        The transport cannot obtain this information from the media, so it has to be provided by the application
+        to enable the bus utilization estimation reported via :meth:`sample_statistics`.
+        None (default) disables the estimation. Changing the value resets the estimation.
+
+        The estimate is computed from the lengths of the frames observed by the transport, including the frames
+        it transmits itself, assuming the worst-case bit stuffing. It is averaged over several sliding windows
+        (1, 10, and 60 seconds). Frames rejected by the acceptance filters of the media are not observed,
+        so the estimate does not account for the traffic the local node is not subscribed to.
+        """
+        est = self._maybe_bus_load_estimator
+        return est.bit_rates if est is not None else None
+
+    @bit_rate.setter
+    def bit_rate(self, value: typing.Optional[typing.Tuple[int, int]]) -> None:
+        if value is None:
+            self._maybe_bus_load_estimator = None
+        else:
+            nominal, data = value
+            self._maybe_bus_load_estimator = BusLoadEstimator(nominal, data, self._fd, _BUS_LOAD_WINDOWS)
+
+    @property
+    def traffic_accounting(self) -> bool:
+        """
+        Whether the per-data-specifier traffic counters are maintained and reported via :meth:`sample_statistics`.
+        The accounting costs a few operations per frame, so it is disabled by default.
+        Disabling it discards the counters; enabling it starts counting from zero.
+        """
+        return self._maybe_traffic is not None
+
+    @traffic_accounting.setter
+    def traffic_accounting(self, value: bool) -> None:
+        if not value:
+            self._maybe_traffic = None
+        elif self._maybe_traffic is None:
+            self._maybe_traffic = {}
+
+    @contextlib.contextmanager
+    def batch_reconfiguration(self) -> typing.Iterator[None]:
+        """
+        Defers the reconfiguration of the hardware acceptance filters until the end of the context.
+        Use this when creating or destroying many input sessions at once, e.g., when an application subscribes
+        to a large set of subjects at startup; otherwise, the new filter configuration is computed and deployed
+        on the CAN controller after every change::
+
+            with transport.batch_reconfiguration():
+                for subject_id in subject_ids:
+                    transport.get_input_session(...)
+
+        Frames that would be accepted by the new configuration may be dropped by the CAN controller until
+        the context is exited. The contexts can be nested; the filters are reconfigured once when
+        the outermost one is exited, even if it is exited because of an exception.
+        """
+        self._reconfiguration_batch_depth += 1
+        try:
+            yield
+        finally:
+            self._reconfiguration_batch_depth -= 1
+            assert self._reconfiguration_batch_depth >= 0
+            if self._reconfiguration_batch_depth == 0 and self._reconfiguration_pending:
+                self._reconfigure_acceptance_filters()
 
     def get_input_session(self,
                           specifier:        pyuavcan.transport.InputSessionSpecifier,
@@ -170,12 +308,14 @@ class CANTransport(pyuavcan.transport.Transport):
         See the base class docs for background.
         Whenever an input session is created or destroyed, the hardware acceptance filters are reconfigured
         automatically; computation of a new configuration and its deployment on the CAN controller may be slow.
+        Use :meth:`batch_reconfiguration` to perform the reconfiguration once when creating many sessions.
         """
         if self._maybe_media is None:
             raise pyuavcan.transport.ResourceClosedError(f'{self} is closed')
 
         def finalizer() -> None:
             self._input_dispatch_table.remove(specifier)
+            self._route_cache.clear()
             self._reconfigure_acceptance_filters()
 
         session = self._input_dispatch_table.get(specifier)
@@ -185,6 +325,7 @@ class CANTransport(pyuavcan.transport.Transport):
                                       loop=self._loop,
                                       finalizer=finalizer)
             self._input_dispatch_table.add(session)
+            self._route_cache.clear()
             self._reconfigure_acceptance_filters()
         return session
 
@@ -225,39 +366,72 @@ class CANTransport(pyuavcan.transport.Transport):
     async def _do_send_until(self, frames: typing.Iterable[UAVCANFrame], monotonic_deadline: float) -> bool:
         """
         All frames shall share the same CAN ID value.
+        The frames are handed over to the media in chunks; between the chunks, the media may be relinquished to
+        a pending transfer with a higher priority. This limits priority inversion inside the transport to
+        the duration of one chunk rather than one transfer.
         """
         frames_list = list(frames)
         del frames
-        async with self._media_lock:
-            if self._maybe_media is None:
-                raise pyuavcan.transport.ResourceClosedError(f'{self} is closed')
-            else:
-                num_sent = await self._maybe_media.send_until((x.compile() for x in frames_list), monotonic_deadline)
-            assert 0 <= num_sent <= len(frames_list), 'Media sub-layer API contract violation'
-            sent_frames, unsent_frames = frames_list[:num_sent], frames_list[num_sent:]
-
-            self._frame_stats.out_frames += len(sent_frames)
-            self._frame_stats.out_frames_timeout += len(unsent_frames)
-            self._frame_stats.out_frames_loopback += sum(1 for f in sent_frames if f.loopback)
-
+        can_id_int = frames_list[0].identifier
+        key = self._tx_scheduler.make_key(can_id_int)
+        enqueued_at = self._loop.time()
+        num_sent = 0
+        timed_out = False
+        while not timed_out and num_sent < len(frames_list):
+            if not await self._tx_scheduler.acquire(key, monotonic_deadline):
+                break
+            try:
+                if num_sent == 0:
+                    latency = self._frame_stats.out_queue_latency[pyuavcan.transport.Priority(can_id_int >> 26)]
+                    latency.transfers += 1
+                    latency.total += self._loop.time() - enqueued_at
+                    latency.max = max(latency.max, self._loop.time() - enqueued_at)
+
+                while True:
+                    if self._maybe_media is None:
+                        raise pyuavcan.transport.ResourceClosedError(f'{self} is closed')
+                    chunk = frames_list[num_sent:num_sent + _TX_PREEMPTION_GRANULARITY]
+                    compiled = [x.compile() for x in chunk]
+                    num_sent_chunk = await self._maybe_media.send_until(compiled, monotonic_deadline)
+                    assert 0 <= num_sent_chunk <= len(chunk), 'Media sub-layer API contract violation'
+                    self._account_transmission(compiled[:num_sent_chunk])
+                    num_sent += num_sent_chunk
+                    self._frame_stats.out_frames += num_sent_chunk
+                    self._frame_stats.out_frames_loopback += sum(1 for f in chunk[:num_sent_chunk] if f.loopback)
+                    timed_out = num_sent_chunk < len(chunk)
+                    if timed_out or num_sent >= len(frames_list) or self._tx_scheduler.is_preempted(key):
+                        break
+            finally:
+                self._tx_scheduler.release()
+
+        unsent_frames = frames_list[num_sent:]
+        self._frame_stats.out_frames_timeout += len(unsent_frames)
         if unsent_frames:
-            can_id_int_set = set(f.identifier for f in unsent_frames)
-            assert len(can_id_int_set) == 1, 'CAN transport layer internal contract violation'
-            can_id_int, = can_id_int_set
-            _logger.info('% frames of %d total with CAN ID 0x%08x could not be sent before the deadline',
-                         len(unsent_frames), num_sent, can_id_int)
+            assert all(f.identifier == can_id_int for f in unsent_frames), \
+                'CAN transport layer internal contract violation'
+            _logger.info('%d frames of %d total with CAN ID 0x%08x could not be sent before the deadline',
+                         len(unsent_frames), len(frames_list), can_id_int)
 
         return not unsent_frames
 
     def _on_frames_received(self, frames: typing.Iterable[TimestampedDataFrame]) -> None:
-        for raw_frame in frames:
+        batch = frames if isinstance(frames, list) else list(frames)
+        if len(batch) >= _BATCH_PARSING_THRESHOLD:
+            self._on_frame_batch_received(batch)
+        else:
+            self._on_frames_received_one_by_one(batch)
+
+    def _on_frames_received_one_by_one(self, raw_frames: typing.Sequence[TimestampedDataFrame]) -> None:
+        now = time.monotonic_ns()
+        for raw_frame in raw_frames:
             try:
+                cid = _parse_can_id(raw_frame.identifier)
                 if raw_frame.loopback:
                     self._frame_stats.in_frames_loopback += 1
                 else:
                     self._frame_stats.in_frames += 1
-
-                cid = CANID.parse(raw_frame.identifier)
+                    if self._maybe_traffic is not None or self._maybe_bus_load_estimator is not None:
+                        self._account_reception(raw_frame, cid, now)
                 if cid is not None:                                             # Ignore non-UAVCAN CAN frames
                     ufr = TimestampedUAVCANFrame.parse(raw_frame)
                     if ufr is not None:                                         # Ignore non-UAVCAN CAN frames
@@ -266,32 +440,163 @@ class CANTransport(pyuavcan.transport.Transport):
                 self._frame_stats.in_frames_errored += 1
                 _logger.exception(f'Unhandled exception while processing input CAN frame {raw_frame}: {ex}')
 
-    def _handle_any_frame(self, can_id: CANID, frame: TimestampedUAVCANFrame) -> None:
+    def _on_frame_batch_received(self, raw_frames: typing.Sequence[TimestampedDataFrame]) -> None:
+        """
+        Equivalent to the per-frame processing, but the tail bytes are decoded for the whole batch at once,
+        and the CAN ID parsing and the dispatch table lookups are done once per distinct CAN ID value rather than
+        once per frame. The accepted frames are grouped by destination session and each group is pushed at once;
+        the order of frames within each session is preserved.
+        If the vectorized stage fails, the batch is processed frame by frame so that the errors are contained
+        and accounted for per frame rather than losing the whole batch.
+        """
+        try:
+            identifiers = numpy.fromiter((f.identifier for f in raw_frames),
+                                         dtype=numpy.uint32,
+                                         count=len(raw_frames))
+            unique_identifiers, route_indexes = numpy.unique(identifiers, return_inverse=True)
+            route_cache = self._route_cache
+            routes = [route_cache.get(x) or self._route_can_id(x) for x in unique_identifiers.tolist()]
+            parsed_frames = TimestampedUAVCANFrame.parse_batch(raw_frames)
+        except Exception as ex:
+            _logger.exception(f'Could not process a batch of {len(raw_frames)} input CAN frames at once, '
+                              f'falling back to per-frame processing: {ex}')
+            self._on_frames_received_one_by_one(raw_frames)
+            return
+
+        groups: typing.Dict[CANInputSession, typing.List[typing.Tuple[CANID, TimestampedUAVCANFrame]]] = {}
+        stats = self._frame_stats
+        for raw_frame, ufr, route_index in zip(raw_frames, parsed_frames, route_indexes.tolist()):
+            if raw_frame.loopback:
+                stats.in_frames_loopback += 1
+            else:
+                stats.in_frames += 1
+            parsed, sessions = routes[route_index]
+            if parsed is None or ufr is None:                                   # Ignore non-UAVCAN CAN frames
+                continue
+            if ufr.loopback:
+                try:
+                    self._handle_loopback_frame(parsed.can_id, ufr)
+                except Exception as ex:  # pragma: no cover
+                    stats.in_frames_errored += 1
+                    _logger.exception(f'Unhandled exception while processing input CAN frame {raw_frame}: {ex}')
+                continue
+            stats.in_frames_uavcan += 1
+            if sessions:
+                stats.in_frames_uavcan_accepted += 1
+                for session in sessions:
+                    try:
+                        groups[session].append((parsed.can_id, ufr))
+                    except KeyError:
+                        groups[session] = [(parsed.can_id, ufr)]
+
+        for session, items in groups.items():
+            try:
+                # noinspection PyProtectedMember
+                session._push_frames(items)
+            except Exception as ex:  # pragma: no cover
+                stats.in_frames_errored += len(items)
+                _logger.exception(f'Unhandled exception while pushing {len(items)} frames into {session}: {ex}')
+
+        try:
+            if self._maybe_traffic is not None or self._maybe_bus_load_estimator is not None:
+                self._account_batch_reception(raw_frames, routes, route_indexes)
+        except Exception as ex:  # pragma: no cover
+            _logger.exception(f'Could not account for a batch of {len(raw_frames)} input CAN frames: {ex}')
+
+    @staticmethod
+    def _get_traffic_accumulator(traffic:        typing.Dict[pyuavcan.transport.DataSpecifier, _TrafficAccumulator],
+                                 data_specifier: pyuavcan.transport.DataSpecifier) -> _TrafficAccumulator:
+        try:
+            return traffic[data_specifier]
+        except KeyError:
+            acc = traffic[data_specifier] = _TrafficAccumulator()
+            return acc
+
+    def _account_transmission(self, frames: typing.Sequence[DataFrame]) -> None:
+        traffic = self._maybe_traffic
+        if not frames or (traffic is None and self._maybe_bus_load_estimator is None):
+            return
+        now = time.monotonic_ns()
+        if traffic is not None:
+            parsed = _parse_can_id(frames[0].identifier)
+            if parsed is not None:
+                self._get_traffic_accumulator(traffic, parsed.can_id.data_specifier) \
+                    .add(len(frames), sum(len(f.data) for f in frames), now)
+        est = self._maybe_bus_load_estimator
+        if est is not None:
+            est.add(sum(est.get_frame_duration_ns(f.format, len(f.data)) for f in frames), now)
+
+    def _account_reception(self, frame: TimestampedDataFrame, parsed: typing.Optional[_ParsedCANID], now: int) -> None:
+        traffic = self._maybe_traffic
+        if traffic is not None and parsed is not None:
+            self._get_traffic_accumulator(traffic, parsed.can_id.data_specifier).add(1, len(frame.data), now)
+        est = self._maybe_bus_load_estimator
+        if est is not None:
+            est.add(est.get_frame_duration_ns(frame.format, len(frame.data)), now)
+
+    def _account_batch_reception(self,
+                                 raw_frames:    typing.Sequence[TimestampedDataFrame],
+                                 routes:        typing.Sequence[_Route],
+                                 route_indexes: numpy.ndarray) -> None:
+        """
+        Loopback frames are excluded because they are accounted for when transmitted.
+        The counters are updated once per distinct CAN ID value rather than once per frame.
+        """
+        now = time.monotonic_ns()
+        codes = numpy.fromiter((-1 if f.loopback else encode_frame(f.format, len(f.data)) for f in raw_frames),
+                               dtype=numpy.int32, count=len(raw_frames))
+        received = codes >= 0
+        codes = codes[received]
+        traffic = self._maybe_traffic
+        if traffic is not None:
+            route_indexes = route_indexes[received]
+            frame_counts = numpy.bincount(route_indexes, minlength=len(routes)).tolist()
+            byte_counts = numpy.bincount(route_indexes,
+                                         weights=get_encoded_data_length(codes),
+                                         minlength=len(routes)).tolist()
+            for (parsed, _), num_frames, num_bytes in zip(routes, frame_counts, byte_counts):
+                if parsed is not None and num_frames > 0:
+                    self._get_traffic_accumulator(traffic, parsed.can_id.data_specifier) \
+                        .add(num_frames, int(num_bytes), now)
+        est = self._maybe_bus_load_estimator
+        if est is not None:
+            est.add(int(est.duration_array[codes].sum()), now)
+
+    def _route_can_id(self, identifier: int) -> _Route:
+        """
+        Returns the parsed CAN ID and the input sessions that accept non-loopback frames with this CAN ID.
+        The result is cached until the set of input sessions is changed.
+        """
+        parsed = _parse_can_id(identifier)
+        sessions: typing.List[CANInputSession] = []
+        if parsed is not None and parsed.destination_node_id in (None, self._local_node_id):
+            for ss in parsed.input_session_specifiers:
+                session = self._input_dispatch_table.get(ss)
+                if session is not None:
+                    sessions.append(session)
+        if len(self._route_cache) >= _ROUTE_CACHE_CAPACITY:
+            self._route_cache.clear()
+        route = self._route_cache[identifier] = parsed, sessions
+        return route
+
+    def _handle_any_frame(self, parsed: _ParsedCANID, frame: TimestampedUAVCANFrame) -> None:
         if not frame.loopback:
             self._frame_stats.in_frames_uavcan += 1
-            if self._handle_received_frame(can_id, frame):
+            if self._handle_received_frame(parsed, frame):
                 self._frame_stats.in_frames_uavcan_accepted += 1
         else:
-            self._handle_loopback_frame(can_id, frame)
+            self._handle_loopback_frame(parsed.can_id, frame)
 
-    def _handle_received_frame(self, can_id: CANID, frame: TimestampedUAVCANFrame) -> bool:
+    def _handle_received_frame(self, parsed: _ParsedCANID, frame: TimestampedUAVCANFrame) -> bool:
         assert not frame.loopback
-        ss = pyuavcan.transport.InputSessionSpecifier(can_id.data_specifier, can_id.source_node_id)
         accepted = False
-        dest_nid = can_id.get_destination_node_id()
+        dest_nid = parsed.destination_node_id
         if dest_nid is None or dest_nid == self._local_node_id:
-            session = self._input_dispatch_table.get(ss)
-            if session is not None:
-                # noinspection PyProtectedMember
-                session._push_frame(can_id, frame)
-                accepted = True
-
-            if ss.remote_node_id is not None:
-                ss = pyuavcan.transport.InputSessionSpecifier(ss.data_specifier, None)
+            for ss in parsed.input_session_specifiers:
                 session = self._input_dispatch_table.get(ss)
                 if session is not None:
                     # noinspection PyProtectedMember
-                    session._push_frame(can_id, frame)
+                    session._push_frame(parsed.can_id, frame)
                     accepted = True
 
         return accepted
@@ -310,6 +615,11 @@ class CANTransport(pyuavcan.transport.Transport):
             session._handle_loopback_frame(frame)
 
     def _reconfigure_acceptance_filters(self) -> None:
+        if self._reconfiguration_batch_depth > 0:
+            self._reconfiguration_pending = True
+            return
+        self._reconfiguration_pending = False
+
         subject_ids = set(
             ds.subject_id for ds in (x.specifier.data_specifier for x in self._input_dispatch_table.items)
             if isinstance(ds, pyuavcan.transport.MessageDataSpecifier)
@@ -329,3 +639,102 @@ class CANTransport(pyuavcan.transport.Transport):
                     raise
                 else:
                     self._last_filter_configuration_set = fcs
+
+
+_TX_PREEMPTION_GRANULARITY = 8
+"""
+The maximum number of frames of one transfer that are handed over to the media without checking whether
+a higher-priority transfer is pending. At 1 Mbit/s, eight Classic CAN frames take about one millisecond.
+"""
+
+_BATCH_PARSING_THRESHOLD = 16
+"""
+Batches of received frames that are at least this large are processed using the vectorized batch pipeline.
+Smaller batches are processed frame by frame because the fixed overhead of the vectorized pipeline dominates.
+"""
+
+_ROUTE_CACHE_CAPACITY = 4096
+
+_BUS_LOAD_WINDOWS = [1.0, 10.0, 60.0]
+
+_TRAFFIC_RATE_WINDOW_NS = 1_000_000_000
+
+
+class _TrafficAccumulator:
+    def __init__(self) -> None:
+        self._frames = 0
+        self._bytes = 0
+        self._frame_counter = SlidingWindowCounter(_TRAFFIC_RATE_WINDOW_NS)
+        self._byte_counter = SlidingWindowCounter(_TRAFFIC_RATE_WINDOW_NS)
+
+    def add(self, num_frames: int, num_bytes: int, monotonic_ns: int) -> None:
+        self._frames += num_frames
+        self._bytes += num_bytes
+        self._frame_counter.add(num_frames, monotonic_ns)
+        self._byte_counter.add(num_bytes, monotonic_ns)
+
+    def sample(self, monotonic_ns: int) -> CANTrafficCounters:
+        return CANTrafficCounters(frames=self._frames,
+                                  bytes=self._bytes,
+                                  frame_rate=self._frame_counter.sample(monotonic_ns) * 1e9 / _TRAFFIC_RATE_WINDOW_NS,
+                                  byte_rate=self._byte_counter.sample(monotonic_ns) * 1e9 / _TRAFFIC_RATE_WINDOW_NS)
+
+
+@dataclasses.dataclass(frozen=True)
+class _ParsedCANID:
+    can_id:                   CANID
+    destination_node_id:      typing.Optional[int]
+    input_session_specifiers: typing.Tuple[pyuavcan.transport.InputSessionSpecifier, ...]
+    """
+    The selective session specifier followed by the promiscuous one.
+    If the source is anonymous, there is only the promiscuous one.
+    """
+
+
+_Route = typing.Tuple[typing.Optional[_ParsedCANID], typing.List[CANInputSession]]
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_can_id(identifier: int) -> typing.Optional[_ParsedCANID]:
+    """
+    The number of distinct CAN ID values observed on a real bus is small, so parsing them and constructing
+    the session specifiers anew for every received frame is wasteful. The cached values are immutable,
+    so the cache can be shared by all transport instances.
+    """
+    can_id = CANID.parse(identifier)
+    if can_id is None:
+        return None
+    ds = can_id.data_specifier
+    promiscuous = pyuavcan.transport.InputSessionSpecifier(ds, None)
+    if can_id.source_node_id is not None:
+        specifiers: typing.Tuple[pyuavcan.transport.InputSessionSpecifier, ...] = \
+            pyuavcan.transport.InputSessionSpecifier(ds, can_id.source_node_id), promiscuous
+    else:
+        specifiers = promiscuous,
+    return _ParsedCANID(can_id=can_id,
+                        destination_node_id=can_id.get_destination_node_id(),
+                        input_session_specifiers=specifiers)
+
+
+def _unittest_can_parse_can_id_cached() -> None:
+    from pyuavcan.transport import InputSessionSpecifier, MessageDataSpecifier, ServiceDataSpecifier
+
+    assert _parse_can_id(0b_010_0_0_0011000000111001_1_1111011) is None
+
+    parsed = _parse_can_id(0b_010_0_0_0011000000111001_0_1111011)
+    assert parsed is not None
+    assert parsed is _parse_can_id(0b_010_0_0_0011000000111001_0_1111011)
+    assert parsed.can_id == CANID.parse(0b_010_0_0_0011000000111001_0_1111011)
+    assert parsed.destination_node_id is None
+    assert parsed.input_session_specifiers == (InputSessionSpecifier(MessageDataSpecifier(12345), 123),
+                                               InputSessionSpecifier(MessageDataSpecifier(12345), None))
+
+    parsed = _parse_can_id(0b_010_0_1_0001000011100001_0_1111111)
+    assert parsed is not None
+    assert parsed.input_session_specifiers == (InputSessionSpecifier(MessageDataSpecifier(4321), None),)
+
+    parsed = _parse_can_id(0b_111_1_1_0100101100_0101010_1111011)
+    assert parsed is not None
+    assert parsed.destination_node_id == 42
+    ds = ServiceDataSpecifier(300, ServiceDataSpecifier.Role.REQUEST)
+    assert parsed.input_session_specifiers == (InputSessionSpecifier(ds, 123), InputSessionSpecifier(ds, None))
@@ -7,6 +7,7 @@
 from __future__ import annotations
 import typing
 import dataclasses
+import numpy
 import pyuavcan.transport
 from . import media as _media
 
@@ -82,6 +83,37 @@ class TimestampedUAVCANFrame(UAVCANFrame):
                                       toggle_bit=tog,
                                       loopback=source.loopback)
 
+    @staticmethod
+    def parse_batch(sources: typing.Sequence[_media.TimestampedDataFrame]) \
+            -> typing.List[typing.Optional[TimestampedUAVCANFrame]]:
+        """
+        Equivalent to applying :meth:`parse` to every frame of the batch, but the tail bytes of the whole batch are
+        decoded and validated at once. The output is aligned with the input. This is faster than :meth:`parse`
+        for large batches only; see ``_BATCH_PARSING_THRESHOLD`` in the transport.
+        """
+        extended = _media.FrameFormat.EXTENDED
+        tails = numpy.fromiter((f.data[-1] if f.format == extended and len(f.data) > 0 else -1 for f in sources),
+                               dtype=numpy.int16,
+                               count=len(sources))
+        valid = (tails >= 0) & ((tails & 0b1010_0000) != 0b1000_0000)   # Start of transfer requires toggle bit set.
+        columns = zip(sources,
+                      valid.tolist(),
+                      (tails & (TRANSFER_ID_MODULO - 1)).tolist(),
+                      ((tails & (1 << 7)) != 0).tolist(),
+                      ((tails & (1 << 6)) != 0).tolist(),
+                      ((tails & (1 << 5)) != 0).tolist())
+        return [
+            TimestampedUAVCANFrame(timestamp=source.timestamp,
+                                   identifier=source.identifier,
+                                   padded_payload=memoryview(source.data)[:-1],
+                                   transfer_id=transfer_id,
+                                   start_of_transfer=sot,
+                                   end_of_transfer=eot,
+                                   toggle_bit=tog,
+                                   loopback=source.loopback) if ok else None
+            for source, ok, transfer_id, sot, eot, tog in columns
+        ]
+
 
 def compute_transfer_id_forward_distance(a: int, b: int) -> int:
     """
@@ -172,3 +204,27 @@ def _unittest_can_uavcan_frame() -> None:
     assert TimestampedUAVCANFrame.parse(
         TimestampedDataFrame(123, bytearray(b'Hello\x6C'), FrameFormat.BASE, loopback=False, timestamp=ts)
     ) is None   # Bad frame format
+
+
+def _unittest_can_uavcan_frame_parse_batch() -> None:
+    import random
+    from pyuavcan.transport import Timestamp
+    from .media import TimestampedDataFrame, FrameFormat
+
+    assert TimestampedUAVCANFrame.parse_batch([]) == []
+
+    ts = Timestamp.now()
+    sources = []
+    for _ in range(1000):
+        fmt = FrameFormat.BASE if random.random() < 0.1 else FrameFormat.EXTENDED
+        sources.append(TimestampedDataFrame(random.randrange(2 ** int(fmt)),
+                                            bytearray(random.getrandbits(8)
+                                                      for _ in range(random.choice([0, 1, 2, 7, 8]))),
+                                            fmt,
+                                            loopback=random.random() < 0.2,
+                                            timestamp=ts))
+
+    parsed = TimestampedUAVCANFrame.parse_batch(sources)
+    assert parsed == [TimestampedUAVCANFrame.parse(x) for x in sources]
+    assert any(x is None for x in parsed)
+    assert any(x is not None and x.start_of_transfer for x in parsed)
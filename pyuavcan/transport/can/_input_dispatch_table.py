@@ -6,27 +6,33 @@
 
 from __future__ import annotations
 import typing
-from pyuavcan.transport import MessageDataSpecifier, ServiceDataSpecifier, InputSessionSpecifier
+from pyuavcan.transport import MessageDataSpecifier, ServiceDataSpecifier, InputSessionSpecifier, DataSpecifier
 from ._session import CANInputSession
 from ._identifier import CANID
 
 
 class InputDispatchTable:
     """
-    Time-memory trade-off: the input dispatch table is tens of megabytes large, but the lookup is very fast and O(1).
-    This is necessary to ensure scalability for high-load applications such as real-time network monitoring.
+    Two-level lookup table: the first level is a dense array indexed by the data specifier, the second level is
+    a small array indexed by the source node-ID which is allocated only when the first session for that data specifier
+    is created. The lookup is very fast and O(1), while the memory footprint is determined by the number of ports
+    that are actually in use. A flat table covering all possible session specifiers would be tens of megabytes large,
+    which is prohibitive for applications that run many transport instances in one process (e.g., simulators).
     """
     _NUM_SUBJECTS = MessageDataSpecifier.SUBJECT_ID_MASK + 1
     _NUM_SERVICES = ServiceDataSpecifier.SERVICE_ID_MASK + 1
     _NUM_NODE_IDS = CANID.NODE_ID_MASK + 1
 
     # Services multiplied by two to account for requests and responses.
+    _NUM_DATA_SPECIFIERS = _NUM_SUBJECTS + _NUM_SERVICES * 2
+
     # One added to nodes to allow promiscuous inputs which don't care about source node ID.
-    _TABLE_SIZE = (_NUM_SUBJECTS + _NUM_SERVICES * 2) * (_NUM_NODE_IDS + 1)
+    _ROW_SIZE = _NUM_NODE_IDS + 1
 
     def __init__(self) -> None:
         # This method of construction is an order of magnitude faster than range-based. It matters here. A lot.
-        self._table: typing.List[typing.Optional[CANInputSession]] = [None] * (self._TABLE_SIZE + 1)
+        self._table: typing.List[typing.Optional[typing.List[typing.Optional[CANInputSession]]]] = \
+            [None] * self._NUM_DATA_SPECIFIERS
 
         # A parallel dict is necessary for constant-complexity element listing. Traversing the table takes forever.
         self._dict: typing.Dict[InputSessionSpecifier, CANInputSession] = {}
@@ -40,25 +46,36 @@ class InputDispatchTable:
         This method is used only when a new input session is created; performance is not a priority.
         """
         key = session.specifier
-        self._table[self._compute_index(key)] = session
+        dim1 = self._compute_data_specifier_index(key.data_specifier)
+        row = self._table[dim1]
+        if row is None:
+            row = [None] * self._ROW_SIZE
+            self._table[dim1] = row
+        row[self._compute_node_id_index(key.remote_node_id)] = session
         self._dict[key] = session
 
     def get(self, specifier: InputSessionSpecifier) -> typing.Optional[CANInputSession]:
         """
         Constant-time lookup. Invoked for every received frame.
         """
-        return self._table[self._compute_index(specifier)]
+        row = self._table[self._compute_data_specifier_index(specifier.data_specifier)]
+        return row[self._compute_node_id_index(specifier.remote_node_id)] if row is not None else None
 
     def remove(self, specifier: InputSessionSpecifier) -> None:
         """
         This method is used only when an input session is destroyed; performance is not a priority.
+        The second-level row is deallocated when its last session is removed.
         """
-        self._table[self._compute_index(specifier)] = None
         del self._dict[specifier]
+        dim1 = self._compute_data_specifier_index(specifier.data_specifier)
+        row = self._table[dim1]
+        assert row is not None
+        row[self._compute_node_id_index(specifier.remote_node_id)] = None
+        if all(x is None for x in row):
+            self._table[dim1] = None
 
     @staticmethod
-    def _compute_index(specifier: InputSessionSpecifier) -> int:
-        ds, nid = specifier.data_specifier, specifier.remote_node_id
+    def _compute_data_specifier_index(ds: DataSpecifier) -> int:
         if isinstance(ds, MessageDataSpecifier):
             dim1 = ds.subject_id
         elif isinstance(ds, ServiceDataSpecifier):
@@ -71,13 +88,14 @@ class InputDispatchTable:
         else:
             assert False
 
-        dim2_cardinality = InputDispatchTable._NUM_NODE_IDS + 1
-        dim2 = nid if nid is not None else InputDispatchTable._NUM_NODE_IDS
-
-        point = dim1 * dim2_cardinality + dim2
+        assert 0 <= dim1 < InputDispatchTable._NUM_DATA_SPECIFIERS
+        return dim1
 
-        assert 0 <= point < InputDispatchTable._TABLE_SIZE
-        return point
+    @staticmethod
+    def _compute_node_id_index(remote_node_id: typing.Optional[int]) -> int:
+        dim2 = remote_node_id if remote_node_id is not None else InputDispatchTable._NUM_NODE_IDS
+        assert 0 <= dim2 < InputDispatchTable._ROW_SIZE
+        return dim2
 
 
 def _unittest_input_dispatch_table() -> None:
@@ -106,19 +124,83 @@ def _unittest_input_dispatch_table() -> None:
 # noinspection PyProtectedMember
 def _unittest_slow_input_dispatch_table_index() -> None:
     values: typing.Set[int] = set()
-    for node_id in (*range(InputDispatchTable._NUM_NODE_IDS), None):
-        for subj in range(InputDispatchTable._NUM_SUBJECTS):
-            out = InputDispatchTable._compute_index(InputSessionSpecifier(MessageDataSpecifier(subj), node_id))
+    for subj in range(InputDispatchTable._NUM_SUBJECTS):
+        out = InputDispatchTable._compute_data_specifier_index(MessageDataSpecifier(subj))
+        assert out not in values
+        values.add(out)
+
+    for serv in range(InputDispatchTable._NUM_SERVICES):
+        for role in ServiceDataSpecifier.Role:
+            out = InputDispatchTable._compute_data_specifier_index(ServiceDataSpecifier(serv, role))
             assert out not in values
             values.add(out)
-            assert out < InputDispatchTable._TABLE_SIZE
 
-        for serv in range(InputDispatchTable._NUM_SERVICES):
-            for role in ServiceDataSpecifier.Role:
-                out = InputDispatchTable._compute_index(InputSessionSpecifier(ServiceDataSpecifier(serv, role),
-                                                                              node_id))
-                assert out not in values
-                values.add(out)
-                assert out < InputDispatchTable._TABLE_SIZE
+    assert values == set(range(InputDispatchTable._NUM_DATA_SPECIFIERS))
 
-    assert len(values) == InputDispatchTable._TABLE_SIZE
+    values.clear()
+    for node_id in (*range(InputDispatchTable._NUM_NODE_IDS), None):
+        out = InputDispatchTable._compute_node_id_index(node_id)
+        assert out not in values
+        values.add(out)
+
+    assert values == set(range(InputDispatchTable._ROW_SIZE))
+
+
+# noinspection PyProtectedMember
+def _unittest_slow_input_dispatch_table_benchmark() -> None:
+    """
+    Compares the two-level table against a flat table covering all possible session specifiers,
+    which is how this class used to be implemented. The flat table is emulated here with a plain list.
+    """
+    import sys
+    import time
+    import timeit
+    import asyncio
+    from pyuavcan.transport import PayloadMetadata
+
+    flat_size = InputDispatchTable._NUM_DATA_SPECIFIERS * InputDispatchTable._ROW_SIZE
+
+    started_at = time.perf_counter()
+    flat: typing.List[typing.Optional[CANInputSession]] = [None] * flat_size
+    flat_construction = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    t = InputDispatchTable()
+    sparse_construction = time.perf_counter() - started_at
+
+    loop = asyncio.get_event_loop()
+    specifiers = [
+        *(InputSessionSpecifier(MessageDataSpecifier(x * 97), None) for x in range(100)),
+        *(InputSessionSpecifier(ServiceDataSpecifier(x, ServiceDataSpecifier.Role.REQUEST), None) for x in range(20)),
+        *(InputSessionSpecifier(ServiceDataSpecifier(x, ServiceDataSpecifier.Role.RESPONSE), x) for x in range(20)),
+    ]
+    for spec in specifiers:
+        ses = CANInputSession(spec, PayloadMetadata(0, 0), loop, lambda: None)
+        t.add(ses)
+        ds_index = InputDispatchTable._compute_data_specifier_index(spec.data_specifier)
+        nid_index = InputDispatchTable._compute_node_id_index(spec.remote_node_id)
+        flat[ds_index * InputDispatchTable._ROW_SIZE + nid_index] = ses
+
+    def flat_get(specifier: InputSessionSpecifier) -> typing.Optional[CANInputSession]:
+        ds_index = InputDispatchTable._compute_data_specifier_index(specifier.data_specifier)
+        nid_index = InputDispatchTable._compute_node_id_index(specifier.remote_node_id)
+        return flat[ds_index * InputDispatchTable._ROW_SIZE + nid_index]
+
+    probes = [*specifiers, InputSessionSpecifier(MessageDataSpecifier(12345), 42)]  # The last one is a miss.
+    for spec in probes:
+        assert t.get(spec) is flat_get(spec)
+
+    number = 100
+    flat_lookup = min(timeit.repeat(lambda: [flat_get(x) for x in probes], number=number, repeat=3))
+    sparse_lookup = min(timeit.repeat(lambda: [t.get(x) for x in probes], number=number, repeat=3))
+    flat_lookup /= number * len(probes)
+    sparse_lookup /= number * len(probes)
+
+    flat_memory = sys.getsizeof(flat)
+    sparse_memory = sys.getsizeof(t._table) + sum(sys.getsizeof(x) for x in t._table if x is not None)
+
+    print(f'Flat table:      construction {flat_construction * 1e3:7.3f} ms, memory {flat_memory / 1024:9.1f} KiB, '
+          f'lookup {flat_lookup * 1e9:5.0f} ns')
+    print(f'Two-level table: construction {sparse_construction * 1e3:7.3f} ms, memory {sparse_memory / 1024:9.1f} KiB, '
+          f'lookup {sparse_lookup * 1e9:5.0f} ns')
+    assert sparse_memory * 10 < flat_memory
@@ -6,9 +6,11 @@
 
 from __future__ import annotations
 import copy
+import enum
 import typing
 import asyncio
 import logging
+import collections
 import dataclasses
 import pyuavcan.util
 import pyuavcan.transport
@@ -19,11 +21,52 @@ from . import _base, _transfer_reassembler
 _logger = logging.getLogger(__name__)
 
 
+class FrameQueuePolicy(enum.Enum):
+    """
+    Defines which items are discarded when the input queue of :class:`CANInputSession` is full.
+    See :attr:`CANInputSession.frame_queue_policy`.
+    """
+
+    DROP_NEWEST = enum.auto()
+    """
+    The newly received item is discarded. This is the default.
+    """
+
+    DROP_OLDEST = enum.auto()
+    """
+    The oldest queued item whose priority is not higher than that of the newly received item is discarded
+    to make room for the latter. If there is no such item, the newly received item is discarded.
+    This policy favors fresh data over stale data, which is usually preferable for real-time applications.
+    """
+
+    DROP_TRANSFER = enum.auto()
+    """
+    The transfer that the newly received frame belongs to is discarded entirely: its frames that are already
+    queued are removed, and its subsequent frames are discarded as they arrive.
+    This policy ensures that the queue is never occupied by fragments of transfers that cannot be completed.
+    If :attr:`CANInputSession.eager_reassembly` is enabled, this policy is equivalent to :attr:`DROP_NEWEST`
+    because the queue contains only complete transfers.
+    """
+
+
 @dataclasses.dataclass
 class CANInputSessionStatistics(pyuavcan.transport.SessionStatistics):
     reception_error_counters: typing.Dict[_transfer_reassembler.TransferReassemblyErrorID, int] = \
         dataclasses.field(default_factory=lambda: {e: 0 for e in _transfer_reassembler.TransferReassemblyErrorID})
 
+    frames_dropped_per_policy: typing.Dict[FrameQueuePolicy, int] = \
+        dataclasses.field(default_factory=lambda: {e: 0 for e in FrameQueuePolicy})
+    """
+    The number of frames discarded due to input queue overflow, keyed by the queue policy that was in effect.
+    """
+
+    transfers_dropped_per_policy: typing.Dict[FrameQueuePolicy, int] = \
+        dataclasses.field(default_factory=lambda: {e: 0 for e in FrameQueuePolicy})
+    """
+    The number of transfers lost due to input queue overflow, keyed by the queue policy that was in effect.
+    A transfer is counted once regardless of the number of its frames that were discarded.
+    """
+
 
 class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
     DEFAULT_TRANSFER_ID_TIMEOUT = 2
@@ -31,7 +74,8 @@ class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
     Per the UAVCAN specification. Units are seconds. Can be overridden after instantiation if needed.
     """
 
-    _QueueItem = typing.Tuple[_identifier.CANID, _frame.TimestampedUAVCANFrame]
+    _QueueItem = typing.Union[typing.Tuple[_identifier.CANID, _frame.TimestampedUAVCANFrame],
+                              pyuavcan.transport.TransferFrom]
 
     def __init__(self,
                  specifier:        pyuavcan.transport.InputSessionSpecifier,
@@ -42,13 +86,24 @@ class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
         self._specifier = specifier
         self._payload_metadata = payload_metadata
 
-        self._queue: asyncio.Queue[CANInputSession._QueueItem] = asyncio.Queue()
+        self._queue = _InputQueue(loop=loop)
+        self._queue_policy = FrameQueuePolicy.DROP_NEWEST
+        self._queue_reservation: typing.Dict[pyuavcan.transport.Priority, int] = {}
+        self._queue_admission_limits: typing.Optional[typing.List[int]] = None  # Indexed by priority; None if unbounded
+        self._discarded_transfers: typing.Dict[int, int] = {}  # Source node-ID --> transfer-ID; for DROP_TRANSFER
+        self._last_lost_transfers: typing.Dict[int, int] = {}  # Source node-ID --> transfer-ID; for statistics
         assert loop is not None
         self._loop = loop
         self._transfer_id_timeout_ns = int(CANInputSession.DEFAULT_TRANSFER_ID_TIMEOUT / _NANO)
 
-        self._receivers = [_transfer_reassembler.TransferReassembler(nid, payload_metadata.max_size_bytes)
-                           for nid in _node_id_range()]
+        # Reassemblers are allocated lazily upon reception of the first frame from the corresponding source node.
+        # Eagerly constructing all of them would make the instantiation of input sessions expensive, which is bad
+        # for applications that subscribe to a large number of ports, such as network monitors.
+        self._receivers: typing.List[typing.Optional[_transfer_reassembler.TransferReassembler]] = \
+            [None] * (_identifier.CANID.NODE_ID_MASK + 1)
+        self._reassembler_eviction_threshold: typing.Optional[int] = None
+        self._last_eviction_sweep_monotonic_ns = 0
+        self._eager_reassembly = False
 
         self._statistics = CANInputSessionStatistics()   # We could easily support per-source-node statistics if needed
 
@@ -60,23 +115,99 @@ class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
         visibility handling capabilities are limited. I guess we could define a private abstract base to
         handle this but it feels like too much work. Why can't we have protected visibility in Python?
         """
-        try:
-            self._queue.put_nowait((can_id, frame))
-        except asyncio.QueueFull:
-            self._statistics.drops += 1
-            _logger.info('Input session %s: input queue overflow; frame %s (CAN ID fields: %s) is dropped',
-                         self, frame, can_id)
+        if self._eager_reassembly:
+            transfer = self._process_frame(can_id, frame)
+            if transfer is not None:
+                self._enqueue(transfer)
+        else:
+            self._enqueue((can_id, frame))
+
+    def _push_frames(self, frames: typing.Iterable[typing.Tuple[_identifier.CANID, _frame.TimestampedUAVCANFrame]]) \
+            -> None:
+        """
+        Equivalent to :meth:`_push_frame` invoked for each item, in order. Used for batch reception.
+        """
+        if self._eager_reassembly:
+            for can_id, frame in frames:
+                transfer = self._process_frame(can_id, frame)
+                if transfer is not None:
+                    self._enqueue(transfer)
+        else:
+            for item in frames:
+                self._enqueue(item)
+
+    def _enqueue(self, item: CANInputSession._QueueItem) -> None:
+        if self._discarded_transfers and self._is_discarded(item):
+            self._count_drop(item, FrameQueuePolicy.DROP_TRANSFER)
+            return
+
+        limits = self._queue_admission_limits
+        if limits is None:
+            self._queue.put_nowait(item)
+            return
+        priority = _get_priority(item)
+        if self._queue.qsize() < limits[priority.value]:
+            self._queue.put_nowait(item)
+            return
+
+        policy = self._queue_policy
+        if policy == FrameQueuePolicy.DROP_OLDEST:
+            victim = self._queue.remove_first(lambda x: _get_priority(x).value >= priority.value)
+            if victim is not None:
+                self._count_drop(victim, policy)
+                self._queue.put_nowait(item)
+                return
+        elif policy == FrameQueuePolicy.DROP_TRANSFER and not isinstance(item, pyuavcan.transport.TransferFrom):
+            key = _get_transfer_key(item)
+            if key is not None:
+                source_node_id, transfer_id = key
+                self._discarded_transfers[source_node_id] = transfer_id
+                for x in self._queue.remove_all(lambda x: _get_transfer_key(x) == key):
+                    self._count_drop(x, policy)
+        self._count_drop(item, policy)
+
+    def _is_discarded(self, item: CANInputSession._QueueItem) -> bool:
+        key = _get_transfer_key(item)
+        if key is None:
+            return False
+        source_node_id, transfer_id = key
+        discarded_transfer_id = self._discarded_transfers.get(source_node_id)
+        if discarded_transfer_id is None:
+            return False
+        assert not isinstance(item, pyuavcan.transport.TransferFrom)
+        if discarded_transfer_id == transfer_id and not item[1].start_of_transfer:
+            return True
+        del self._discarded_transfers[source_node_id]   # The source has moved on to the next transfer.
+        return False
+
+    def _count_drop(self, item: CANInputSession._QueueItem, policy: FrameQueuePolicy) -> None:
+        self._statistics.drops += 1
+        if isinstance(item, pyuavcan.transport.TransferFrom):
+            self._statistics.transfers_dropped_per_policy[policy] += 1
+        else:
+            self._statistics.frames_dropped_per_policy[policy] += 1
+            key = _get_transfer_key(item)
+            if key is None:     # Anonymous transfers are single-frame transfers.
+                self._statistics.transfers_dropped_per_policy[policy] += 1
+            elif self._last_lost_transfers.get(key[0]) != key[1]:
+                self._last_lost_transfers[key[0]] = key[1]
+                self._statistics.transfers_dropped_per_policy[policy] += 1
+        _logger.info('Input session %s: input queue overflow (policy %s); %s is dropped', self, policy, item)
 
     @property
     def frame_queue_capacity(self) -> typing.Optional[int]:
         """
         Capacity of the input frame queue. None means that the capacity is unlimited, which is the default.
         This may deplete the heap if input transfers are not consumed quickly enough so beware.
+        If :attr:`eager_reassembly` is enabled, the queue contains reassembled transfers rather than frames,
+        so the capacity is expressed in transfers.
 
         If the capacity is changed and the new value is smaller than the number of frames currently in the queue,
-        the newest frames will be discarded and the number of queue overruns will be incremented accordingly.
+        the excess frames will be discarded according to :attr:`frame_queue_policy`
+        and the number of queue overruns will be incremented accordingly.
         The complexity of a queue capacity change may be up to linear of the number of frames currently in the queue.
-        If the value is not None, it must be a positive integer, otherwise you get a :class:`ValueError`.
+        If the value is not None, it must be a positive integer that is greater than the sum of
+        :attr:`frame_queue_reservation`, otherwise you get a :class:`ValueError`.
         """
         return self._queue.maxsize if self._queue.maxsize > 0 else None
 
@@ -84,15 +215,112 @@ class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
     def frame_queue_capacity(self, value: typing.Optional[int]) -> None:
         if value is not None and not value > 0:
             raise ValueError(f'Invalid value for queue capacity: {value}')
+        limits = _compute_admission_limits(value, self._queue_reservation)
 
         old_queue = self._queue
-        self._queue = asyncio.Queue(int(value) if value is not None else 0, loop=self._loop)
+        self._queue = _InputQueue(int(value) if value is not None else 0, loop=self._loop)
+        self._queue_admission_limits = limits
         try:
             while True:
-                self._push_frame(*old_queue.get_nowait())
+                self._enqueue(old_queue.get_nowait())
         except asyncio.QueueEmpty:
             pass
 
+    @property
+    def frame_queue_policy(self) -> FrameQueuePolicy:
+        """
+        Defines which items are discarded when the input queue is full; see :class:`FrameQueuePolicy`.
+        The default is :attr:`FrameQueuePolicy.DROP_NEWEST`.
+        The policy has no effect unless :attr:`frame_queue_capacity` is set.
+        The losses are counted in the session statistics separately per policy.
+        """
+        return self._queue_policy
+
+    @frame_queue_policy.setter
+    def frame_queue_policy(self, value: FrameQueuePolicy) -> None:
+        self._queue_policy = FrameQueuePolicy(value)
+        self._discarded_transfers.clear()
+
+    @property
+    def frame_queue_reservation(self) -> typing.Dict[pyuavcan.transport.Priority, int]:
+        """
+        The number of input queue slots reserved for items of the specified priority level or higher,
+        keyed by priority; the priority levels that are not mentioned have no reservation (this is the default).
+        An item is accepted into the queue only if the number of queued items is less than the capacity minus the
+        total reservation of the higher priority levels; otherwise, it is handled according to
+        :attr:`frame_queue_policy`. This ensures that high-priority transfers are not starved by
+        floods of low-priority traffic.
+
+        For example, if the capacity is 100 and 20 slots are reserved for :attr:`pyuavcan.transport.Priority.FAST`,
+        then items of priority FAST and higher can occupy the entire queue, while the lower-priority items can
+        occupy at most 80 slots.
+
+        The reservation has no effect unless :attr:`frame_queue_capacity` is set.
+        The values must be non-negative and their sum must be less than the queue capacity,
+        otherwise you get a :class:`ValueError`. The items that are already queued are not affected.
+        """
+        return dict(self._queue_reservation)
+
+    @frame_queue_reservation.setter
+    def frame_queue_reservation(self, value: typing.Mapping[pyuavcan.transport.Priority, int]) -> None:
+        reservation = {pyuavcan.transport.Priority(k): int(v) for k, v in value.items() if v != 0}
+        self._queue_admission_limits = _compute_admission_limits(self.frame_queue_capacity, reservation)
+        self._queue_reservation = reservation
+
+    @property
+    def eager_reassembly(self) -> bool:
+        """
+        By default, received frames are queued as-is and the transfers are reassembled from them
+        when the application invokes :meth:`receive_until`.
+        If eager reassembly is enabled, frames are processed synchronously as soon as they are received from
+        the media layer, and the queue holds only complete transfers. This reduces the number of queue operations
+        and task wake-ups by the average number of frames per transfer, and ensures that fragments of incomplete
+        transfers do not occupy the queue. The downside is that the reassembly cost is paid by the receive path
+        regardless of whether the application is interested in the data.
+
+        When this option is enabled, the frames that are already queued are reassembled immediately.
+        Disabling it does not affect the transfers that are already queued.
+        """
+        return self._eager_reassembly
+
+    @eager_reassembly.setter
+    def eager_reassembly(self, value: bool) -> None:
+        value = bool(value)
+        if value and not self._eager_reassembly:
+            pending: typing.List[CANInputSession._QueueItem] = []
+            try:
+                while True:
+                    pending.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                pass
+            for item in pending:
+                if isinstance(item, pyuavcan.transport.TransferFrom):
+                    self._enqueue(item)
+                else:
+                    transfer = self._process_frame(*item)
+                    if transfer is not None:
+                        self._enqueue(transfer)
+        self._eager_reassembly = value
+
+    @property
+    def reassembler_eviction_threshold(self) -> typing.Optional[int]:
+        """
+        If not None, the transfer reassembly state kept for a remote node is discarded after this many transfer-ID
+        timeouts of inactivity of that node; the state is re-created automatically when the node resumes
+        transmission. None (default) disables eviction, so the state is retained until the session is closed.
+        Eviction does not affect the behavior of the session because an inactive reassembler would be
+        reset by the transfer-ID timeout anyway; it only allows long-running sessions to release the memory
+        allocated for nodes that have left the network.
+        If the value is not None, it must be a positive integer, otherwise you get a :class:`ValueError`.
+        """
+        return self._reassembler_eviction_threshold
+
+    @reassembler_eviction_threshold.setter
+    def reassembler_eviction_threshold(self, value: typing.Optional[int]) -> None:
+        if value is not None and not value > 0:
+            raise ValueError(f'Invalid value for reassembler eviction threshold: {value}')
+        self._reassembler_eviction_threshold = int(value) if value is not None else None
+
     @property
     def specifier(self) -> pyuavcan.transport.InputSessionSpecifier:
         return self._specifier
@@ -102,7 +330,7 @@ class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
         return self._payload_metadata
 
     def sample_statistics(self) -> CANInputSessionStatistics:
-        return copy.copy(self._statistics)
+        return copy.deepcopy(self._statistics)
 
     @property
     def transfer_id_timeout(self) -> float:
@@ -130,64 +358,384 @@ class CANInputSession(_base.CANSession, pyuavcan.transport.InputSession):
                 # Continue reading past the deadline until the queue is empty or a transfer is received.
                 timeout = monotonic_deadline - self._loop.time()
                 if timeout > 0:
-                    canid, frame = await asyncio.wait_for(self._queue.get(), timeout, loop=self._loop)
+                    item = await asyncio.wait_for(self._queue.get(), timeout, loop=self._loop)
                 else:
-                    canid, frame = self._queue.get_nowait()
-                assert isinstance(canid, _identifier.CANID)
-                assert isinstance(frame, _frame.TimestampedUAVCANFrame)
+                    item = self._queue.get_nowait()
             except (asyncio.TimeoutError, asyncio.QueueEmpty):
                 # If there are unprocessed messages, allow the caller to read them even if the instance is closed.
                 self._raise_if_closed()
                 return None
 
-            self._statistics.frames += 1
-
-            if isinstance(canid, _identifier.MessageCANID):
-                assert isinstance(self._specifier.data_specifier, pyuavcan.transport.MessageDataSpecifier)
-                assert self._specifier.data_specifier.subject_id == canid.subject_id
-                source_node_id = canid.source_node_id
-                if source_node_id is None:
-                    # Anonymous transfer - no reconstruction needed
-                    self._statistics.transfers += 1
-                    self._statistics.payload_bytes += len(frame.padded_payload)
-                    out = pyuavcan.transport.TransferFrom(timestamp=frame.timestamp,
-                                                          priority=canid.priority,
-                                                          transfer_id=frame.transfer_id,
-                                                          fragmented_payload=[frame.padded_payload],
-                                                          source_node_id=None)
-                    _logger.debug('%s: Received anonymous transfer: %s; current stats: %s', self, out, self._statistics)
-                    return out
-
-            elif isinstance(canid, _identifier.ServiceCANID):
-                assert isinstance(self._specifier.data_specifier, pyuavcan.transport.ServiceDataSpecifier)
-                assert self._specifier.data_specifier.service_id == canid.service_id
-                assert (self._specifier.data_specifier.role == pyuavcan.transport.ServiceDataSpecifier.Role.REQUEST) \
-                    == canid.request_not_response
-                source_node_id = canid.source_node_id
-
-            else:
-                assert False
-
-            receiver = self._receivers[source_node_id]
-            result = receiver.process_frame(canid.priority, frame, self._transfer_id_timeout_ns)
-            if isinstance(result, _transfer_reassembler.TransferReassemblyErrorID):
-                self._statistics.errors += 1
-                self._statistics.reception_error_counters[result] += 1
-                _logger.debug('%s: Rejecting CAN frame %s because %s; current stats: %s',
-                              self, frame, result, self._statistics)
-            elif isinstance(result, pyuavcan.transport.TransferFrom):
+            if isinstance(item, pyuavcan.transport.TransferFrom):
+                return item     # Reassembled eagerly, statistics already updated.
+
+            out = self._process_frame(*item)
+            if out is not None:
+                return out
+
+    def _process_frame(self, canid: _identifier.CANID, frame: _frame.TimestampedUAVCANFrame) \
+            -> typing.Optional[pyuavcan.transport.TransferFrom]:
+        assert isinstance(canid, _identifier.CANID)
+        assert isinstance(frame, _frame.TimestampedUAVCANFrame)
+        self._statistics.frames += 1
+
+        if isinstance(canid, _identifier.MessageCANID):
+            assert isinstance(self._specifier.data_specifier, pyuavcan.transport.MessageDataSpecifier)
+            assert self._specifier.data_specifier.subject_id == canid.subject_id
+            source_node_id = canid.source_node_id
+            if source_node_id is None:
+                # Anonymous transfer - no reconstruction needed
                 self._statistics.transfers += 1
-                self._statistics.payload_bytes += sum(map(len, result.fragmented_payload))
-                _logger.debug('%s: Received transfer: %s; current stats: %s', self, result, self._statistics)
-                return result
-            elif result is None:
-                pass        # Nothing to do - expecting more frames
-            else:
-                assert False
+                self._statistics.payload_bytes += len(frame.padded_payload)
+                out = pyuavcan.transport.TransferFrom(timestamp=frame.timestamp,
+                                                      priority=canid.priority,
+                                                      transfer_id=frame.transfer_id,
+                                                      fragmented_payload=[frame.padded_payload],
+                                                      source_node_id=None)
+                _logger.debug('%s: Received anonymous transfer: %s; current stats: %s', self, out, self._statistics)
+                return out
+
+        elif isinstance(canid, _identifier.ServiceCANID):
+            assert isinstance(self._specifier.data_specifier, pyuavcan.transport.ServiceDataSpecifier)
+            assert self._specifier.data_specifier.service_id == canid.service_id
+            assert (self._specifier.data_specifier.role == pyuavcan.transport.ServiceDataSpecifier.Role.REQUEST) \
+                == canid.request_not_response
+            source_node_id = canid.source_node_id
+
+        else:
+            assert False
+
+        self._evict_stale_receivers(frame.timestamp.monotonic_ns)
+        receiver = self._receivers[source_node_id]
+        if receiver is None:
+            receiver = _transfer_reassembler.TransferReassembler(source_node_id,
+                                                                 self._payload_metadata.max_size_bytes)
+            self._receivers[source_node_id] = receiver
+
+        result = receiver.process_frame(canid.priority, frame, self._transfer_id_timeout_ns)
+        if isinstance(result, _transfer_reassembler.TransferReassemblyErrorID):
+            self._statistics.errors += 1
+            self._statistics.reception_error_counters[result] += 1
+            _logger.debug('%s: Rejecting CAN frame %s because %s; current stats: %s',
+                          self, frame, result, self._statistics)
+        elif isinstance(result, pyuavcan.transport.TransferFrom):
+            self._statistics.transfers += 1
+            self._statistics.payload_bytes += sum(map(len, result.fragmented_payload))
+            _logger.debug('%s: Received transfer: %s; current stats: %s', self, result, self._statistics)
+            return result
+        elif result is None:
+            pass        # Nothing to do - expecting more frames
+        else:
+            assert False
+        return None
+
+    def _evict_stale_receivers(self, monotonic_ns: int) -> None:
+        """
+        The sweep is performed at most once per eviction period, so its amortized cost per frame is negligible.
+        """
+        if self._reassembler_eviction_threshold is None:
+            return
+        eviction_timeout_ns = self._transfer_id_timeout_ns * self._reassembler_eviction_threshold
+        if monotonic_ns - self._last_eviction_sweep_monotonic_ns < eviction_timeout_ns:
+            return
+        self._last_eviction_sweep_monotonic_ns = monotonic_ns
+        for index, receiver in enumerate(self._receivers):
+            if receiver is not None and monotonic_ns - receiver.last_activity_monotonic_ns > eviction_timeout_ns:
+                _logger.debug('%s: Evicting the reassembler of inactive node %d', self, index)
+                self._receivers[index] = None
 
 
-def _node_id_range() -> typing.Iterable[int]:
-    return range(_identifier.CANID.NODE_ID_MASK + 1)
+def _get_priority(item: CANInputSession._QueueItem) -> pyuavcan.transport.Priority:
+    if isinstance(item, pyuavcan.transport.TransferFrom):
+        return item.priority
+    return item[0].priority
+
+
+def _get_transfer_key(item: CANInputSession._QueueItem) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Source node-ID and transfer-ID of the transfer the frame belongs to; None for anonymous frames and transfers.
+    """
+    if isinstance(item, pyuavcan.transport.TransferFrom):
+        return None
+    can_id, frame = item
+    source_node_id = can_id.source_node_id
+    return (source_node_id, frame.transfer_id) if source_node_id is not None else None
+
+
+def _compute_admission_limits(capacity:    typing.Optional[int],
+                              reservation: typing.Mapping[pyuavcan.transport.Priority, int]) \
+        -> typing.Optional[typing.List[int]]:
+    if any(x < 0 for x in reservation.values()):
+        raise ValueError(f'Invalid queue reservation: {reservation}')
+    if capacity is None:
+        return None
+    if sum(reservation.values()) >= capacity:
+        raise ValueError(f'Queue reservation {reservation} is incompatible with the queue capacity {capacity}')
+    out: typing.List[int] = []
+    for p in sorted(pyuavcan.transport.Priority, key=lambda x: x.value):
+        out.append(capacity - sum(v for k, v in reservation.items() if k.value < p.value))
+    return out
+
+
+if typing.TYPE_CHECKING:
+    _InputQueueBase = asyncio.Queue[CANInputSession._QueueItem]
+else:
+    _InputQueueBase = asyncio.Queue
+
+
+class _InputQueue(_InputQueueBase):
+    """
+    A regular asyncio queue that additionally allows one to remove arbitrary items, which is needed for
+    the overflow handling policies. The storage is customized via the hooks provided for subclasses.
+    """
+
+    def _init(self, maxsize: int) -> None:
+        self._queue: typing.Deque[CANInputSession._QueueItem] = collections.deque()
+
+    def _put(self, item: CANInputSession._QueueItem) -> None:
+        self._queue.append(item)
+
+    def _get(self) -> CANInputSession._QueueItem:
+        return self._queue.popleft()
+
+    def remove_first(self, predicate: typing.Callable[[CANInputSession._QueueItem], bool]) \
+            -> typing.Optional[CANInputSession._QueueItem]:
+        """
+        Removes and returns the oldest item that satisfies the predicate, or None if there is none.
+        """
+        for index, item in enumerate(self._queue):
+            if predicate(item):
+                del self._queue[index]
+                return item
+        return None
+
+    def remove_all(self, predicate: typing.Callable[[CANInputSession._QueueItem], bool]) \
+            -> typing.List[CANInputSession._QueueItem]:
+        """
+        Removes and returns all items that satisfy the predicate, preserving the order.
+        """
+        removed = [x for x in self._queue if predicate(x)]
+        if removed:
+            kept = [x for x in self._queue if not predicate(x)]
+            self._queue.clear()
+            self._queue.extend(kept)
+        return removed
 
 
 _NANO = 1e-9
+
+
+# noinspection PyProtectedMember
+def _unittest_can_input_session_lazy_reassemblers() -> None:
+    from pytest import raises
+    from pyuavcan.transport import InputSessionSpecifier, MessageDataSpecifier, PayloadMetadata, Priority, Timestamp
+
+    loop = asyncio.get_event_loop()
+    await_ = loop.run_until_complete
+
+    ses = CANInputSession(InputSessionSpecifier(MessageDataSpecifier(1234), None),
+                          PayloadMetadata(0, 100),
+                          loop,
+                          lambda: None)
+    assert ses._receivers == [None] * 128
+
+    def push(source_node_id: int, monotonic_ns: int) -> None:
+        ses._push_frame(_identifier.MessageCANID(Priority.LOW, source_node_id, 1234),
+                        _frame.TimestampedUAVCANFrame(identifier=0,
+                                                      padded_payload=memoryview(b'abc'),
+                                                      transfer_id=0,
+                                                      start_of_transfer=True,
+                                                      end_of_transfer=True,
+                                                      toggle_bit=True,
+                                                      loopback=False,
+                                                      timestamp=Timestamp(0, monotonic_ns)))
+
+    push(5, 1_000_000_000)
+    tr = await_(ses.receive_until(0))
+    assert tr is not None and tr.source_node_id == 5
+    assert [i for i, x in enumerate(ses._receivers) if x is not None] == [5]
+
+    with raises(ValueError):
+        ses.reassembler_eviction_threshold = 0
+    assert ses.reassembler_eviction_threshold is None
+    ses.transfer_id_timeout = 1.0
+    ses.reassembler_eviction_threshold = 3
+
+    push(6, 2_000_000_000)        # Not stale yet.
+    assert await_(ses.receive_until(0)) is not None
+    assert [i for i, x in enumerate(ses._receivers) if x is not None] == [5, 6]
+
+    push(6, 4_500_000_000)        # Node 5 has been inactive for more than three transfer-ID timeouts.
+    assert await_(ses.receive_until(0)) is not None
+    assert [i for i, x in enumerate(ses._receivers) if x is not None] == [6]
+
+    push(5, 5_000_000_000)        # The evicted state is re-created transparently.
+    tr = await_(ses.receive_until(0))
+    assert tr is not None and tr.source_node_id == 5 and tr.transfer_id == 0
+    assert [i for i, x in enumerate(ses._receivers) if x is not None] == [5, 6]
+    ses.close()
+
+
+# noinspection PyProtectedMember
+def _unittest_can_input_session_eager_reassembly() -> None:
+    from pyuavcan.transport import InputSessionSpecifier, ServiceDataSpecifier, PayloadMetadata, Priority, Timestamp
+
+    loop = asyncio.get_event_loop()
+    await_ = loop.run_until_complete
+
+    ses = CANInputSession(InputSessionSpecifier(ServiceDataSpecifier(333, ServiceDataSpecifier.Role.REQUEST), None),
+                          PayloadMetadata(0, 100),
+                          loop,
+                          lambda: None)
+    assert not ses.eager_reassembly
+    can_id = _identifier.ServiceCANID(Priority.LOW, 5, 9, 333, True)
+
+    def push(payload: bytes, transfer_id: int, sot: bool, eot: bool, tog: bool) -> None:
+        ses._push_frame(can_id,
+                        _frame.TimestampedUAVCANFrame(identifier=0,
+                                                      padded_payload=memoryview(payload),
+                                                      transfer_id=transfer_id,
+                                                      start_of_transfer=sot,
+                                                      end_of_transfer=eot,
+                                                      toggle_bit=tog,
+                                                      loopback=False,
+                                                      timestamp=Timestamp.now()))
+
+    # The first frame is queued as-is; once eager reassembly is enabled, it is reassembled immediately.
+    push(b'\x00\x01\x02\x03\x04\x05\x06', 0, True, False, True)
+    assert ses._queue.qsize() == 1
+    ses.eager_reassembly = True
+    assert ses.eager_reassembly
+    assert ses._queue.qsize() == 0
+    push(b'\x07\x08\x09\x0a\x0b\x0c\x0d', 0, False, False, False)
+    push(b'\x0e\x0f\x10\x11\x12\x13\x14', 0, False, False, True)
+    push(b'\x15\x16\x17\x18\x19\x1a\x1b', 0, False, False, False)
+    assert ses._queue.qsize() == 0
+    push(b'\x1c\x1d' b'\x35\x54', 0, False, True, True)
+    assert ses._queue.qsize() == 1
+    push(b'Hello', 1, True, True, True)
+    assert ses._queue.qsize() == 2
+
+    # Already reassembled transfers are retained when the option is disabled.
+    ses.eager_reassembly = False
+    push(b'World', 2, True, True, True)
+    assert ses._queue.qsize() == 3
+
+    tr = await_(ses.receive_until(0))
+    assert tr is not None and tr.transfer_id == 0 and tr.source_node_id == 5
+    assert b''.join(tr.fragmented_payload) == bytes(range(0x1e))
+    tr = await_(ses.receive_until(0))
+    assert tr is not None and tr.transfer_id == 1 and b''.join(tr.fragmented_payload) == b'Hello'
+    tr = await_(ses.receive_until(0))
+    assert tr is not None and tr.transfer_id == 2 and b''.join(tr.fragmented_payload) == b'World'
+    assert await_(ses.receive_until(0)) is None
+    assert ses.sample_statistics() == CANInputSessionStatistics(transfers=3, frames=7, payload_bytes=40)
+    ses.close()
+
+
+# noinspection PyProtectedMember
+def _unittest_can_input_session_queue_policies() -> None:
+    from pytest import raises
+    from pyuavcan.transport import InputSessionSpecifier, MessageDataSpecifier, PayloadMetadata, Priority, Timestamp
+
+    loop = asyncio.get_event_loop()
+    await_ = loop.run_until_complete
+
+    ses = CANInputSession(InputSessionSpecifier(MessageDataSpecifier(1234), None),
+                          PayloadMetadata(0, 100),
+                          loop,
+                          lambda: None)
+    assert ses.frame_queue_policy == FrameQueuePolicy.DROP_NEWEST
+    assert ses.frame_queue_reservation == {}
+
+    def push(source_node_id: int, transfer_id: int, sot: bool, eot: bool, priority: Priority = Priority.LOW) -> None:
+        ses._push_frame(_identifier.MessageCANID(priority, source_node_id, 1234),
+                        _frame.TimestampedUAVCANFrame(identifier=0,
+                                                      padded_payload=memoryview(b'abc'),
+                                                      transfer_id=transfer_id,
+                                                      start_of_transfer=sot,
+                                                      end_of_transfer=eot,
+                                                      toggle_bit=True,
+                                                      loopback=False,
+                                                      timestamp=Timestamp.now()))
+
+    def drain() -> typing.List[typing.Tuple[typing.Optional[int], int, Priority]]:
+        out = []
+        while not ses._queue.empty():
+            can_id, frame = ses._queue.get_nowait()     # type: ignore
+            out.append((can_id.source_node_id, frame.transfer_id, can_id.priority))
+        return out
+
+    def dropped() -> typing.Tuple[typing.Dict[FrameQueuePolicy, int], typing.Dict[FrameQueuePolicy, int]]:
+        st = ses.sample_statistics()
+        return st.frames_dropped_per_policy, st.transfers_dropped_per_policy
+
+    # Drop newest.
+    ses.frame_queue_capacity = 3
+    for tid in range(5):
+        push(1, tid, True, True)
+    assert drain() == [(1, 0, Priority.LOW), (1, 1, Priority.LOW), (1, 2, Priority.LOW)]
+    assert dropped()[0][FrameQueuePolicy.DROP_NEWEST] == 2
+    assert dropped()[1][FrameQueuePolicy.DROP_NEWEST] == 2
+    assert ses.sample_statistics().drops == 2
+
+    # Drop oldest; higher-priority items are never evicted by lower-priority ones.
+    ses.frame_queue_policy = FrameQueuePolicy.DROP_OLDEST
+    push(1, 0, True, True, Priority.FAST)
+    for tid in range(1, 5):
+        push(1, tid, True, True)
+    push(2, 0, True, True, Priority.OPTIONAL)   # All queued items have higher priority, so this one is dropped.
+    assert drain() == [(1, 0, Priority.FAST), (1, 3, Priority.LOW), (1, 4, Priority.LOW)]
+    assert dropped()[0][FrameQueuePolicy.DROP_OLDEST] == 3
+    assert dropped()[1][FrameQueuePolicy.DROP_OLDEST] == 3
+
+    # Drop the entire transfer. The second transfer from node 1 does not fit, so its queued frames are removed
+    # and its subsequent frames are dropped as well; the transfers from other nodes are not affected.
+    ses.frame_queue_policy = FrameQueuePolicy.DROP_TRANSFER
+    push(1, 5, True, False)
+    push(1, 5, False, True)
+    push(1, 6, True, False)
+    push(1, 6, False, False)    # Overflow.
+    push(1, 6, False, True)     # Dropped although there is space now.
+    push(2, 0, True, True)
+    assert drain() == [(1, 5, Priority.LOW), (1, 5, Priority.LOW), (2, 0, Priority.LOW)]
+    assert dropped()[0][FrameQueuePolicy.DROP_TRANSFER] == 3
+    assert dropped()[1][FrameQueuePolicy.DROP_TRANSFER] == 1
+    push(1, 6, True, True)      # Same transfer-ID but this is a new transfer.
+    assert drain() == [(1, 6, Priority.LOW)]
+
+    # Per-priority reservation: the low-priority flood cannot occupy the slot reserved for high-priority frames.
+    with raises(ValueError):
+        ses.frame_queue_reservation = {Priority.HIGH: 3}
+    with raises(ValueError):
+        ses.frame_queue_reservation = {Priority.HIGH: -1}
+    ses.frame_queue_policy = FrameQueuePolicy.DROP_NEWEST
+    ses.frame_queue_reservation = {Priority.HIGH: 1}
+    assert ses.frame_queue_reservation == {Priority.HIGH: 1}
+    with raises(ValueError):
+        ses.frame_queue_capacity = 1
+    assert ses.frame_queue_capacity == 3
+    for tid in range(10):
+        push(3, tid, True, True, Priority.SLOW)
+    push(4, 0, True, True, Priority.HIGH)
+    push(4, 1, True, True, Priority.HIGH)
+    assert drain() == [(3, 0, Priority.SLOW), (3, 1, Priority.SLOW), (4, 0, Priority.HIGH)]
+
+    # Shrinking the queue applies the policy.
+    ses.frame_queue_reservation = {}
+    ses.frame_queue_policy = FrameQueuePolicy.DROP_OLDEST
+    for tid in range(3):
+        push(5, tid, True, True)
+    ses.frame_queue_capacity = 1
+    assert drain() == [(5, 2, Priority.LOW)]
+
+    # In the eager mode, the queued items are transfers.
+    ses.eager_reassembly = True
+    before = dropped()
+    push(6, 0, True, True)
+    push(6, 1, True, True)
+    tr = await_(ses.receive_until(0))
+    assert tr is not None and tr.transfer_id == 1
+    assert dropped()[0] == before[0]
+    assert dropped()[1][FrameQueuePolicy.DROP_OLDEST] == before[1][FrameQueuePolicy.DROP_OLDEST] + 1
+    ses.close()
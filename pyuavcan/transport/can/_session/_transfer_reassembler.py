@@ -36,6 +36,14 @@ class TransferReassembler:
         self._payload_truncated = False
         self._fragmented_payload: typing.List[memoryview] = []
 
+    @property
+    def last_activity_monotonic_ns(self) -> int:
+        """
+        Monotonic timestamp of the last accepted transfer (or the one being reassembled); zero if there were none.
+        The transfer-ID timeout is measured from this point.
+        """
+        return self._timestamp.monotonic_ns
+
     def process_frame(self,
                       priority:               pyuavcan.transport.Priority,
                       frame:                  _frame.TimestampedUAVCANFrame,
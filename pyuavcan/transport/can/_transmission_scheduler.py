@@ -0,0 +1,130 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from __future__ import annotations
+import heapq
+import typing
+import asyncio
+import itertools
+
+
+class TransmissionScheduler:
+    """
+    Grants exclusive access to the media to one transmitter at a time.
+    Unlike a regular lock, which is served in the FIFO order, pending transmitters are served in the order of
+    their CAN ID values, which is the order in which their frames would win the bus arbitration.
+    Transmitters with equal CAN ID values are served in the FIFO order, which guarantees that frames of
+    different transfers of the same session are never interleaved.
+
+    A transmitter that holds the media should check :meth:`is_preempted` periodically and relinquish the media
+    if a higher-priority transmitter is waiting; it can then continue by acquiring the media again with the same key.
+    """
+
+    Key = typing.Tuple[int, int]
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._busy = False
+        self._waiters: typing.List[typing.Tuple[TransmissionScheduler.Key, asyncio.Future[bool]]] = []
+        self._sequence_counter = itertools.count()
+
+    def make_key(self, can_identifier: int) -> TransmissionScheduler.Key:
+        """
+        The key shall be retained by the transmitter until its transfer is sent completely,
+        otherwise the ordering guarantees are lost.
+        """
+        return can_identifier, next(self._sequence_counter)
+
+    async def acquire(self, key: TransmissionScheduler.Key, monotonic_deadline: float) -> bool:
+        """
+        Returns True when the media is acquired; the caller shall then invoke :meth:`release` when done.
+        Returns False if the media could not be acquired before the deadline.
+        If the media is not busy, it is acquired immediately regardless of the deadline.
+        """
+        if not self._busy:
+            assert not self._waiters
+            self._busy = True
+            return True
+
+        future: asyncio.Future[bool] = self._loop.create_future()
+        heapq.heappush(self._waiters, (key, future))
+        timer = self._loop.call_at(monotonic_deadline, lambda: None if future.done() else future.set_result(False))
+        try:
+            return await future
+        except BaseException:
+            if future.done() and not future.cancelled() and future.result():
+                self.release()      # The media has been granted right before the cancellation; pass it on.
+            raise
+        finally:
+            timer.cancel()
+
+    def release(self) -> None:
+        assert self._busy, 'Internal protocol violation: the media is not acquired'
+        while self._waiters:
+            _, future = heapq.heappop(self._waiters)
+            if not future.done():       # Skip those who gave up waiting.
+                future.set_result(True)
+                return
+        self._busy = False
+
+    def is_preempted(self, key: TransmissionScheduler.Key) -> bool:
+        """
+        True if there is a pending transmitter whose CAN ID value is lower (i.e., priority is higher).
+        """
+        while self._waiters and self._waiters[0][1].done():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters) and self._waiters[0][0][0] < key[0]
+
+
+def _unittest_can_transmission_scheduler() -> None:
+    loop = asyncio.get_event_loop()
+    await_ = loop.run_until_complete
+    sch = TransmissionScheduler(loop)
+    log: typing.List[int] = []
+
+    async def transmit(can_identifier: int, timeout: float = 1.0) -> bool:
+        key = sch.make_key(can_identifier)
+        if not await sch.acquire(key, loop.time() + timeout):
+            return False
+        try:
+            log.append(can_identifier)
+            await asyncio.sleep(0.01)
+        finally:
+            sch.release()
+        return True
+
+    async def scenario() -> None:
+        assert await transmit(500)
+        assert log == [500]
+        log.clear()
+
+        # The first one acquires the media immediately; the rest are served by CAN ID, then FIFO.
+        key = sch.make_key(1000)
+        assert await sch.acquire(key, 0)
+        assert not sch.is_preempted(key)
+        tasks = [loop.create_task(transmit(x)) for x in (300, 200, 200, 100, 2000)]
+        timed_out = loop.create_task(transmit(50, 0.0))
+        await asyncio.sleep(0.01)
+        assert sch.is_preempted(key)
+        assert not await timed_out
+        sch.release()
+        assert all(await asyncio.gather(*tasks))
+        assert log == [100, 200, 200, 300, 2000]
+        log.clear()
+
+        # Cancellation of a pending acquisition does not break the queue.
+        assert await sch.acquire(key, 0)
+        cancelled = loop.create_task(transmit(10))
+        normal = loop.create_task(transmit(20))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        sch.release()
+        assert await normal
+        assert log == [20]
+        assert await sch.acquire(sch.make_key(0), 0)        # Not busy anymore.
+        sch.release()
+
+    await_(scenario())
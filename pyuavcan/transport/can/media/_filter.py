@@ -6,8 +6,8 @@
 
 from __future__ import annotations
 import typing
-import itertools
 import dataclasses
+import numpy
 from ._frame import FrameFormat
 
 
@@ -98,21 +98,80 @@ def optimize_filter_configurations(configurations: typing.Iterable[FilterConfigu
     The function returns the input set unchanged in this case.
     If the target number of configurations is not positive, a ValueError is raised.
 
-    The time complexity of this implementation is ``O(K!)``; it should be optimized.
+    The algorithm is greedy: at every step, the pair of configurations whose merge product has the highest rank
+    is merged; ties are resolved in favor of the pair that occurs earlier in the input sequence.
+    For every configuration, the best merge partner among the configurations that follow it is cached along with
+    the rank of the product; after a merge, only the cache entries that involve the merged pair are recomputed.
+    The rank computations are vectorized. The time complexity is ``O(K^2)`` in the typical case.
     """
     if target_number_of_configurations < 1:
         raise ValueError(f'The number of configurations must be positive; found {target_number_of_configurations}')
 
     configurations = list(configurations)
-    while len(configurations) > target_number_of_configurations:
-        options = itertools.starmap(lambda ia, ib: (ia[0], ib[0], ia[1].merge(ib[1])),
-                                    itertools.permutations(enumerate(configurations), 2))
-        index_replace, index_remove, merged = max(options, key=lambda x: x[2].rank)
+    if len(configurations) <= target_number_of_configurations:
+        return configurations
+
+    identifiers = numpy.array([x.identifier for x in configurations], dtype=numpy.int64)
+    masks = numpy.array([x.mask for x in configurations], dtype=numpy.int64)
+    formats = numpy.array([int(x.format) if x.format is not None else 0 for x in configurations], dtype=numpy.int64)
+    alive = numpy.ones(len(configurations), dtype=bool)
+
+    def compute_merge_ranks(index: int, others: numpy.ndarray) -> numpy.ndarray:
+        # This is equivalent to FilterConfiguration.rank of FilterConfiguration.merge() but vectorized.
+        fmt = numpy.where(formats[others] == formats[index], formats[index], 0)
+        bit_length = numpy.where(fmt == 0, int(max(FrameFormat)), fmt)
+        mask = masks[index] & masks[others] & ~(identifiers[index] ^ identifiers[others])
+        mask &= (numpy.int64(1) << bit_length) - 1
+        return _popcount(mask) - numpy.where(fmt == 0, bit_length, 0)
+
+    best_rank = numpy.full(len(configurations), _NO_RANK, dtype=numpy.int64)
+    best_partner = numpy.full(len(configurations), -1, dtype=numpy.int64)
+
+    def update_best(index: int) -> None:
+        others = numpy.flatnonzero(alive[index + 1:]) + index + 1
+        if len(others) > 0:
+            ranks = compute_merge_ranks(index, others)
+            position = int(numpy.argmax(ranks))     # The first maximum is the earliest partner.
+            best_rank[index], best_partner[index] = ranks[position], others[position]
+        else:
+            best_rank[index], best_partner[index] = _NO_RANK, -1
+
+    for idx in range(len(configurations)):
+        update_best(idx)
+
+    for _ in range(len(configurations) - target_number_of_configurations):
+        index_replace = int(numpy.argmax(best_rank))    # The first maximum is the earliest pair.
+        index_remove = int(best_partner[index_replace])
+        assert alive[index_replace] and alive[index_remove] and index_replace < index_remove
+
+        merged = configurations[index_replace].merge(configurations[index_remove])
         configurations[index_replace] = merged
-        del configurations[index_remove]  # Invalidates indexes
+        identifiers[index_replace], masks[index_replace] = merged.identifier, merged.mask
+        formats[index_replace] = int(merged.format) if merged.format is not None else 0
+        alive[index_remove] = False
+        best_rank[index_remove], best_partner[index_remove] = _NO_RANK, -1
 
-    assert all(map(lambda x: isinstance(x, FilterConfiguration), configurations))
-    return configurations
+        # Merging never increases the rank of any pair involving the product, so the cached best partners of
+        # the other configurations remain valid unless they point to one of the merged configurations.
+        update_best(index_replace)
+        stale = (best_partner == index_replace) | (best_partner == index_remove)
+        for idx in numpy.flatnonzero(stale & alive):
+            update_best(int(idx))
+
+    out = [c for c, a in zip(configurations, alive) if a]
+    assert len(out) == target_number_of_configurations
+    assert all(map(lambda x: isinstance(x, FilterConfiguration), out))
+    return out
+
+
+def _popcount(values: numpy.ndarray) -> numpy.ndarray:
+    octets = values.astype('<u4').view(numpy.uint8).reshape(-1, 4)     # CAN identifiers are at most 29 bits wide.
+    return _POPCOUNT_TABLE[octets].sum(axis=1, dtype=numpy.int64)
+
+
+_POPCOUNT_TABLE = numpy.array([bin(x).count('1') for x in range(256)], dtype=numpy.int64)
+
+_NO_RANK = -(2 ** 32)  # Lower than any real rank.
 
 
 def _unittest_can_media_filter_faults() -> None:
@@ -162,3 +221,58 @@ def _unittest_can_media_filter_merge() -> None:
 
     assert FilterConfiguration(0b111, 0b111, FrameFormat.EXTENDED).merge(
         FilterConfiguration(0b111, 0b111, FrameFormat.BASE)).rank == -29 + 3
+
+
+def _unittest_can_media_filter_optimization_equivalence() -> None:
+    """
+    Validates the optimizer against the straightforward greedy algorithm which tries every pair at every step.
+    """
+    import random
+    import itertools
+
+    def reference(configurations: typing.List[FilterConfiguration], target: int) -> typing.List[FilterConfiguration]:
+        configurations = list(configurations)
+        while len(configurations) > target:
+            options = itertools.starmap(lambda ia, ib: (ia[0], ib[0], ia[1].merge(ib[1])),
+                                        itertools.permutations(enumerate(configurations), 2))
+            index_replace, index_remove, merged = max(options, key=lambda x: x[2].rank)
+            configurations[index_replace] = merged
+            del configurations[index_remove]
+        return configurations
+
+    def make_random() -> FilterConfiguration:
+        fmt = random.choice([FrameFormat.EXTENDED, FrameFormat.EXTENDED, FrameFormat.BASE, None])
+        bit_length = int(fmt or max(FrameFormat))
+        identifier = random.getrandbits(bit_length)
+        mask = random.getrandbits(bit_length) | random.getrandbits(bit_length)
+        return FilterConfiguration(identifier=identifier & mask, mask=mask, format=fmt)
+
+    random.seed(1234)
+    for _ in range(100):
+        configurations = [make_random() for _ in range(random.randint(1, 24))]
+        target = random.randint(1, len(configurations) + 1)
+        assert list(optimize_filter_configurations(configurations, target)) == reference(configurations, target)
+
+    # Many identical ranks to exercise tie resolution.
+    configurations = [FilterConfiguration(x << 8, 0xFFFF << 8, FrameFormat.EXTENDED) for x in range(20)]
+    for target in range(1, 21):
+        assert list(optimize_filter_configurations(configurations, target)) == reference(configurations, target)
+
+
+def _unittest_slow_can_media_filter_optimization_benchmark() -> None:
+    import time
+    import random
+
+    random.seed(4321)
+    for num_subjects in (100, 300, 1000, 3000):
+        configurations = [
+            FilterConfiguration(identifier=sid << 8, mask=(0xFFFF << 8) | (1 << 25) | (1 << 23) | (1 << 7),
+                                format=FrameFormat.EXTENDED)
+            for sid in sorted(random.sample(range(2 ** 15), num_subjects))
+        ]
+        for num_filters in (1, 8, 64):
+            started_at = time.perf_counter()
+            out = optimize_filter_configurations(configurations, num_filters)
+            elapsed = time.perf_counter() - started_at
+            assert len(out) == num_filters
+            print(f'{num_subjects:5d} subjects onto {num_filters:2d} filters: {elapsed * 1e3:8.1f} ms')
@@ -19,7 +19,11 @@ class FrameFormat(enum.IntEnum):
 @dataclasses.dataclass(frozen=True)
 class DataFrame:
     identifier: int
-    data:       bytearray
+    data:       typing.Union[bytearray, memoryview]
+    """
+    Received frames may reference the receive buffer of the media driver directly to avoid copying;
+    such data shall not be modified.
+    """
     format:     FrameFormat
     loopback:   bool
     """Loopback request for outgoing frames; loopback indicator for received frames."""
@@ -129,6 +133,12 @@ def _unittest_can_media_frame() -> None:
     with raises(ValueError):
         DataFrame(123, bytearray(b'a' * 9), FrameFormat.EXTENDED, True)
 
+    buffer = memoryview(bytearray(b'\x00Hello\x00'))
+    assert DataFrame(123, buffer[1:-1], FrameFormat.EXTENDED, False).is_same_manifestation(
+        DataFrame(123, bytearray(b'Hello'), FrameFormat.EXTENDED, False)
+    )
+    assert str(DataFrame(123, buffer[1:-1], FrameFormat.BASE, False)) == "0x07b  48 65 6c 6c 6f  'Hello'"
+
     with raises(ValueError):
         DataFrame.convert_dlc_to_length(16)
 
@@ -4,9 +4,13 @@
 # Author: Pavel Kirienko <pavel.kirienko@zubax.com>
 #
 
+import time
 import typing
-import logging
 import asyncio
+import logging
+import threading
+import concurrent.futures
+import pyuavcan.transport
 import pyuavcan.transport.can.media as _media
 
 
@@ -15,43 +19,256 @@ _logger = logging.getLogger(__name__)
 
 class PythonCANMedia(_media.Media):
     """
-    A media interface adapter for `python-can <https://github.com/hardbyte/python-can>`_.
-    This is a stub, the implementation is missing. Please submit patches!
+    A media interface adapter for `python-can <https://github.com/hardbyte/python-can>`_,
+    which supports a wide variety of CAN adapters such as PCAN, Kvaser, IXXAT, Vector, SLCAN, and more.
+    The python-can package is an optional dependency; it is imported when the first instance is created
+    (install the ``transport_can_pythoncan`` extra to get it).
+
+    The bus is read by a dedicated thread which passes the received frames over to the event loop in batches.
+    Acceptance filters are mapped onto python-can filters; python-can implements them in software if the adapter
+    does not support hardware filtering.
+
+    Since python-can does not provide a way to request the loopback for individual frames,
+    the loopback is emulated: a loopback frame is delivered once the frame is handed over to the adapter.
+    Emulated loopback frames are not subject to acceptance filtering.
+
+    Received frames are timestamped when they are retrieved from python-can instead of using the
+    timestamps reported by the adapter, because the epoch of the latter differs between adapters.
     """
 
-    def __init__(self) -> None:
-        raise NotImplementedError
+    def __init__(self,
+                 iface_name: str,
+                 mtu:        int,
+                 bitrate:    typing.Optional[int] = None,
+                 loop:       typing.Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        :param iface_name: Interface name consisting of the python-can interface name and the channel name separated
+            by a colon; e.g., ``pcan:PCAN_USBBUS1``, ``kvaser:0``, ``slcan:/dev/ttyACM0``, ``virtual:bus0``.
+
+        :param mtu: The maximum data field size in bytes. CAN FD is used if this value > 8, Classic CAN otherwise.
+            This value must belong to Media.VALID_MTU_SET.
+
+        :param bitrate: The bit rate to configure the adapter with, if supported by the python-can interface.
+            If not specified, the adapter is used with its current configuration.
+
+        :param loop: The event loop to use. Defaults to :func:`asyncio.get_event_loop`.
+        """
+        import can
+
+        self._mtu = int(mtu)
+        if self._mtu not in self.VALID_MTU_SET:
+            raise ValueError(f'Invalid MTU: {self._mtu} not in {self.VALID_MTU_SET}')
+
+        self._iface_name = str(iface_name)
+        try:
+            interface, channel = self._iface_name.split(':', 1)
+        except ValueError:
+            raise ValueError(f'Interface name {self._iface_name!r} does not match the format interface:channel') \
+                from None
+
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._is_fd = self._mtu > 8
+
+        kwargs: typing.Dict[str, typing.Any] = {}
+        if bitrate is not None:
+            kwargs['bitrate'] = int(bitrate)
+        if self._is_fd:
+            kwargs['fd'] = True
+        self._bus = can.Bus(channel=channel, bustype=interface, **kwargs)
+        self._closed = False
+        self._maybe_thread: typing.Optional[threading.Thread] = None
+        self._maybe_handler: typing.Optional[_media.Media.ReceivedFramesHandler] = None
+        # The adapter is accessed from one worker thread to keep the frames ordered and to avoid blocking the loop.
+        self._tx_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._configure_filters([])     # Ignore all frames until explicitly requested otherwise.
+
+        super(PythonCANMedia, self).__init__()
 
     @property
     def loop(self) -> asyncio.AbstractEventLoop:
-        raise NotImplementedError
+        return self._loop
 
     @property
     def interface_name(self) -> str:
-        raise NotImplementedError
+        return self._iface_name
 
     @property
     def mtu(self) -> int:
-        raise NotImplementedError
+        return self._mtu
 
     @property
     def number_of_acceptance_filters(self) -> int:
-        raise NotImplementedError
+        """
+        python-can does not report the filtering capabilities of the adapter,
+        and it falls back to software filtering if the hardware is not capable enough, so this is an arbitrary value.
+        """
+        return _NUMBER_OF_ACCEPTANCE_FILTERS
 
     def start(self, handler: _media.Media.ReceivedFramesHandler, no_automatic_retransmission: bool) -> None:
-        raise NotImplementedError
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        if self._maybe_thread is not None:
+            raise RuntimeError('The RX frame handler is already set up')
+        self._maybe_handler = handler
+        self._maybe_thread = threading.Thread(target=self._thread_function,
+                                              name=str(self),
+                                              args=(handler,),
+                                              daemon=True)
+        self._maybe_thread.start()
+        if no_automatic_retransmission:
+            _logger.info('%s non-automatic retransmission is not supported', self)
 
     def configure_acceptance_filters(self, configuration: typing.Sequence[_media.FilterConfiguration]) -> None:
-        _logger.warning('%s FIXME: acceptance filter configuration is not yet implemented; please submit patches! '
-                        'Requested configuration: %s',
-                        self, ', '.join(map(str, configuration)))
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        self._configure_filters(configuration)
 
     async def send_until(self, frames: typing.Iterable[_media.DataFrame], monotonic_deadline: float) -> int:
-        raise NotImplementedError
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        batch = list(frames)
+        # The worker thread uses the monotonic clock, which may differ from the clock of the event loop.
+        deadline = time.monotonic() + (monotonic_deadline - self._loop.time())
+        num_sent = await self._loop.run_in_executor(self._tx_executor, self._send_batch, batch, deadline)
+
+        loopback = [x for x in batch[:num_sent] if x.loopback]
+        if loopback and self._maybe_handler is not None:
+            timestamp = pyuavcan.transport.Timestamp.now()
+            self._deliver(self._maybe_handler, [
+                _media.TimestampedDataFrame(identifier=f.identifier,
+                                            data=f.data,
+                                            format=f.format,
+                                            loopback=True,
+                                            timestamp=timestamp)
+                for f in loopback
+            ])
+        return num_sent
 
     def close(self) -> None:
-        raise NotImplementedError
+        """
+        The bus is shut down only after the pending transmission and the reader thread are finished,
+        because some python-can backends fail at the native level if the bus is used after shutdown.
+        Hence, this method may block for up to the duration of one frame transmission or one receive timeout.
+        """
+        if not self._closed:
+            self._closed = True
+            self._tx_executor.shutdown(wait=True)   # The closed flag stops the worker after the current frame.
+            thread = self._maybe_thread
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=_THREAD_JOIN_TIMEOUT)
+                if thread.is_alive():   # pragma: no cover
+                    _logger.error('%s the reader thread did not exit in %.1f seconds; shutting down the bus anyway',
+                                  self, _THREAD_JOIN_TIMEOUT)
+            self._bus.shutdown()
 
     @staticmethod
     def list_available_interface_names() -> typing.Iterable[str]:
-        raise NotImplementedError
+        """
+        Uses the python-can interface detection; the output depends on the installed adapter drivers.
+        """
+        try:
+            import can
+            return [f'{x["interface"]}:{x["channel"]}' for x in can.detect_available_configs()]
+        except Exception as ex:
+            _logger.info('Could not detect the available python-can interfaces: %s', ex, exc_info=True)
+            return []
+
+    def _configure_filters(self, configuration: typing.Sequence[_media.FilterConfiguration]) -> None:
+        filters: typing.List[typing.Dict[str, typing.Any]] = []
+        for f in configuration:
+            d: typing.Dict[str, typing.Any] = {'can_id': f.identifier, 'can_mask': f.mask}
+            if f.format is not None:    # Per python-can docs, if the key is omitted, both formats are accepted.
+                d['extended'] = f.format == _media.FrameFormat.EXTENDED
+            filters.append(d)
+        if not filters:
+            # An empty set of filters means that all frames are accepted; accept (almost) nothing instead.
+            filters.append({'can_id': 0, 'can_mask': 2 ** int(_media.FrameFormat.EXTENDED) - 1, 'extended': False})
+        self._bus.set_filters(filters)
+
+    def _send_batch(self, frames: typing.Sequence[_media.DataFrame], monotonic_deadline: float) -> int:
+        import can
+
+        num_sent = 0
+        for f in frames:
+            timeout = monotonic_deadline - time.monotonic()
+            if self._closed or timeout <= 0:
+                break
+            message = can.Message(arbitration_id=f.identifier,
+                                  is_extended_id=f.format == _media.FrameFormat.EXTENDED,
+                                  data=f.data,
+                                  is_fd=self._is_fd,
+                                  bitrate_switch=self._is_fd)
+            try:
+                self._bus.send(message, timeout=timeout)
+            except can.CanError as ex:
+                _logger.info('%s could not send %s: %s', self, f, ex)
+                break
+            num_sent += 1
+        return num_sent
+
+    def _deliver(self,
+                 handler: _media.Media.ReceivedFramesHandler,
+                 frames:  typing.Sequence[_media.TimestampedDataFrame]) -> None:
+        try:
+            if not self._closed:  # Don't call after closure to prevent race conditions and use-after-close.
+                handler(frames)
+        except Exception as exc:
+            _logger.exception('%s unhandled exception in the receive handler: %s; lost frames: %s', self, exc, frames)
+
+    def _read_batch(self) -> typing.List[_media.TimestampedDataFrame]:
+        """
+        Blocks until at least one frame is received or the timeout has expired,
+        then takes all frames that are immediately available without blocking.
+        """
+        frames: typing.List[_media.TimestampedDataFrame] = []
+        timeout = _RECEIVE_TIMEOUT
+        while len(frames) < _MAX_FRAMES_PER_BATCH:
+            message = self._bus.recv(timeout=timeout)
+            if message is None:
+                break
+            timeout = 0
+            if message.is_error_frame or message.is_remote_frame:
+                continue
+            try:
+                frames.append(_media.TimestampedDataFrame(
+                    identifier=message.arbitration_id,
+                    data=message.data,
+                    format=_media.FrameFormat.EXTENDED if message.is_extended_id else _media.FrameFormat.BASE,
+                    loopback=False,
+                    timestamp=pyuavcan.transport.Timestamp.now(),
+                ))
+            except ValueError as ex:
+                _logger.info('%s dropping invalid frame %s: %s', self, message, ex)
+        return frames
+
+    def _thread_function(self, handler: _media.Media.ReceivedFramesHandler) -> None:
+        # The batches that arrive before the event loop gets around to processing them are delivered in one go.
+        dispatcher: pyuavcan.transport.commons.CoalescingDispatcher[typing.Sequence[_media.TimestampedDataFrame]] = \
+            pyuavcan.transport.commons.CoalescingDispatcher(self._loop, lambda frames: self._deliver(handler, frames))
+        while not self._closed:
+            try:
+                frames = self._read_batch()
+                if len(frames) > 0:
+                    dispatcher.dispatch(frames)
+            except Exception as ex:
+                if self._closed:
+                    break
+                _logger.exception('%s thread failure: %s', self, ex)
+                time.sleep(1)       # Is this an adequate failure management strategy?
+
+        _logger.info('%s thread is about to exit', self)
+
+
+_NUMBER_OF_ACCEPTANCE_FILTERS = 64
+
+_MAX_FRAMES_PER_BATCH = 1000
+
+_RECEIVE_TIMEOUT = 0.1
+"""
+The reader thread wakes up at least this often [second] to check whether the instance is closed.
+"""
+
+_THREAD_JOIN_TIMEOUT = 5.0
+"""
+How long to wait for the reader thread to exit when closing [second]; normally it takes up to the receive timeout.
+"""
@@ -33,7 +33,11 @@ class SocketCANMedia(_media.Media):
 
     SocketCAN documentation: https://www.kernel.org/doc/Documentation/networking/can.txt
     """
-    def __init__(self, iface_name: str, mtu: int, loop: typing.Optional[asyncio.AbstractEventLoop] = None) -> None:
+    def __init__(self,
+                 iface_name:    str,
+                 mtu:           int,
+                 loop:          typing.Optional[asyncio.AbstractEventLoop] = None,
+                 reader_thread: bool = True) -> None:
         """
         CAN Classic/FD is selected automatically based on the MTU. It is not possible to use CAN FD with MTU of 8 bytes.
 
@@ -43,6 +47,16 @@ class SocketCANMedia(_media.Media):
             This value must belong to Media.VALID_MTU_SET.
 
         :param loop: The event loop to use. Defaults to :func:`asyncio.get_event_loop`.
+
+        :param reader_thread: If True (default), the socket is read from a dedicated thread which passes the received
+            frames over to the event loop. If False, the socket is registered with the event loop using
+            :meth:`asyncio.AbstractEventLoop.add_reader` and is drained directly by the event loop whenever it becomes
+            readable; this avoids the cross-thread hand-off of every batch of frames and the GIL contention with
+            the reader thread, but it requires an event loop that supports ``add_reader()`` (any selector-based
+            loop does). The latter mode sustains a higher reception throughput, but the reception is delayed
+            if the event loop is blocked; the typical latency is similar in both modes.
+            The modes can be compared on the target system using ``_unittest_can_socketcan_io_modes``
+            in the test suite, which prints the latency and the throughput.
         """
         self._mtu = int(mtu)
         if self._mtu not in self.VALID_MTU_SET:
@@ -61,9 +75,21 @@ class SocketCANMedia(_media.Media):
         self._sock = _make_socket(iface_name, can_fd=self._is_fd)
         self._closed = False
         self._maybe_thread: typing.Optional[threading.Thread] = None
+        self._reader_thread = bool(reader_thread)
+        self._maybe_reader_fd: typing.Optional[int] = None
         self._loopback_enabled = False
 
-        self._ancillary_data_buffer_size = socket.CMSG_SPACE(_TIMEVAL_STRUCT.size)  # Used for recvmsg()
+        self._ancillary_data_buffer_size = socket.CMSG_SPACE(_TIMESPEC_STRUCT.size)  # Used for recvmsg_into()
+
+        # Received frames are read directly into a preallocated slab of memory, one frame slot at a time.
+        # The data of the received frames references the slab instead of being copied out of it, so the slab
+        # cannot be recycled like a ring buffer because the frames may be retained by the transport indefinitely.
+        # Instead, once the slab is exhausted, a new one is allocated, and the old one is deallocated as soon as
+        # the last frame that references it is gone. Accessed only from the thread that reads the socket.
+        self._rx_slab = memoryview(bytearray())
+        self._rx_slab_offset = 0
+
+        self._tx_buffer: typing.Optional[bytearray] = None
 
         super(SocketCANMedia, self).__init__()
 
@@ -90,16 +116,21 @@ class SocketCANMedia(_media.Media):
         return 512
 
     def start(self, handler: _media.Media.ReceivedFramesHandler, no_automatic_retransmission: bool) -> None:
-        if self._maybe_thread is None:
+        if self._maybe_thread is not None or self._maybe_reader_fd is not None:
+            raise RuntimeError('The RX frame handler is already set up')
+
+        if self._reader_thread:
             self._maybe_thread = threading.Thread(target=self._thread_function,
                                                   name=str(self),
                                                   args=(handler,),
                                                   daemon=True)
             self._maybe_thread.start()
-            if no_automatic_retransmission:
-                _logger.info('%s non-automatic retransmission is not supported', self)
         else:
-            raise RuntimeError('The RX frame handler is already set up')
+            self._maybe_reader_fd = self._sock.fileno()
+            self._loop.add_reader(self._maybe_reader_fd, self._on_readable, handler)
+
+        if no_automatic_retransmission:
+            _logger.info('%s non-automatic retransmission is not supported', self)
 
     def configure_acceptance_filters(self, configuration: typing.Sequence[_media.FilterConfiguration]) -> None:
         if self._closed:
@@ -109,33 +140,91 @@ class SocketCANMedia(_media.Media):
                      self, ', '.join(map(str, configuration)))
 
     async def send_until(self, frames: typing.Iterable[_media.DataFrame], monotonic_deadline: float) -> int:
-        num_sent = 0
-        for f in frames:
-            if self._closed:
-                raise pyuavcan.transport.ResourceClosedError(repr(self))
-            self._set_loopback_enabled(f.loopback)
-            try:
-                await asyncio.wait_for(self._loop.sock_sendall(self._sock, self._compile_native_frame(f)),
-                                       timeout=monotonic_deadline - self._loop.time(),
-                                       loop=self._loop)
-            except asyncio.TimeoutError:
-                break
-            else:
-                num_sent += 1
+        """
+        All frames are compiled into one buffer and written into the socket synchronously while it accepts them.
+        Only if the socket buffer is full, the remaining frames are written one by one as the socket becomes
+        writable again, until the deadline.
+        Nothing is sent if the deadline is already in the past.
+        """
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        if monotonic_deadline - self._loop.time() <= 0:
+            return 0
+        batch = list(frames)
+        buffer = self._acquire_tx_buffer(len(batch) * self._native_frame_size)
+        try:
+            self._compile_native_frames(batch, buffer)
+            num_sent = self._send_while_possible(batch, buffer, 0)
+            if num_sent < len(batch):
+                async def send_remaining() -> None:
+                    nonlocal num_sent
+                    while num_sent < len(batch):
+                        if self._closed:
+                            raise pyuavcan.transport.ResourceClosedError(repr(self))
+                        await self._send_one_when_possible(batch[num_sent], self._get_native_frame(buffer, num_sent))
+                        num_sent = self._send_while_possible(batch, buffer, num_sent + 1)
+
+                try:
+                    await asyncio.wait_for(send_remaining(),
+                                           timeout=monotonic_deadline - self._loop.time(),
+                                           loop=self._loop)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._release_tx_buffer(buffer)
         return num_sent
 
     def close(self) -> None:
         self._closed = True
+        self._remove_reader()
         self._sock.close()
 
-    def _thread_function(self, handler: _media.Media.ReceivedFramesHandler) -> None:
-        def handler_wrapper(frs: typing.Sequence[_media.TimestampedDataFrame]) -> None:
-            try:
-                if not self._closed:  # Don't call after closure to prevent race conditions and use-after-close.
-                    handler(frs)
-            except Exception as exc:
-                _logger.exception('%s unhandled exception in the receive handler: %s; lost frames: %s', self, exc, frs)
+    def _deliver(self,
+                 handler: _media.Media.ReceivedFramesHandler,
+                 frames:  typing.Sequence[_media.TimestampedDataFrame]) -> None:
+        try:
+            if not self._closed:  # Don't call after closure to prevent race conditions and use-after-close.
+                handler(frames)
+        except Exception as exc:
+            _logger.exception('%s unhandled exception in the receive handler: %s; lost frames: %s', self, exc, frames)
+
+    def _read_batch(self) -> typing.List[_media.TimestampedDataFrame]:
+        """
+        Reads the frames that are available in the socket without blocking.
+        The number of frames per batch is limited to keep the event loop responsive under high load;
+        the remaining frames will be read at the next invocation.
+        """
+        ts_mono_ns = time.monotonic_ns()
+        frames: typing.List[_media.TimestampedDataFrame] = []
+        try:
+            while len(frames) < _MAX_FRAMES_PER_BATCH:
+                frames.append(self._read_frame(ts_mono_ns))
+        except OSError as ex:
+            if ex.errno != errno.EAGAIN:
+                raise
+        return frames
+
+    def _on_readable(self, handler: _media.Media.ReceivedFramesHandler) -> None:
+        try:
+            frames = self._read_batch()
+        except Exception as ex:
+            if not self._closed:
+                _logger.exception('%s input/output error; stopping: %s', self, ex)
+            self._closed = True
+            self._remove_reader()
+        else:
+            if len(frames) > 0:
+                self._deliver(handler, frames)
+
+    def _remove_reader(self) -> None:
+        fd, self._maybe_reader_fd = self._maybe_reader_fd, None
+        if fd is not None:
+            self._loop.remove_reader(fd)
 
+    def _thread_function(self, handler: _media.Media.ReceivedFramesHandler) -> None:
+        # The batches that arrive before the event loop gets around to processing them are delivered in one go.
+        dispatcher: pyuavcan.transport.commons.CoalescingDispatcher[typing.Sequence[_media.TimestampedDataFrame]] = \
+            pyuavcan.transport.commons.CoalescingDispatcher(self._loop, lambda frames: self._deliver(handler, frames))
         while not self._closed:
             try:
                 select_timeout = 1.0
@@ -143,16 +232,9 @@ class SocketCANMedia(_media.Media):
                 # We don't check the return values because it is guaranteed by design that on a properly functioning
                 # bus we'll always be getting >=1 frame per second. If this expectation is violated, we'll simply
                 # abort the read on EAGAIN, no big deal.
-                ts_mono_ns = time.monotonic_ns()
-                frames: typing.List[_media.TimestampedDataFrame] = []
-                try:
-                    while True:
-                        frames.append(self._read_frame(ts_mono_ns))
-                except OSError as ex:
-                    if ex.errno != errno.EAGAIN:
-                        raise
+                frames = self._read_batch()
                 if len(frames) > 0:
-                    self._loop.call_soon_threadsafe(handler_wrapper, frames)
+                    dispatcher.dispatch(frames)
             except OSError as ex:
                 if not self._closed:
                     _logger.exception('%s thread input/output error; stopping: %s', self, ex)
@@ -167,42 +249,97 @@ class SocketCANMedia(_media.Media):
 
     def _read_frame(self, ts_mono_ns: int) -> _media.TimestampedDataFrame:
         while True:
-            data, ancdata, msg_flags, _addr = self._sock.recvmsg(self._native_frame_size,
-                                                                 self._ancillary_data_buffer_size)
+            if self._rx_slab_offset + self._native_frame_size > len(self._rx_slab):
+                self._rx_slab = memoryview(bytearray(self._native_frame_size * _RX_SLAB_CAPACITY))
+                self._rx_slab_offset = 0
+            slot = self._rx_slab[self._rx_slab_offset:self._rx_slab_offset + self._native_frame_size]
+            size, ancdata, msg_flags, _addr = self._sock.recvmsg_into((slot,), self._ancillary_data_buffer_size)
             assert msg_flags & socket.MSG_TRUNC == 0, 'The data buffer is not large enough'
             assert msg_flags & socket.MSG_CTRUNC == 0, 'The ancillary data buffer is not large enough'
 
             loopback = bool(msg_flags & socket.MSG_CONFIRM)
             ts_system_ns = 0
             for cmsg_level, cmsg_type, cmsg_data in ancdata:
-                if cmsg_level == socket.SOL_SOCKET and cmsg_type == _SO_TIMESTAMP:
-                    sec, usec = _TIMEVAL_STRUCT.unpack(cmsg_data)
-                    ts_system_ns = (sec * 1_000_000 + usec) * 1000
+                if cmsg_level == socket.SOL_SOCKET and cmsg_type == _SO_TIMESTAMPNS:
+                    sec, nsec = _TIMESPEC_STRUCT.unpack(cmsg_data)
+                    ts_system_ns = sec * 1_000_000_000 + nsec
                 else:
                     assert False, f'Unexpected ancillary data: {cmsg_level}, {cmsg_type}, {cmsg_data!r}'
 
             assert ts_system_ns > 0, 'Missing the timestamp; does the driver support timestamping?'
             timestamp = pyuavcan.transport.Timestamp(system_ns=ts_system_ns, monotonic_ns=ts_mono_ns)
 
-            out = SocketCANMedia._parse_native_frame(data, loopback=loopback, timestamp=timestamp)
+            out = SocketCANMedia._parse_native_frame(slot[:size], loopback=loopback, timestamp=timestamp)
             if out is not None:
+                self._rx_slab_offset += self._native_frame_size   # The slot is now referenced by the frame.
                 return out
 
-    def _compile_native_frame(self, source: _media.DataFrame) -> bytes:
+    def _acquire_tx_buffer(self, size: int) -> bytearray:
+        # The buffer is shared between calls; a new one is allocated only if it is too small or is being used
+        # by a concurrent call that is waiting for the socket to become writable.
+        buffer, self._tx_buffer = self._tx_buffer, None
+        if buffer is None or len(buffer) < size:
+            buffer = bytearray(size)
+        return buffer
+
+    def _release_tx_buffer(self, buffer: bytearray) -> None:
+        if self._tx_buffer is None or len(self._tx_buffer) < len(buffer):
+            self._tx_buffer = buffer
+
+    def _compile_native_frames(self, frames: typing.Sequence[_media.DataFrame], buffer: bytearray) -> None:
         flags = _CANFD_BRS if self._is_fd else 0
-        ident = source.identifier | (_CAN_EFF_FLAG if source.format == _media.FrameFormat.EXTENDED else 0)
-        header = _FRAME_HEADER_STRUCT.pack(ident, len(source.data), flags)
-        out = header + source.data.ljust(self._native_frame_data_capacity, b'\x00')
-        assert len(out) == self._native_frame_size
-        return out
+        header_size = _FRAME_HEADER_STRUCT.size
+        offset = 0
+        for f in frames:
+            ident = f.identifier | (_CAN_EFF_FLAG if f.format == _media.FrameFormat.EXTENDED else 0)
+            _FRAME_HEADER_STRUCT.pack_into(buffer, offset, ident, len(f.data), flags)
+            data_offset = offset + header_size
+            buffer[data_offset:data_offset + len(f.data)] = f.data
+            offset += self._native_frame_size
+            buffer[data_offset + len(f.data):offset] = _ZEROS[:offset - data_offset - len(f.data)]
+        assert offset == len(frames) * self._native_frame_size <= len(buffer)
+
+    def _get_native_frame(self, buffer: bytearray, index: int) -> memoryview:
+        offset = index * self._native_frame_size
+        return memoryview(buffer)[offset:offset + self._native_frame_size]
+
+    def _send_while_possible(self, frames: typing.Sequence[_media.DataFrame], buffer: bytearray, index: int) -> int:
+        """
+        Sends the frames starting from the specified index without blocking until the socket buffer is full.
+        Returns the index of the first frame that could not be sent, or the number of frames if all are sent.
+        """
+        while index < len(frames):
+            self._set_loopback_enabled(frames[index].loopback)
+            try:
+                self._sock.send(self._get_native_frame(buffer, index))
+            except OSError as ex:
+                if ex.errno in _TX_BUFFER_FULL_ERRNO:
+                    break
+                raise
+            index += 1
+        return index
+
+    async def _send_one_when_possible(self, frame: _media.DataFrame, native_frame: memoryview) -> None:
+        self._set_loopback_enabled(frame.loopback)
+        while True:
+            try:
+                await self._loop.sock_sendall(self._sock, native_frame)
+            except OSError as ex:
+                # SocketCAN reports ENOBUFS instead of EAGAIN when the driver queue is full. The socket does not
+                # become writable in that case, so the only option is to retry later.
+                if ex.errno != errno.ENOBUFS:
+                    raise
+                await asyncio.sleep(_TX_RETRY_INTERVAL, loop=self._loop)
+            else:
+                break
 
     @staticmethod
-    def _parse_native_frame(source: bytes,
+    def _parse_native_frame(source: memoryview,
                             loopback: bool,
                             timestamp: pyuavcan.transport.Timestamp) \
             -> typing.Optional[_media.TimestampedDataFrame]:
         header_size = _FRAME_HEADER_STRUCT.size
-        ident_raw, data_length, _flags = _FRAME_HEADER_STRUCT.unpack(source[:header_size])
+        ident_raw, data_length, _flags = _FRAME_HEADER_STRUCT.unpack_from(source)
         if (ident_raw & _CAN_RTR_FLAG) or (ident_raw & _CAN_ERR_FLAG):  # Unsupported format, ignore silently
             _logger.debug('Frame dropped: id_raw=%08x', ident_raw)
             return None
@@ -211,7 +348,7 @@ class SocketCANMedia(_media.Media):
         assert len(data) == data_length
         ident = ident_raw & _CAN_EFF_MASK
         return _media.TimestampedDataFrame(identifier=ident,
-                                           data=bytearray(data),
+                                           data=data,
                                            format=frame_format,
                                            loopback=loopback,
                                            timestamp=timestamp)
@@ -236,11 +373,23 @@ class SocketCANMedia(_media.Media):
             return sorted(out, key=lambda x: 'can' in x, reverse=True)
 
 
+_MAX_FRAMES_PER_BATCH = 1000
+
+_RX_SLAB_CAPACITY = 256
+"""The number of frame slots per receive slab."""
+
+_TX_BUFFER_FULL_ERRNO = {errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS}
+_TX_RETRY_INTERVAL = 0.001
+
+
 class _NativeFrameDataCapacity(enum.IntEnum):
     CAN_CLASSIC = 8
     CAN_FD = 64
 
 
+_ZEROS = bytes(_NativeFrameDataCapacity.CAN_FD)
+
+
 # struct can_frame {
 #     canid_t can_id;  /* 32 bit CAN_ID + EFF/RTR/ERR flags */
 #     __u8    can_dlc; /* data length code: 0 .. 8 */
@@ -255,10 +404,10 @@ class _NativeFrameDataCapacity(enum.IntEnum):
 #     __u8    data[CANFD_MAX_DLEN] __attribute__((aligned(8)));
 # };
 _FRAME_HEADER_STRUCT = struct.Struct('=IBB2x')  # Using standard size because the native definition relies on stdint.h
-_TIMEVAL_STRUCT = struct.Struct('@Ll')          # Using native size because the native definition uses plain integers
+_TIMESPEC_STRUCT = struct.Struct('@ll')         # Using native size because the native definition uses plain integers
 
-# From the Linux kernel; not exposed via the Python's socket module
-_SO_TIMESTAMP = 29
+# From the Linux kernel; not exposed via the Python's socket module. SCM_TIMESTAMPNS has the same value.
+_SO_TIMESTAMPNS = 35
 
 _CANFD_BRS = 1
 
@@ -273,7 +422,7 @@ def _make_socket(iface_name: str, can_fd: bool) -> socket.SocketType:
     s = socket.socket(socket.PF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
     try:
         s.bind((iface_name,))
-        s.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMP, 1)  # timestamping
+        s.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMPNS, 1)  # nanosecond timestamping
         if can_fd:
             s.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FD_FRAMES, 1)
 
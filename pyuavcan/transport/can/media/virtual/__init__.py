@@ -0,0 +1,18 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+"""
+An in-process virtual CAN bus that does not depend on any hardware or operating system features.
+It can be used to connect any number of CAN transport instances running on the same event loop,
+which is useful for testing and for large-scale simulations::
+
+    bus = VirtualBus(bit_rate=1_000_000)
+    tr_a = pyuavcan.transport.can.CANTransport(VirtualMedia(bus, 64), local_node_id=1)
+    tr_b = pyuavcan.transport.can.CANTransport(VirtualMedia(bus, 64), local_node_id=2)
+"""
+
+from ._virtual import VirtualBus as VirtualBus
+from ._virtual import VirtualMedia as VirtualMedia
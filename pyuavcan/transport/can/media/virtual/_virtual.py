@@ -0,0 +1,413 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from __future__ import annotations
+import heapq
+import random
+import typing
+import asyncio
+import logging
+import itertools
+import pyuavcan.util
+import pyuavcan.transport
+import pyuavcan.transport.can.media as _media
+
+
+_logger = logging.getLogger(__name__)
+
+
+class VirtualBus:
+    """
+    An in-process CAN bus shared by any number of :class:`VirtualMedia` instances running on the same event loop.
+
+    Pending frames from all attached media instances compete for the bus in the order of the CAN arbitration:
+    the frame with the lowest identifier wins; if the 11 most significant bits are equal,
+    a base frame wins over an extended frame. Frames sent by the same media instance in one call are
+    transmitted in the order of submission.
+
+    If the bit rate is specified, every frame occupies the bus for the time it would take to transmit it
+    at that bit rate (bit stuffing and the CAN FD data phase bit rate switching are not modeled),
+    so the bus can be saturated the same way a physical bus can.
+    Otherwise, the bus has unlimited throughput and the frames are delivered at the next iteration of the event loop,
+    still in the order of arbitration.
+
+    Every transmitted frame may be lost with the specified probability; a lost frame is not received by any
+    of the attached media instances (the sender is not aware of the loss, nor is the frame retransmitted).
+
+    Received frames are shared by all receiving media instances without copying; the data of the frames
+    references the buffer supplied by the sender. The frames that complete transmission during the same
+    iteration of the event loop are delivered to each media instance in one batch.
+    The frames are timestamped with the time when their transmission is completed on the simulated bus,
+    which may be earlier than the time of delivery if the event loop is busy.
+    """
+
+    def __init__(self,
+                 name:             str = 'virtual',
+                 bit_rate:         typing.Optional[int] = None,
+                 loss_probability: float = 0.0,
+                 seed:             typing.Optional[int] = None,
+                 loop:             typing.Optional[asyncio.AbstractEventLoop] = None):
+        """
+        :param name: The interface name reported by the attached media instances.
+
+        :param bit_rate: The bit rate of the bus [bit/second]. None (default) means unlimited throughput.
+
+        :param loss_probability: The probability of any transmitted frame being lost, in [0, 1). Defaults to zero.
+
+        :param seed: The seed of the random number generator used for the loss emulation.
+            None (default) means that the generator is seeded from the system's entropy source.
+
+        :param loop: The event loop to use. Defaults to :func:`asyncio.get_event_loop`.
+        """
+        self._name = str(name)
+        self._bit_rate = int(bit_rate) if bit_rate is not None else None
+        if self._bit_rate is not None and self._bit_rate <= 0:
+            raise ValueError(f'Invalid bit rate: {self._bit_rate}')
+        self._loss_probability = float(loss_probability)
+        if not (0.0 <= self._loss_probability < 1.0):
+            raise ValueError(f'Invalid loss probability: {self._loss_probability}')
+        self._random = random.Random(seed)
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+
+        self._media: typing.List[VirtualMedia] = []
+        # The media instances that accept frames with the given (CAN ID, format); invalidated when the acceptance
+        # filters of any attached media instance are changed or when the set of the attached media instances is changed.
+        self._fan_out_cache: typing.Dict[typing.Tuple[int, _media.FrameFormat],
+                                         typing.List[VirtualMedia]] = {}
+
+        self._pending: typing.List[typing.Tuple[_ArbitrationKey, int, _Transmission]] = []
+        self._sequence_counter = itertools.count()
+        self._in_flight: typing.Optional[typing.Tuple[_Transmission, float]] = None    # Transmission, end time
+        self._idle_since = 0.0
+        self._pump_handle: typing.Optional[asyncio.Handle] = None
+
+        self._frames_transmitted = 0
+        self._frames_lost = 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def bit_rate(self) -> typing.Optional[int]:
+        return self._bit_rate
+
+    @property
+    def loss_probability(self) -> float:
+        return self._loss_probability
+
+    @property
+    def frames_transmitted(self) -> int:
+        """Number of frames that have won the arbitration and have been transmitted, including the lost ones."""
+        return self._frames_transmitted
+
+    @property
+    def frames_lost(self) -> int:
+        """Number of transmitted frames that have not been received by anyone due to the emulated loss."""
+        return self._frames_lost
+
+    def _attach(self, media: VirtualMedia) -> None:
+        self._media.append(media)
+        self._fan_out_cache.clear()
+
+    def _detach(self, media: VirtualMedia) -> None:
+        self._media.remove(media)
+        self._fan_out_cache.clear()
+        transmissions = [x for _, _, x in self._pending] + ([self._in_flight[0]] if self._in_flight else [])
+        for transmission in transmissions:
+            if transmission.media is media:
+                transmission.finish()       # Will be removed from the queue lazily.
+
+    def _invalidate_fan_out_cache(self) -> None:
+        self._fan_out_cache.clear()
+
+    def _submit(self, transmission: _Transmission) -> None:
+        transmission.sequence_number = next(self._sequence_counter)
+        self._enqueue(transmission)
+        if self._in_flight is None and self._pump_handle is None:
+            self._idle_since = max(self._idle_since, self._loop.time())
+            self._pump_handle = self._loop.call_soon(self._pump)
+
+    def _pump(self) -> None:
+        """
+        Completes the transmission of all frames that would have been transmitted by now, arbitrating between
+        the pending frames whenever the bus becomes idle, and delivers the completed frames in batches.
+        """
+        self._pump_handle = None
+        now = self._loop.time()
+        now_timestamp = pyuavcan.transport.Timestamp.now()
+        batches: typing.Dict[VirtualMedia, typing.List[_media.TimestampedDataFrame]] = {}
+        while True:
+            if self._in_flight is not None:
+                transmission, end = self._in_flight
+                if end > now:
+                    self._pump_handle = self._loop.call_at(end, self._pump)
+                    break
+                self._in_flight = None
+                self._idle_since = end
+                # The frame is timestamped at the end of its transmission rather than at the time of delivery,
+                # so that the timestamps are not affected by the latency of the event loop.
+                lag_ns = round((now - end) * 1e9)
+                timestamp = pyuavcan.transport.Timestamp(system_ns=now_timestamp.system_ns - lag_ns,
+                                                         monotonic_ns=now_timestamp.monotonic_ns - lag_ns)
+                self._complete(transmission, timestamp, batches)
+
+            while self._pending and self._pending[0][2].finished:
+                heapq.heappop(self._pending)        # Skip those who gave up or have been closed.
+            if not self._pending:
+                break
+
+            # The transmission that won the arbitration is put back into the queue after its frame is transmitted.
+            # It retains its sequence number so that it is not overtaken by other transmissions with the same CAN ID.
+            _, _, transmission = heapq.heappop(self._pending)
+            start = max(self._idle_since, transmission.submitted_at)
+            self._in_flight = transmission, start + self._compute_frame_duration(transmission.next_frame)
+
+        for media, frames in batches.items():
+            media._deliver(frames)
+
+    def _complete(self,
+                  transmission: _Transmission,
+                  timestamp:    pyuavcan.transport.Timestamp,
+                  batches:      typing.Dict[VirtualMedia, typing.List[_media.TimestampedDataFrame]]) -> None:
+        frame = transmission.next_frame
+        sender = transmission.media
+        self._frames_transmitted += 1
+        if not transmission.advance():
+            self._enqueue(transmission)
+
+        if self._loss_probability > 0 and self._random.random() < self._loss_probability:
+            self._frames_lost += 1
+        else:
+            received: typing.Optional[_media.TimestampedDataFrame] = None
+            for media in self._get_receivers(frame.identifier, frame.format):
+                if media is not sender:
+                    if received is None:
+                        received = _media.TimestampedDataFrame(identifier=frame.identifier,
+                                                               data=frame.data,
+                                                               format=frame.format,
+                                                               loopback=False,
+                                                               timestamp=timestamp)
+                    batches.setdefault(media, []).append(received)
+
+        # The loopback frame is delivered even if the frame is lost because the sender doesn't know any better.
+        if frame.loopback and not sender.closed and sender.accepts(frame.identifier, frame.format):
+            batches.setdefault(sender, []).append(_media.TimestampedDataFrame(identifier=frame.identifier,
+                                                                              data=frame.data,
+                                                                              format=frame.format,
+                                                                              loopback=True,
+                                                                              timestamp=timestamp))
+
+    def _enqueue(self, transmission: _Transmission) -> None:
+        heapq.heappush(self._pending, (transmission.arbitration_key, transmission.sequence_number, transmission))
+
+    def _get_receivers(self, identifier: int, frame_format: _media.FrameFormat) -> typing.List[VirtualMedia]:
+        key = identifier, frame_format
+        try:
+            return self._fan_out_cache[key]
+        except KeyError:
+            out = [m for m in self._media if m.accepts(identifier, frame_format)]
+            self._fan_out_cache[key] = out
+            return out
+
+    def _compute_frame_duration(self, frame: _media.DataFrame) -> float:
+        if self._bit_rate is None:
+            return 0.0
+        overhead = _FRAME_OVERHEAD_BITS[frame.format]
+        return (overhead + len(frame.data) * 8) / self._bit_rate
+
+    def __repr__(self) -> str:
+        return pyuavcan.util.repr_attributes(self,
+                                             name=self._name,
+                                             bit_rate=self._bit_rate,
+                                             loss_probability=self._loss_probability,
+                                             media=len(self._media))
+
+
+class VirtualMedia(_media.Media):
+    """
+    A media instance attached to a :class:`VirtualBus`. See the bus documentation for details.
+    Any number of media instances can be attached to the same bus; the bus does not impose any limits.
+
+    The acceptance filters are emulated in software.
+    The call to :meth:`send_until` returns when all of the frames are transmitted or when the deadline is reached,
+    whichever happens first; in the latter case, the frames that did not win the arbitration before
+    the deadline are discarded.
+    """
+
+    def __init__(self, bus: VirtualBus, mtu: int, number_of_acceptance_filters: int = 64):
+        """
+        :param bus: The bus to attach this instance to.
+
+        :param mtu: The maximum data field size in bytes; must belong to :attr:`Media.VALID_MTU_SET`.
+            Different media instances attached to the same bus may have different MTU values.
+
+        :param number_of_acceptance_filters: The number of the emulated acceptance filters; must be positive.
+        """
+        self._bus = bus
+        self._mtu = int(mtu)
+        if self._mtu not in self.VALID_MTU_SET:
+            raise ValueError(f'Invalid MTU: {self._mtu} not in {self.VALID_MTU_SET}')
+        self._number_of_acceptance_filters = int(number_of_acceptance_filters)
+        if self._number_of_acceptance_filters < 1:
+            raise ValueError(f'Invalid number of acceptance filters: {self._number_of_acceptance_filters}')
+
+        # Ignore all frames until explicitly requested otherwise, as recommended by the media interface.
+        self._acceptance_filters: typing.List[typing.Tuple[int, int, typing.Optional[_media.FrameFormat]]] = []
+        self._handler: typing.Optional[_media.Media.ReceivedFramesHandler] = None
+        self._automatic_retransmission_enabled = True
+        self._closed = False
+        self._bus._attach(self)
+
+        super(VirtualMedia, self).__init__()
+
+    @property
+    def bus(self) -> VirtualBus:
+        return self._bus
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._bus.loop
+
+    @property
+    def interface_name(self) -> str:
+        return self._bus.name
+
+    @property
+    def mtu(self) -> int:
+        return self._mtu
+
+    @property
+    def number_of_acceptance_filters(self) -> int:
+        return self._number_of_acceptance_filters
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def start(self, handler: _media.Media.ReceivedFramesHandler, no_automatic_retransmission: bool) -> None:
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        if self._handler is not None:
+            raise RuntimeError('The RX frame handler is already set up')
+        self._handler = handler
+        # There are no transmission errors to recover from, so this option has no observable effect.
+        self._automatic_retransmission_enabled = not no_automatic_retransmission
+
+    def configure_acceptance_filters(self, configuration: typing.Sequence[_media.FilterConfiguration]) -> None:
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        configuration = list(configuration)
+        if len(configuration) > self._number_of_acceptance_filters:
+            raise ValueError(f'Too many acceptance filters: {len(configuration)} > '
+                             f'{self._number_of_acceptance_filters}')
+        self._acceptance_filters = [(x.identifier & x.mask, x.mask, x.format) for x in configuration]
+        self._bus._invalidate_fan_out_cache()
+
+    async def send_until(self, frames: typing.Iterable[_media.DataFrame], monotonic_deadline: float) -> int:
+        if self._closed:
+            raise pyuavcan.transport.ResourceClosedError(repr(self))
+        frame_list = list(frames)
+        for f in frame_list:
+            if len(f.data) > self._mtu:
+                raise ValueError(f'Frame data length {len(f.data)} exceeds the MTU of {self}')
+        transmission = _Transmission(self, frame_list, self.loop)
+        self._bus._submit(transmission)
+        timer = self.loop.call_at(monotonic_deadline, transmission.finish)
+        try:
+            await transmission.future
+        finally:
+            timer.cancel()
+            transmission.finish()
+        return transmission.num_sent
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._handler = None
+            self._bus._detach(self)
+
+    def accepts(self, identifier: int, frame_format: _media.FrameFormat) -> bool:
+        """
+        Whether the emulated acceptance filters of this instance accept frames with the specified CAN ID and format.
+        """
+        return any(identifier & mask == reference and (fmt is None or fmt == frame_format)
+                   for reference, mask, fmt in self._acceptance_filters)
+
+    @staticmethod
+    def list_available_interface_names() -> typing.Iterable[str]:
+        """Virtual buses are created by the application, so there is nothing to list."""
+        return []
+
+    def _deliver(self, frames: typing.Sequence[_media.TimestampedDataFrame]) -> None:
+        handler = self._handler
+        if handler is not None and not self._closed:
+            try:
+                handler(frames)
+            except Exception as ex:
+                _logger.exception('%s unhandled exception in the receive handler: %s; lost frames: %s',
+                                  self, ex, frames)
+
+
+_ArbitrationKey = typing.Tuple[int, int, int]
+
+
+class _Transmission:
+    """
+    The frames passed to :meth:`VirtualMedia.send_until` in one call. All of them share the same CAN ID,
+    which is why the arbitration key is computed only once.
+    """
+    def __init__(self, media: VirtualMedia, frames: typing.List[_media.DataFrame], loop: asyncio.AbstractEventLoop):
+        assert len(frames) > 0, 'Interface constraint violation: empty transmission set'
+        self.media = media
+        self.submitted_at = loop.time()
+        self.future: asyncio.Future[None] = loop.create_future()
+        self.num_sent = 0
+        self.sequence_number = 0
+        self._frames = frames
+
+        # The arbitration field of a base frame is followed by the dominant RTR bit,
+        # whereas that of an extended frame is followed by the recessive SRR bit.
+        head = frames[0]
+        if head.format == _media.FrameFormat.EXTENDED:
+            self.arbitration_key: _ArbitrationKey = (head.identifier >> 18), 1, head.identifier & (2 ** 18 - 1)
+        else:
+            self.arbitration_key = head.identifier, 0, 0
+
+    @property
+    def next_frame(self) -> _media.DataFrame:
+        return self._frames[self.num_sent]
+
+    @property
+    def finished(self) -> bool:
+        return self.future.done()
+
+    def advance(self) -> bool:
+        """
+        Marks the next frame transmitted. Returns True if there are no more frames to transmit.
+        A frame that is already on the bus is transmitted even if the transmission has been finished prematurely,
+        in which case it is not counted.
+        """
+        if self.finished:
+            return True
+        self.num_sent += 1
+        if self.num_sent >= len(self._frames):
+            self.finish()
+        return self.finished
+
+    def finish(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+_FRAME_OVERHEAD_BITS = {
+    _media.FrameFormat.BASE:     47,        # SOF, ID, RTR, IDE, r0, DLC, CRC, delimiters, ACK, EOF, IFS.
+    _media.FrameFormat.EXTENDED: 67,        # Same plus SRR, the 18-bit ID extension, r1.
+}
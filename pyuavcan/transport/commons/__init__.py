@@ -17,3 +17,4 @@ from . import crc as crc
 from . import high_overhead_transport as high_overhead_transport
 
 from ._refragment import refragment as refragment
+from ._coalescing_dispatcher import CoalescingDispatcher as CoalescingDispatcher
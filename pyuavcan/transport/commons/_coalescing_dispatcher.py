@@ -0,0 +1,139 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from __future__ import annotations
+import typing
+import asyncio
+import logging
+import collections
+
+
+T = typing.TypeVar('T')
+
+_logger = logging.getLogger(__name__)
+
+
+class CoalescingDispatcher(typing.Generic[T]):
+    """
+    Passes items from arbitrary threads (e.g., reader threads of the media drivers) to the event loop.
+    Unlike invoking :meth:`asyncio.AbstractEventLoop.call_soon_threadsafe` per item, the items are appended to a
+    queue, and the handler callback is scheduled only if it is not already pending, so that a burst of items costs
+    one wakeup of the event loop instead of one per item.
+    At low load, every item is delivered with the same latency as with ``call_soon_threadsafe``.
+
+    The handler is invoked from the event loop once per item, in the order of arrival.
+    The number of items handled per invocation is limited to keep the event loop responsive;
+    the remaining items are handled at the next iteration of the event loop.
+
+    The implementation relies on the atomicity of :class:`collections.deque` operations, so no locking is needed.
+    """
+
+    def __init__(self,
+                 loop:    asyncio.AbstractEventLoop,
+                 handler: typing.Callable[[T], None],
+                 max_items_per_drain: int = 10000) -> None:
+        if max_items_per_drain < 1:
+            raise ValueError(f'Invalid number of items per drain: {max_items_per_drain}')
+        self._loop = loop
+        self._handler = handler
+        self._max_items_per_drain = int(max_items_per_drain)
+        self._queue: typing.Deque[T] = collections.deque()
+        self._drain_pending = False
+        self._drain_count = 0
+
+    @property
+    def drain_count(self) -> int:
+        """
+        The number of times the event loop has been woken up to handle the items. Useful for diagnostics.
+        """
+        return self._drain_count
+
+    def dispatch(self, item: T) -> None:
+        """
+        Enqueues the item for handling in the event loop. This method is thread-safe.
+        Raises :class:`RuntimeError` if the event loop is closed.
+        """
+        self._queue.append(item)
+        # The flag is reset by the drain callback before it starts processing the queue, so the item appended above
+        # is guaranteed to be handled either by the pending drain or by the one scheduled here.
+        # A race between several producers may cause a redundant drain to be scheduled, which is harmless.
+        if not self._drain_pending:
+            self._drain_pending = True
+            self._loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self) -> None:
+        self._drain_pending = False
+        self._drain_count += 1
+        queue = self._queue
+        for _ in range(min(len(queue), self._max_items_per_drain)):
+            item = queue.popleft()
+            try:
+                self._handler(item)
+            except Exception as ex:
+                _logger.exception('%r: Unhandled exception in the handler: %s', self, ex)
+        if queue and not self._drain_pending:
+            self._drain_pending = True
+            self._loop.call_soon(self._drain)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(handler={self._handler!r}, queued={len(self._queue)})'
+
+
+def _unittest_coalescing_dispatcher() -> None:
+    import threading
+    from pytest import raises
+
+    loop = asyncio.new_event_loop()
+    received: typing.List[int] = []
+
+    def handler(x: int) -> None:
+        if x == 13:
+            raise ValueError('The exception is logged and the remaining items are not affected')
+        received.append(x)
+
+    with raises(ValueError):
+        CoalescingDispatcher(loop, handler, 0)
+
+    cd = CoalescingDispatcher(loop, handler, max_items_per_drain=100)
+
+    # A burst of items takes one wakeup per max_items_per_drain.
+    def produce(start: int) -> None:
+        for i in range(start, start + 1000):
+            cd.dispatch(i)
+
+    th = threading.Thread(target=produce, args=(0,))
+    th.start()
+    th.join()
+    assert received == []
+    loop.run_until_complete(asyncio.sleep(0.1))
+    assert received == [x for x in range(1000) if x != 13]
+    assert cd.drain_count == 10
+
+    # Concurrent producers.
+    received.clear()
+    threads = [threading.Thread(target=produce, args=(i * 1000 + 10000,)) for i in range(4)]
+    for th in threads:
+        th.start()
+
+    async def wait_all() -> None:
+        for _ in range(1000):
+            if len(received) >= 4000:
+                break
+            await asyncio.sleep(0.01)
+
+    loop.run_until_complete(wait_all())
+    for th in threads:
+        th.join()
+    loop.run_until_complete(asyncio.sleep(0.1))
+    assert sorted(received) == list(range(10000, 14000))
+    for i in range(4):      # The order is preserved per producer.
+        per_producer = [x for x in received if i * 1000 + 10000 <= x < (i + 1) * 1000 + 10000]
+        assert per_producer == sorted(per_producer)
+    print(cd)
+
+    loop.close()
+    with raises(RuntimeError):
+        CoalescingDispatcher(loop, handler).dispatch(0)
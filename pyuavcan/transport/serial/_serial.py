@@ -149,6 +149,14 @@ class SerialTransport(pyuavcan.transport.Transport):
 
         self._background_executor = concurrent.futures.ThreadPoolExecutor()
 
+        # The reader thread may produce many small items in a burst; they are passed over to the event loop in bulk.
+        self._rx_dispatcher: pyuavcan.transport.commons.CoalescingDispatcher[
+            typing.Tuple[typing.Union[SerialFrame, memoryview], int]
+        ] = pyuavcan.transport.commons.CoalescingDispatcher(
+            self._loop,
+            lambda x: self._handle_received_item_and_update_stats(*x),
+        )
+
         self._reader_thread = threading.Thread(target=self._reader_thread_func, daemon=True)
         self._reader_thread.start()
 
@@ -351,7 +359,7 @@ class SerialTransport(pyuavcan.transport.Transport):
         in_bytes_count = 0
 
         def callback(item: typing.Union[SerialFrame, memoryview]) -> None:
-            self._loop.call_soon_threadsafe(self._handle_received_item_and_update_stats, item, in_bytes_count)
+            self._rx_dispatcher.dispatch((item, in_bytes_count))
 
         try:
             parser = StreamParser(callback, max(self.VALID_MTU_RANGE))
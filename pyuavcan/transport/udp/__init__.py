@@ -112,6 +112,24 @@ and the increased overhead is detrimental to the network's latency and throughpu
 If IPv6 is used, the flow-ID of UAVCAN packets is set to zero.
 
 
+Broadcast and multicast
+~~~~~~~~~~~~~~~~~~~~~~~
+
+By default, IPv4 message transfers are sent to the broadcast address of the subnet,
+so every host on the segment receives all messages and discards those it is not subscribed to.
+Optionally, the messages can be sent to per-subject multicast groups instead (see :class:`UDPTransport`),
+in which case the traffic of unsubscribed subjects is filtered out by the network interface controller,
+the kernel, and the switches (if IGMP snooping is enabled) rather than by the application.
+All nodes on the network shall use the same mode.
+The multicast group address is the base address plus the subject-ID:
+
+- IPv4: ``239.0.0.0`` (administratively scoped); e.g., subject 12345 maps to ``239.0.48.57``.
+- IPv6: ``ff12::1:0`` (transient, link-local scope); e.g., subject 12345 maps to ``ff12::1:3039``.
+  IPv6 does not support broadcast, so multicast is always used.
+
+Service transfers are always unicast.
+
+
 Datagram header format
 ~~~~~~~~~~~~~~~~~~~~~~
 
@@ -219,7 +237,7 @@ Create an output and an input session:
 >>> pm = pyuavcan.transport.PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 1024)
 >>> ds = pyuavcan.transport.MessageDataSpecifier(12345)
 >>> pub = tr_0.get_output_session(pyuavcan.transport.OutputSessionSpecifier(ds, None), pm)
->>> pub.socket.getpeername()   # UDP port number derived from the subject ID: 12345 + 16384 = 28729
+>>> pub.destination_endpoint   # UDP port number derived from the subject ID: 12345 + 16384 = 28729
 ('127.255.255.255', 28729)
 >>> sub = tr_1.get_input_session(pyuavcan.transport.InputSessionSpecifier(ds, None), pm)
 
@@ -5,18 +5,35 @@
 #
 
 from __future__ import annotations
+import sys
 import time
+import struct
 import typing
 import asyncio
 import logging
+import selectors
 import threading
 import dataclasses
 import socket
 import pyuavcan
 from ._frame import UDPFrame
+from ._rx_buffer_pool import RxBufferPool
 
 
-_READ_TIMEOUT = 1.0
+_MAX_DATAGRAMS_PER_READ = 1000
+"""
+The upper limit on the number of datagrams read from one socket at once before yielding to other sockets and tasks.
+"""
+
+_MIN_SLAB_SIZE = 64 * 1024
+"""
+The received datagrams are stored in slabs of at least this size; see :class:`RxBufferPool`.
+"""
+
+_TIMESPEC_STRUCT = struct.Struct('@ll')         # Using native size because the native definition uses plain integers
+
+# From the Linux kernel; not exposed via the Python's socket module. SCM_TIMESTAMPNS has the same value.
+_SO_TIMESTAMPNS = 35
 
 _logger = logging.getLogger(__name__)
 
@@ -52,6 +69,25 @@ class UDPDemultiplexer:
 
     The UDP transport is unable to detect a node-ID conflict because it has to discard broadcast traffic generated
     by itself in user space. To this transport, its own traffic and a node-ID conflict would look identical.
+
+    On GNU/Linux, the received datagrams are timestamped by the kernel (``SO_TIMESTAMPNS``) when they arrive,
+    so the timestamps are not affected by the latency of the event loop.
+    On other platforms, the timestamps are sampled in user space when the datagram is read from the socket.
+
+    The datagrams are received into pooled slabs of memory (see :class:`RxBufferPool`) rather than into a new buffer
+    per datagram, which reduces the load on the memory allocator and the garbage collector.
+    The frames reference the slabs without copying; a slab is recycled once all frames referencing it are released.
+    The pool may be shared by several demultiplexers as long as they are read from the same thread,
+    which is the case for the demultiplexers of one transport.
+    Consumers that retain the received payloads for a long time should enable the copy-on-deliver mode,
+    where the data is copied out of the slab into a dedicated buffer of the exact size before it is delivered.
+
+    The socket is read from the event loop using :meth:`asyncio.AbstractEventLoop.add_reader`;
+    whenever it becomes readable, all datagrams that are available are processed at once.
+    Hence, no threads are involved regardless of the number of demultiplexers.
+    If the event loop does not support ``add_reader()`` (e.g., the proactor event loop on Windows),
+    the sockets are instead monitored by one I/O thread that is shared by all demultiplexers in the process;
+    the datagrams are passed over to the event loop in batches.
     """
     Listener = typing.Callable[[int, typing.Optional[UDPFrame]], None]
     """
@@ -67,7 +103,9 @@ class UDPDemultiplexer:
                  node_id_mapper: typing.Callable[[str], typing.Optional[int]],
                  local_node_id:  typing.Optional[int],
                  statistics:     UDPDemultiplexerStatistics,
-                 loop:           asyncio.AbstractEventLoop):
+                 loop:           asyncio.AbstractEventLoop,
+                 copy_on_deliver: bool = False,
+                 buffer_pool:    typing.Optional[RxBufferPool] = None):
         """
         :param sock: The instance takes ownership of the socket; it will be closed when the instance is closed.
         :param udp_mtu: The size of the socket read buffer. Make it large. If not sure, make it larger.
@@ -75,11 +113,19 @@ class UDPDemultiplexer:
         :param local_node_id: The node-ID of the local node or None. Needed to discard own-generated broadcast traffic.
         :param statistics: A reference to the external statistics object that will be updated by the instance.
         :param loop: The event loop. You know the drill.
+        :param copy_on_deliver: Copy the received data out of the pooled buffers before delivery;
+            see the class documentation.
+        :param buffer_pool: The pool to receive the datagrams into; see :meth:`make_buffer_pool`.
+            If not provided, the instance makes its own pool.
         """
         self._sock = sock
-        self._sock.settimeout(_READ_TIMEOUT)
+        self._sock.setblocking(False)
+        self._fd = self._sock.fileno()
+        self._ancillary_data_buffer_size = _enable_kernel_timestamping(self._sock)
 
         self._udp_mtu = int(udp_mtu)
+        self._copy_on_deliver = bool(copy_on_deliver)
+        self._buffer_pool = buffer_pool if buffer_pool is not None else self.make_buffer_pool(self._udp_mtu)
         self._node_id_mapper = node_id_mapper
         self._local_node_id = local_node_id
         self._statistics = statistics
@@ -93,10 +139,24 @@ class UDPDemultiplexer:
         self._closed = False
         self._listeners: typing.Dict[typing.Optional[int], UDPDemultiplexer.Listener] = {}
 
-        self._thread = threading.Thread(target=self._thread_entry_point,
-                                        name='demultiplexer_socket_reader',
-                                        daemon=True)
-        self._thread.start()
+        self._maybe_selector_thread: typing.Optional[_SelectorThread] = None
+        self._maybe_dispatcher: typing.Optional[pyuavcan.transport.commons.CoalescingDispatcher[
+            typing.Sequence[typing.Tuple[str, typing.Optional[UDPFrame]]]
+        ]] = None
+        try:
+            self._loop.add_reader(self._fd, self._on_readable)
+        except NotImplementedError:
+            _logger.debug('%r: The event loop does not support add_reader(), using the shared I/O thread', self)
+            self._maybe_dispatcher = pyuavcan.transport.commons.CoalescingDispatcher(self._loop, self._dispatch_frames)
+            self._maybe_selector_thread = _SelectorThread.get_instance()
+            self._maybe_selector_thread.register(self._sock, self._on_readable_in_thread)
+
+    @staticmethod
+    def make_buffer_pool(udp_mtu: int) -> RxBufferPool:
+        """
+        Constructs a buffer pool suitable for the demultiplexers with the specified read buffer size.
+        """
+        return RxBufferPool(max(_MIN_SLAB_SIZE, int(udp_mtu) * 4))
 
     def add_listener(self, source_node_id: typing.Optional[int], handler: Listener) -> None:
         """
@@ -141,9 +201,10 @@ class UDPDemultiplexer:
         """
         if self.has_listeners:
             raise RuntimeError('Do not close the demultiplexer with active listeners, suka!')
-        self._closed = True
-        self._sock.close()
-        # We don't wait for the thread to join because who cares?
+        if not self._closed:
+            self._closed = True
+            self._unregister()
+            self._sock.close()
 
     def _dispatch_frame(self, source_ip: str, frame: typing.Optional[UDPFrame]) -> None:
         if self._closed:
@@ -186,54 +247,177 @@ class UDPDemultiplexer:
             except LookupError:
                 self._statistics.accepted_datagrams[source_node_id] = 1
 
-    def _thread_entry_point(self) -> None:
-        while not self._closed:
-            try:
-                # Notice that we MUST create a new buffer for each received datagram to avoid race conditions.
-                # Buffer memory cannot be shared because the rest of the stack is completely zero-copy;
-                # meaning that the data we allocate here, at the very bottom of the protocol stack,
-                # is likely to be carried all the way up to the application layer without being copied.
-                data, endpoint = self._sock.recvfrom(self._udp_mtu)
-                source_ip = endpoint[0]
-                assert isinstance(source_ip, str)
-
-                # TODO: use socket timestamping when running on Linux (Windows does not support timestamping).
-                ts = pyuavcan.transport.Timestamp.now()
-
-                frame = UDPFrame.parse(memoryview(data), ts)
-                self._loop.call_soon_threadsafe(self._dispatch_frame, source_ip, frame)
+    def _on_readable(self) -> None:
+        for source_ip, frame in self._read_batch():
+            self._dispatch_frame(source_ip, frame)
 
-                if len(data) >= self._udp_mtu:  # pragma: no cover
-                    _logger.warning('%r: A datagram from %r is %d bytes long which is not less than '
-                                    'the size of the buffer, therefore it might have been truncated. '
-                                    'Enlarge the read buffer to squelch this warning.',
-                                    self, endpoint, len(data))
+    def _on_readable_in_thread(self) -> None:
+        batch = self._read_batch()
+        if batch:
+            assert self._maybe_dispatcher is not None
+            self._maybe_dispatcher.dispatch(batch)
 
-            except socket.timeout:
-                # This is needed for checking the status of the closure flag periodically.
-                # I don't actually expect this to be necessary because when the socket is closed we'll get an
-                # exception anyway, but the socket API docs are unclear in this regard so this paranoia is justified.
-                pass
+    def _dispatch_frames(self, batch: typing.Sequence[typing.Tuple[str, typing.Optional[UDPFrame]]]) -> None:
+        for source_ip, frame in batch:
+            self._dispatch_frame(source_ip, frame)
 
+    def _read_batch(self) -> typing.List[typing.Tuple[str, typing.Optional[UDPFrame]]]:
+        """
+        Reads all datagrams that are immediately available, up to a limit, without blocking.
+        """
+        batch: typing.List[typing.Tuple[str, typing.Optional[UDPFrame]]] = []
+        # The kernel timestamps belong to the system clock; the monotonic clock is extrapolated from this reference.
+        ref_system_ns, ref_monotonic_ns = time.time_ns(), time.monotonic_ns()
+        while len(batch) < _MAX_DATAGRAMS_PER_READ and not self._closed:
+            try:
+                # Notice that buffer memory cannot be shared between datagrams because the rest of the stack is
+                # completely zero-copy; meaning that the data we receive here, at the very bottom of the protocol
+                # stack, is likely to be carried all the way up to the application layer without being copied.
+                # The pool takes care of that by handing out a fresh region of the slab for each datagram.
+                buffer = self._buffer_pool.get_write_buffer(self._udp_mtu)
+                ancdata: typing.List[typing.Tuple[int, int, bytes]] = []
+                if self._ancillary_data_buffer_size > 0:
+                    size, ancdata, _flags, endpoint = self._sock.recvmsg_into((buffer,),
+                                                                              self._ancillary_data_buffer_size)
+                else:
+                    size, endpoint = self._sock.recvfrom_into(buffer)
+                if self._copy_on_deliver:
+                    data = memoryview(bytes(buffer[:size]))     # The pooled region is reused for the next datagram.
+                else:
+                    data = self._buffer_pool.commit(size)
+            except (BlockingIOError, InterruptedError):
+                break
             except Exception as ex:
                 if self._closed:  # pragma: no cover
                     _logger.debug('%r: Ignoring exception %r because we have been commanded to stop', self, ex)
-
                 elif self._sock.fileno() < 0:
                     self._closed = True
+                    self._unregister()
                     _logger.exception('%r: The socket has been closed unexpectedly! Terminating the instance.', self)
-
                 else:  # pragma: no cover
-                    _logger.exception('%r: Reader thread failure: %s; will continue after a short nap', self, ex)
-                    time.sleep(1)
+                    _logger.exception('%r: Socket read failure: %s', self, ex)
+                break
+
+            source_ip = endpoint[0]
+            assert isinstance(source_ip, str)
+
+            ts: typing.Optional[pyuavcan.transport.Timestamp] = None
+            for cmsg_level, cmsg_type, cmsg_data in ancdata:
+                if cmsg_level == socket.SOL_SOCKET and cmsg_type == _SO_TIMESTAMPNS:
+                    sec, nsec = _TIMESPEC_STRUCT.unpack(cmsg_data)
+                    system_ns = sec * 1_000_000_000 + nsec
+                    age_ns = max(0, ref_system_ns - system_ns)
+                    ts = pyuavcan.transport.Timestamp(system_ns=system_ns,
+                                                      monotonic_ns=max(0, ref_monotonic_ns - age_ns))
+            if ts is None:
+                ts = pyuavcan.transport.Timestamp.now()
+
+            batch.append((source_ip, UDPFrame.parse(data, ts)))
 
-        _logger.debug('%r: The reader worker thread is exiting, bye bye', self)
-        assert self._closed
+            if size >= self._udp_mtu:  # pragma: no cover
+                _logger.warning('%r: A datagram from %r is %d bytes long which is not less than '
+                                'the size of the buffer, therefore it might have been truncated. '
+                                'Enlarge the read buffer to squelch this warning.',
+                                self, endpoint, size)
+        return batch
+
+    def _unregister(self) -> None:
+        if self._maybe_selector_thread is not None:
+            self._maybe_selector_thread.unregister(self._sock)
+        else:
+            self._loop.remove_reader(self._fd)
 
     def __repr__(self) -> str:
         return pyuavcan.util.repr_attributes_noexcept(self, self._sock, remote_node_ids=list(self._listeners.keys()))
 
 
+def _enable_kernel_timestamping(sock: socket.socket) -> int:
+    """
+    Enables kernel timestamping of the received datagrams if supported by the platform.
+    Returns the size of the ancillary data buffer needed to retrieve the timestamps;
+    zero if timestamping is not available, in which case the timestamps are to be sampled in user space.
+    """
+    if not sys.platform.startswith('linux'):
+        return 0
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, _SO_TIMESTAMPNS, 1)
+    except OSError as ex:  # pragma: no cover
+        _logger.info('Kernel timestamping is not available for %r, falling back to software timestamping: %s',
+                     sock, ex)
+        return 0
+    return socket.CMSG_SPACE(_TIMESPEC_STRUCT.size)
+
+
+class _SelectorThread:
+    """
+    Monitors sockets for readability using :mod:`selectors` in a dedicated daemon thread and invokes the
+    registered callbacks from that thread. One instance serves all demultiplexers whose event loops do not
+    support ``add_reader()``, so the number of threads does not depend on the number of sockets.
+    The thread is started when the instance is first needed and is never stopped.
+    """
+
+    _instance: typing.Optional[_SelectorThread] = None
+    _instance_lock = threading.Lock()
+
+    @staticmethod
+    def get_instance() -> _SelectorThread:
+        with _SelectorThread._instance_lock:
+            if _SelectorThread._instance is None:
+                _SelectorThread._instance = _SelectorThread()
+            return _SelectorThread._instance
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        # Registration changes are made from other threads; this socket pair is used to interrupt the ongoing
+        # select() call so that the changes take effect immediately.
+        self._wakeup_rx, self._wakeup_tx = socket.socketpair()
+        self._wakeup_rx.setblocking(False)
+        self._wakeup_tx.setblocking(False)
+        self._selector.register(self._wakeup_rx, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._thread_entry_point, name='udp_selector', daemon=True)
+        self._thread.start()
+
+    def register(self, sock: socket.socket, callback: typing.Callable[[], None]) -> None:
+        with self._lock:
+            self._selector.register(sock, selectors.EVENT_READ, callback)
+        self._wake_up()
+
+    def unregister(self, sock: socket.socket) -> None:
+        with self._lock:
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError):  # pragma: no cover
+                pass
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        try:
+            self._wakeup_tx.send(b'\x00')
+        except BlockingIOError:  # pragma: no cover
+            pass    # The buffer is full, which means that the thread will be woken up anyway.
+
+    def _thread_entry_point(self) -> None:
+        while True:
+            try:
+                events = self._selector.select(timeout=1.0)
+                for key, _ in events:
+                    if key.data is None:
+                        while True:
+                            try:
+                                self._wakeup_rx.recv(1024)
+                            except BlockingIOError:
+                                break
+                    else:
+                        key.data()
+            except Exception as ex:  # pragma: no cover
+                # A socket may have been closed while select() was in progress.
+                _logger.debug('%r: Selector failure: %r', self, ex)
+
+    def __repr__(self) -> str:
+        return pyuavcan.util.repr_attributes_noexcept(self, self._selector)
+
+
 def _unittest_demultiplexer(caplog: typing.Any) -> None:
     from pytest import raises
     from pyuavcan.transport import Priority, Timestamp
@@ -465,6 +649,189 @@ def _unittest_demultiplexer(caplog: typing.Any) -> None:
                                  loop=loop)
         # noinspection PyProtectedMember
         demux._sock.close()
-        run_until_complete(asyncio.sleep(_READ_TIMEOUT * 2))  # Wait for the reader thread to notice the problem.
+        # The closed socket is silently dropped by the selector, so emulate a spurious readiness notification.
+        # noinspection PyProtectedMember
+        demux._on_readable()
         # noinspection PyProtectedMember
         assert demux._closed
+
+
+# noinspection PyProtectedMember
+def _unittest_demultiplexer_buffer_pool() -> None:
+    from pyuavcan.transport import Priority, Timestamp
+
+    loop = asyncio.get_event_loop()
+    sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock_tx.bind(('127.100.0.1', 0))
+    sock_tx.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1024 * 1024)
+
+    def run(copy_on_deliver: bool, num_datagrams: int, retain: bool) \
+            -> typing.Tuple[UDPDemultiplexer, typing.List[UDPFrame]]:
+        sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock_rx.bind(('127.100.0.100', 0))
+        sock_rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+        received: typing.List[UDPFrame] = []
+        transfer_ids: typing.List[int] = []
+
+        def on_frame(_: int, f: typing.Optional[UDPFrame]) -> None:
+            assert f is not None
+            transfer_ids.append(f.transfer_id)
+            if retain:
+                received.append(f)
+
+        demux = UDPDemultiplexer(sock=sock_rx,
+                                 udp_mtu=1024,
+                                 node_id_mapper={'127.100.0.1': 1}.get,
+                                 local_node_id=None,
+                                 statistics=UDPDemultiplexerStatistics(),
+                                 loop=loop,
+                                 copy_on_deliver=copy_on_deliver)
+        demux.add_listener(None, on_frame)
+        for transfer_id in range(num_datagrams):
+            sock_tx.sendto(b''.join(
+                UDPFrame(timestamp=Timestamp.now(),
+                         priority=Priority.HIGH,
+                         transfer_id=transfer_id,
+                         index=0,
+                         end_of_transfer=True,
+                         payload=memoryview(bytes(1000)),
+                         data_type_hash=0x_deadbeef_deadbeef).compile_header_and_payload()
+            ), sock_rx.getsockname())
+            if transfer_id % 100 == 99:
+                loop.run_until_complete(asyncio.sleep(0.01))
+        loop.run_until_complete(asyncio.sleep(0.1))
+        assert transfer_ids == list(range(num_datagrams))
+        demux.remove_listener(None)
+        demux.close()
+        return demux, received
+
+    # By default, the payloads reference the slab; they stay valid while the slabs are being recycled.
+    demux, frames = run(False, 200, True)
+    assert all(isinstance(f.payload.obj, bytearray) for f in frames)
+    assert all(f.payload == bytes(1000) for f in frames)
+    assert demux._buffer_pool.slabs_allocated > 1   # The frames are retained, nothing to recycle.
+    assert demux._buffer_pool.slabs_recycled == 0
+    del frames
+
+    # Once released, the slabs are recycled.
+    demux, _ = run(False, 1000, False)
+    assert demux._buffer_pool.slabs_recycled > 0
+    assert demux._buffer_pool.slabs_allocated < 5
+
+    # The copy-on-deliver mode uses one slab only.
+    demux, frames = run(True, 200, True)
+    assert all(isinstance(f.payload.obj, bytes) for f in frames)
+    assert demux._buffer_pool.slabs_allocated == 1
+
+    sock_tx.close()
+
+
+def _unittest_demultiplexer_kernel_timestamping() -> None:
+    """
+    The timestamps are sampled upon arrival of the datagram rather than when the event loop gets around to reading it.
+    """
+    from pytest import approx
+    from pyuavcan.transport import Priority, Timestamp
+
+    loop = asyncio.get_event_loop()
+    sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock_rx.bind(('127.100.0.100', 0))
+    received: typing.List[typing.Tuple[Timestamp, UDPFrame]] = []
+
+    def on_frame(_: int, f: typing.Optional[UDPFrame]) -> None:
+        assert f is not None
+        received.append((Timestamp.now(), f))
+
+    demux = UDPDemultiplexer(sock=sock_rx,
+                             udp_mtu=10240,
+                             node_id_mapper={'127.100.0.1': 1}.get,
+                             local_node_id=None,
+                             statistics=UDPDemultiplexerStatistics(),
+                             loop=loop)
+    demux.add_listener(None, on_frame)
+    sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock_tx.bind(('127.100.0.1', 0))
+    sock_tx.connect(sock_rx.getsockname())
+
+    sent_at = Timestamp.now()
+    sock_tx.send(b''.join(
+        UDPFrame(timestamp=sent_at,
+                 priority=Priority.HIGH,
+                 transfer_id=0,
+                 index=0,
+                 end_of_transfer=True,
+                 payload=memoryview(b'abc'),
+                 data_type_hash=0x_deadbeef_deadbeef).compile_header_and_payload()
+    ))
+    time.sleep(0.5)     # The event loop is stalled, the datagram is waiting in the socket.
+    loop.run_until_complete(asyncio.sleep(0.1))
+    (dispatched_at, frame), = received
+    assert bytes(frame.payload) == b'abc'
+    assert dispatched_at.monotonic_ns - sent_at.monotonic_ns >= 0.5e9
+    if sys.platform.startswith('linux'):
+        assert frame.timestamp.system_ns - sent_at.system_ns == approx(0, abs=0.1e9)
+        assert frame.timestamp.monotonic_ns - sent_at.monotonic_ns == approx(0, abs=0.1e9)
+    else:  # pragma: no cover
+        assert frame.timestamp.monotonic_ns - sent_at.monotonic_ns >= 0.5e9
+
+    demux.remove_listener(None)
+    demux.close()
+    sock_tx.close()
+
+
+def _unittest_demultiplexer_selector_thread() -> None:
+    """
+    The fallback for event loops that do not support add_reader(); all sockets are served by one shared thread.
+    """
+    from pyuavcan.transport import Priority, Timestamp
+
+    loop = asyncio.new_event_loop()
+
+    def add_reader(*_: typing.Any) -> None:
+        raise NotImplementedError
+
+    setattr(loop, 'add_reader', add_reader)
+
+    received: typing.List[typing.Tuple[int, typing.Optional[UDPFrame]]] = []
+    demuxes = []
+    senders = []
+    for index in range(3):
+        sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock_rx.bind(('127.100.0.100', 0))
+        demux = UDPDemultiplexer(sock=sock_rx,
+                                 udp_mtu=10240,
+                                 node_id_mapper={'127.100.0.1': 1}.get,
+                                 local_node_id=None,
+                                 statistics=UDPDemultiplexerStatistics(),
+                                 loop=loop)
+        demux.add_listener(None, lambda i, f: received.append((i, f)))
+        demuxes.append(demux)
+        sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock_tx.bind(('127.100.0.1', 0))
+        sock_tx.connect(sock_rx.getsockname())
+        senders.append(sock_tx)
+
+    threads = set(threading.enumerate())
+    for index, sock_tx in enumerate(senders):
+        for transfer_id in range(10):
+            sock_tx.send(b''.join(
+                UDPFrame(timestamp=Timestamp.now(),
+                         priority=Priority.HIGH,
+                         transfer_id=transfer_id,
+                         index=0,
+                         end_of_transfer=True,
+                         payload=memoryview(bytes([index])),
+                         data_type_hash=0x_deadbeef_deadbeef).compile_header_and_payload()
+            ))
+    loop.run_until_complete(asyncio.sleep(0.5))
+    assert set(threading.enumerate()) <= threads
+    assert len(received) == 30
+    for index in range(3):
+        transfer_ids = [f.transfer_id for _, f in received if f is not None and f.payload[0] == index]
+        assert transfer_ids == list(range(10))
+
+    for demux, sock_tx in zip(demuxes, senders):
+        demux.remove_listener(None)
+        demux.close()
+        sock_tx.close()
+    loop.close()
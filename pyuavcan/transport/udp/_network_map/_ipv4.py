@@ -6,6 +6,7 @@
 
 from __future__ import annotations
 import re
+import sys
 import errno
 import typing
 import socket
@@ -14,6 +15,17 @@ import pyuavcan
 from ._network_map import NetworkMap
 
 
+_MULTICAST_GROUP_BASE = 0xEF00_0000
+"""
+The multicast group of a subject is 239.0.0.0 plus the subject-ID; this range is administratively scoped
+(RFC 2365), so the traffic does not leave the organization.
+"""
+
+_IP_MULTICAST_ALL = 49
+"""
+GNU/Linux-specific; not exposed via the Python's socket module.
+"""
+
 _logger = logging.getLogger(__name__)
 
 
@@ -21,9 +33,14 @@ class NetworkMapIPv4(NetworkMap):
     """
     In IPv4 networks, the node-ID of zero cannot be used because it represents the subnet address;
     the maximum node-ID can only be used if it is not the same as the broadcast address for the subnet.
+
+    Message transfers are broadcast by default. In the multicast mode, the multicast group of a subject is
+    239.0.0.0 plus the subject-ID; e.g., the messages of subject 12345 are sent to 239.0.48.57.
     """
 
-    def __init__(self, ip_address: str):
+    def __init__(self, ip_address: str, multicast: bool = False):
+        super().__init__()
+        self._multicast = bool(multicast)
         self._local = IPv4Address.parse(ip_address)
         if self._local.netmask == 0 or self._local.hostmask == 0:
             raise ValueError(f'The subnet mask in {ip_address} is invalid or missing. '
@@ -34,6 +51,7 @@ class NetworkMapIPv4(NetworkMap):
         # broadcast address for the subnet. In this example, we can use the full range of node-ID
         # values if the subnet mask is 19 bits wide or less.
         self._max_nodes: int = min(2 ** self.NODE_ID_BIT_LENGTH, self._local.hostmask)
+        self._subnet_address = int(self._local.subnet_address)
 
         maybe_local_node_id = int(self._local) - int(self._local.subnet_address)
         if maybe_local_node_id < self._max_nodes:
@@ -43,9 +61,8 @@ class NetworkMapIPv4(NetworkMap):
             # Test the address configuration to detect configuration errors early.
             # These checks are only valid if the local node is non-anonymous.
             for s in [
-                self.make_output_socket(None, 65535),
-                self.make_output_socket(1, 65535),
-                self.make_input_socket(0, False),
+                self.make_output_socket(),
+                self.make_input_socket(0, None),
             ]:
                 # This invariant is supposed to be upheld by the OS, so we use an assertion check.
                 assert IPv4Address.parse(s.getsockname()[0]) == self._local.host_address, \
@@ -56,9 +73,7 @@ class NetworkMapIPv4(NetworkMap):
 
         # Test the address configuration to detect configuration errors early.
         # These checks are valid regardless of whether the local node is anonymous.
-        self.make_input_socket(0, True).close()
-
-        self._ip_to_nid_cache: typing.Dict[str, typing.Optional[int]] = {}
+        self.make_input_socket(0, 0).close()
 
     @property
     def max_nodes(self) -> int:
@@ -68,24 +83,29 @@ class NetworkMapIPv4(NetworkMap):
     def local_node_id(self) -> typing.Optional[int]:
         return self._local_node_id
 
-    def map_ip_address_to_node_id(self, ip: str) -> typing.Optional[int]:
-        # Unclean strings will decrease the cache performance. Do we want to strip() them beforehand?
-        try:
-            return self._ip_to_nid_cache[ip]
-        except LookupError:
-            a = IPv4Address.parse(ip)
-            node_id: typing.Optional[int] = None
-            if a in self._local:
-                candidate = int(a) - int(self._local.subnet_address)
-                assert candidate >= 0
-                if candidate < self._max_nodes:
-                    node_id = candidate
-
-            _logger.debug('%r: New IP to node-ID mapping: %r --> %s', self, ip, node_id)
-            self._ip_to_nid_cache[ip] = node_id
-            return node_id
-
-    def make_output_socket(self, remote_node_id: typing.Optional[int], remote_port: int) -> socket.socket:
+    @property
+    def multicast(self) -> bool:
+        return self._multicast
+
+    def _map_ip_address_to_node_id_uncached(self, ip: str) -> typing.Optional[int]:
+        # The node-ID is the offset from the subnet address; negative or too large offsets are outside of the range.
+        candidate = int(IPv4Address.parse(ip)) - self._subnet_address
+        return candidate if 0 <= candidate < self._max_nodes else None
+
+    def map_node_id_to_ip_address(self, node_id: int) -> str:
+        if 0 <= node_id < self._max_nodes:
+            ip = IPv4Address(self._subnet_address + node_id)
+            assert ip in self._local
+            return str(ip)
+        raise ValueError(f'Cannot map the node-ID value {node_id} to an IP address. '
+                         f'The range of valid node-ID values is [0, {self._max_nodes})')
+
+    def map_subject_id_to_ip_address(self, subject_id: int) -> str:
+        if self._multicast:
+            return str(IPv4Address(_MULTICAST_GROUP_BASE + subject_id))
+        return str(self._local.broadcast_address)
+
+    def make_output_socket(self) -> socket.socket:
         if self.local_node_id is None:
             raise pyuavcan.transport.OperationNotDefinedForAnonymousNodeError(
                 f'Anonymous UDP/IP nodes cannot emit transfers, they can only listen. '
@@ -107,23 +127,20 @@ class NetworkMapIPv4(NetworkMap):
                 ) from None
             raise  # pragma: no cover
 
-        # Specify the fixed remote end. The port is always fixed; the host is unicast or broadcast.
-        if remote_node_id is None:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            s.connect((str(self._local.broadcast_address), remote_port))
-        elif 0 <= remote_node_id < self._max_nodes:
-            ip = IPv4Address(int(self._local.subnet_address) + remote_node_id)
-            assert ip in self._local
-            s.connect((str(ip), remote_port))
+        # The socket is not connected: the destination (unicast, broadcast, or multicast) is specified per datagram,
+        # so one socket can serve all output sessions.
+        if self._multicast:
+            # Multicast datagrams are emitted via the interface of the local address rather than the default one.
+            # The loopback is enabled by default; it is needed for the nodes running on the same host.
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(str(bind_to)))
         else:
-            raise ValueError(f'Cannot map the node-ID value {remote_node_id} to an IP address. '
-                             f'The range of valid node-ID values is [0, {self._max_nodes})')
+            # Broadcasting shall be allowed explicitly.
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
-        _logger.debug('%r: New output socket %r connected to remote node %r, remote port %r',
-                      self, s, remote_node_id, remote_port)
+        _logger.debug('%r: New output socket %r', self, s)
         return s
 
-    def make_input_socket(self, local_port: int, expect_broadcast: bool) -> socket.socket:
+    def make_input_socket(self, local_port: int, subject_id: typing.Optional[int]) -> socket.socket:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.setblocking(False)
 
@@ -131,8 +148,8 @@ class NetworkMapIPv4(NetworkMap):
         # This option shall be set before the socket is bound.
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
-        if expect_broadcast or self.local_node_id is None:
-            # The socket MUST BE BOUND TO INADDR_ANY IN ORDER TO RECEIVE BROADCAST DATAGRAMS.
+        if subject_id is not None or self.local_node_id is None:
+            # The socket MUST BE BOUND TO INADDR_ANY IN ORDER TO RECEIVE BROADCAST (OR MULTICAST) DATAGRAMS.
             # The user will have to filter out irrelevant datagrams in user space.
             # Please read https://stackoverflow.com/a/58118503/1007777
             # We also bind to this address if the local node is anonymous because in that case the local
@@ -163,16 +180,39 @@ class NetworkMapIPv4(NetworkMap):
         except Exception as ex:  # pragma: no cover
             _logger.exception('%r: Could not set SO_BROADCAST on %r: %s', self, s, ex)
 
-        _logger.debug('%r: New input socket %r, local port %r, supports broadcast: %r',
-                      self, s, local_port, expect_broadcast)
+        if self._multicast and subject_id is not None:
+            # The membership makes the network interface controller and the kernel accept the datagrams of this
+            # subject. The group is joined via the interface of the local address; if the node is anonymous,
+            # the address may not exist, in which case the interface is chosen by the OS.
+            group = self.map_subject_id_to_ip_address(subject_id)
+            if sys.platform.startswith('linux'):
+                # By default, GNU/Linux delivers to a socket bound to INADDR_ANY the datagrams of all groups
+                # joined by any socket on the host, which would defeat the purpose.
+                s.setsockopt(socket.IPPROTO_IP, _IP_MULTICAST_ALL, 0)
+            for iface in (str(self._local.host_address), '0.0.0.0'):
+                try:
+                    s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                                 socket.inet_aton(group) + socket.inet_aton(iface))
+                    break
+                except OSError as ex:
+                    if self.local_node_id is not None or iface == '0.0.0.0':
+                        s.close()
+                        raise pyuavcan.transport.InvalidMediaConfigurationError(
+                            f'Bad IP configuration: cannot join multicast group {group} via {iface} [{ex}]'
+                        ) from None
+
+        _logger.debug('%r: New input socket %r, local port %r, subject-ID: %r',
+                      self, s, local_port, subject_id)
         return s
 
     def __str__(self) -> str:
         return str(self._local)
 
 
+# noinspection PyProtectedMember
 def _unittest_network_map_ipv4() -> None:
     from pytest import raises
+    from ._network_map import _MAX_FOREIGN_CACHE_ENTRIES
 
     with raises(ValueError):
         NetworkMap.new('127.0.0.1/32')          # Bad network mask.
@@ -188,6 +228,7 @@ def _unittest_network_map_ipv4() -> None:
 
     nm = NetworkMap.new('127.254.254.254/8')    # Maps to an invalid local node-ID which means anonymous.
     assert nm.local_node_id is None
+    assert not nm.multicast
 
     nm = NetworkMap.new('192.168.0.255/24')    # Maps to an invalid local node-ID which means anonymous.
     assert nm.local_node_id is None
@@ -217,22 +258,75 @@ def _unittest_network_map_ipv4() -> None:
     assert nm.local_node_id == 123
     assert nm.map_ip_address_to_node_id('127.123.0.1') == 1
     assert nm.map_ip_address_to_node_id('127.254.254.254') is None
+    assert nm.map_ip_address_to_node_id('127.123.0.255') is None    # Broadcast.
+    assert nm.map_ip_address_to_node_id('127.122.255.255') is None
+
+    # The number of cached foreign addresses is limited; the valid mappings are retained.
+    assert isinstance(nm, NetworkMapIPv4)
+    for index in range(_MAX_FOREIGN_CACHE_ENTRIES * 3):
+        assert nm.map_ip_address_to_node_id(str(IPv4Address(0x0A00_0000 + index))) is None
+    assert len(nm._ip_to_nid_cache) <= _MAX_FOREIGN_CACHE_ENTRIES + 1
+    assert nm._ip_to_nid_cache['127.123.0.1'] == 1
+    assert nm.map_ip_address_to_node_id('127.123.0.1') == 1
 
+    assert nm.map_subject_id_to_ip_address(12345) == '127.123.0.255'
+    assert nm.map_node_id_to_ip_address(0) == '127.123.0.0'
+    assert nm.map_node_id_to_ip_address(254) == '127.123.0.254'
     with raises(ValueError):
-        assert nm.make_output_socket(4095, 65535)  # The node-ID cannot be mapped.
+        nm.map_node_id_to_ip_address(255)   # The node-ID cannot be mapped.
+    with raises(ValueError):
+        nm.map_node_id_to_ip_address(-1)
 
-    out = nm.make_output_socket(nm.local_node_id, 12345)
-    inp = nm.make_input_socket(12345, True)
+    out = nm.make_output_socket()
+    inp = nm.make_input_socket(12345, 0)
 
-    # Ensure the source IP address is specified correctly in outgoing UDP frames.
-    out.send(b'Well, I got here the same way the coin did.')
+    # Ensure the source IP address is specified correctly in outgoing UDP frames, both unicast and broadcast.
+    out.sendto(b'Well, I got here the same way the coin did.', (nm.map_node_id_to_ip_address(nm.local_node_id), 12345))
     data, sockaddr = inp.recvfrom(1024)
     assert data == b'Well, I got here the same way the coin did.'
     assert sockaddr[0] == '127.123.0.123'
+    out.sendto(b'Call it, friendo.', (nm.map_subject_id_to_ip_address(0), 12345))
+    data, sockaddr = inp.recvfrom(1024)
+    assert data == b'Call it, friendo.'
+    assert sockaddr[0] == '127.123.0.123'
 
     out.close()
     inp.close()
 
+    with raises(pyuavcan.transport.OperationNotDefinedForAnonymousNodeError):
+        NetworkMap.new('127.254.254.254/8').make_output_socket()
+
+
+def _unittest_network_map_ipv4_multicast() -> None:
+    import select
+    nm = NetworkMap.new('127.123.0.123/24', multicast=True)
+    assert nm.multicast
+    assert 'multicast=True' in repr(nm)
+    assert nm.map_subject_id_to_ip_address(0) == '239.0.0.0'
+    assert nm.map_subject_id_to_ip_address(12345) == '239.0.48.57'
+    assert nm.map_subject_id_to_ip_address(32767) == '239.0.127.255'
+    assert nm.map_node_id_to_ip_address(1) == '127.123.0.1'     # Unicast is not affected.
+
+    out = nm.make_output_socket()
+    inp_a = nm.make_input_socket(24321, 7940)
+    inp_b = nm.make_input_socket(24321, 7941)   # Same port (for the sake of testing), different group.
+    anonymous = NetworkMap.new('127.254.254.254/8', multicast=True)
+    assert anonymous.local_node_id is None
+    inp_c = anonymous.make_input_socket(24321, 7940)
+
+    # The datagrams are delivered only to the sockets that joined the group.
+    out.sendto(b'Friendo', (nm.map_subject_id_to_ip_address(7940), 24321))
+    for s in (inp_a, inp_c):
+        assert select.select([s], [], [], 1.0)[0]
+        data, sockaddr = s.recvfrom(1024)
+        assert data == b'Friendo'
+        assert sockaddr[0] == '127.123.0.123'
+    if sys.platform.startswith('linux'):
+        assert not select.select([inp_b], [], [], 0.1)[0]
+
+    for s in (out, inp_a, inp_b, inp_c):
+        s.close()
+
 
 class IPv4Address:
     """
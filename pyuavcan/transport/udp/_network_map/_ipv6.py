@@ -4,36 +4,258 @@
 # Author: Pavel Kirienko <pavel.kirienko@zubax.com>
 #
 
+from __future__ import annotations
+import sys
+import errno
+import struct
 import typing
 import socket
 import logging
+import ipaddress
+import pyuavcan
 from ._network_map import NetworkMap
 
 
+_MULTICAST_GROUP_BASE = int(ipaddress.IPv6Address('ff12::1:0'))
+"""
+The multicast group of a subject is ``ff12::1:0`` plus the subject-ID: a transient group of the link-local scope.
+"""
+
+_IPV6_MULTICAST_ALL = 29
+"""
+GNU/Linux-specific; not exposed via the Python's socket module.
+"""
+
 _logger = logging.getLogger(__name__)
 
 
 class NetworkMapIPv6(NetworkMap):
-    def __init__(self, network: str):
-        assert network
-        raise NotImplementedError('Sorry, IPv6 is not yet supported. Please submit patches!')
+    """
+    IPv6 does not support broadcast, so message transfers are always sent to multicast groups,
+    one per subject; e.g., the messages of subject 12345 are sent to ``ff12::1:3039``.
+    The multicast groups are of the link-local scope, so they are not forwarded by routers.
+
+    The address should be given with the prefix length, e.g., ``fd00::c0a8:1c8/64``;
+    if it is not specified, it is assumed to be ``128 - NODE_ID_BIT_LENGTH``.
+    The network interface may be specified via the zone index, e.g., ``fe80::1c8%eth0/64``;
+    this is required for link-local addresses.
+    If the zone index is not specified, the interface used for multicast is chosen by the OS
+    according to the routing table.
+
+    The node-ID is the offset of the address from the subnet address, like in IPv4;
+    unlike IPv4, the highest address of the subnet is not reserved.
+    """
+
+    def __init__(self, ip_address: str):
+        super().__init__()
+        text = ip_address.strip()
+        address, _, prefix = text.partition('/')
+        address, _, zone = address.partition('%')
+        prefix = prefix or str(128 - self.NODE_ID_BIT_LENGTH)
+        try:
+            self._local = ipaddress.IPv6Interface(f'{address}/{prefix}')
+        except ValueError:
+            raise ValueError(f'Malformed IPv6 address: {ip_address!r}; '
+                             f'the expected format is "ADDRESS[%ZONE][/PREFIX]"') from None
+        host_bit_length = self._local.max_prefixlen - self._local.network.prefixlen
+        if self._local.network.prefixlen == 0 or host_bit_length == 0:
+            raise ValueError(f'The prefix length in {ip_address} is invalid')
+
+        self._zone = zone
+        try:
+            self._interface_index = (int(zone) if zone.isdigit() else socket.if_nametoindex(zone)) if zone else 0
+        except OSError:
+            raise pyuavcan.transport.InvalidMediaConfigurationError(
+                f'Bad IP configuration: network interface {zone!r} does not exist'
+            ) from None
+
+        self._max_nodes: int = min(2 ** self.NODE_ID_BIT_LENGTH, 2 ** host_bit_length)
+        self._subnet_address = int(self._local.network.network_address)
+
+        maybe_local_node_id = int(self._local.ip) - self._subnet_address
+        if maybe_local_node_id < self._max_nodes:
+            self._local_node_id: typing.Optional[int] = maybe_local_node_id
+            # Test the address configuration to detect configuration errors early.
+            # These checks are only valid if the local node is non-anonymous.
+            for s in [
+                self.make_output_socket(),
+                self.make_input_socket(0, None),
+            ]:
+                # This invariant is supposed to be upheld by the OS, so we use an assertion check.
+                assert ipaddress.IPv6Address(s.getsockname()[0].partition('%')[0]) == self._local.ip, \
+                    'Socket API invariant violation'
+                s.close()
+        else:
+            self._local_node_id = None
+
+        # Test the address configuration to detect configuration errors early.
+        # These checks are valid regardless of whether the local node is anonymous.
+        self.make_input_socket(0, 0).close()
 
     @property
     def max_nodes(self) -> int:
-        raise NotImplementedError
+        return self._max_nodes
+
+    @property
+    def local_node_id(self) -> typing.Optional[int]:
+        return self._local_node_id
 
     @property
-    def local_node_id(self) -> int:
-        raise NotImplementedError
+    def multicast(self) -> bool:
+        return True
+
+    def _map_ip_address_to_node_id_uncached(self, ip: str) -> typing.Optional[int]:
+        try:
+            candidate = int(ipaddress.IPv6Address(ip.partition('%')[0])) - self._subnet_address
+        except ValueError:
+            return None     # E.g., an IPv4 address.
+        return candidate if 0 <= candidate < self._max_nodes else None
+
+    def map_node_id_to_ip_address(self, node_id: int) -> str:
+        if 0 <= node_id < self._max_nodes:
+            ip = ipaddress.IPv6Address(self._subnet_address + node_id)
+            assert ip in self._local.network
+            # Link-local destinations are ambiguous without the zone index.
+            return f'{ip}%{self._zone}' if self._zone and ip.is_link_local else str(ip)
+        raise ValueError(f'Cannot map the node-ID value {node_id} to an IP address. '
+                         f'The range of valid node-ID values is [0, {self._max_nodes})')
+
+    def map_subject_id_to_ip_address(self, subject_id: int) -> str:
+        return str(ipaddress.IPv6Address(_MULTICAST_GROUP_BASE + subject_id))
+
+    def make_output_socket(self) -> socket.socket:
+        if self.local_node_id is None:
+            raise pyuavcan.transport.OperationNotDefinedForAnonymousNodeError(
+                f'Anonymous UDP/IP nodes cannot emit transfers, they can only listen. '
+                f'The local IP address is {self._local}.'
+            )
 
-    def map_ip_address_to_node_id(self, ip: str) -> typing.Optional[int]:
-        raise NotImplementedError
+        bind_to = str(self._local.ip)
+        s = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        s.setblocking(False)
+        try:
+            # Output sockets shall be bound to ensure that outgoing packets have the correct source IP address.
+            s.bind((bind_to, 0, 0, self._interface_index))  # Bind to an ephemeral port.
+        except OSError as ex:
+            s.close()
+            if ex.errno == errno.EADDRNOTAVAIL:
+                raise pyuavcan.transport.InvalidMediaConfigurationError(
+                    f'Bad IP configuration: cannot bind output socket to {bind_to} [{errno.errorcode[ex.errno]}]'
+                ) from None
+            raise  # pragma: no cover
 
-    def make_output_socket(self, remote_node_id: typing.Optional[int], remote_port: int) -> socket.socket:
-        raise NotImplementedError
+        # The multicast loopback is enabled by default; it is needed for the nodes running on the same host.
+        if self._interface_index:
+            s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, self._interface_index)
 
-    def make_input_socket(self, local_port: int, expect_broadcast: bool) -> socket.socket:
-        raise NotImplementedError
+        _logger.debug('%r: New output socket %r', self, s)
+        return s
+
+    def make_input_socket(self, local_port: int, subject_id: typing.Optional[int]) -> socket.socket:
+        s = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        s.setblocking(False)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+
+        # See the IPv4 network map for the rationale; the same considerations apply to multicast.
+        if subject_id is not None or self.local_node_id is None:
+            s.bind(('', local_port))
+        else:
+            bind_to = str(self._local.ip)
+            try:
+                s.bind((bind_to, local_port, 0, self._interface_index))
+            except OSError as ex:
+                s.close()
+                if ex.errno == errno.EADDRNOTAVAIL:
+                    raise pyuavcan.transport.InvalidMediaConfigurationError(
+                        f'Bad IP configuration: cannot bind input socket to {bind_to} [{errno.errorcode[ex.errno]}]'
+                    ) from None
+                raise  # pragma: no cover
+
+        if subject_id is not None:
+            group = self.map_subject_id_to_ip_address(subject_id)
+            if sys.platform.startswith('linux'):
+                # Do not receive the datagrams of the groups joined by other sockets on the host.
+                s.setsockopt(socket.IPPROTO_IPV6, _IPV6_MULTICAST_ALL, 0)
+            try:
+                s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP,
+                             socket.inet_pton(socket.AF_INET6, group) + struct.pack('@I', self._interface_index))
+            except OSError as ex:
+                s.close()
+                raise pyuavcan.transport.InvalidMediaConfigurationError(
+                    f'Bad IP configuration: cannot join multicast group {group} [{ex}]'
+                ) from None
+
+        _logger.debug('%r: New input socket %r, local port %r, subject-ID: %r',
+                      self, s, local_port, subject_id)
+        return s
 
     def __str__(self) -> str:
-        raise NotImplementedError
+        return f'{self._local.ip}%{self._zone}/{self._local.network.prefixlen}' if self._zone else str(self._local)
+
+
+# noinspection PyProtectedMember
+def _unittest_network_map_ipv6() -> None:
+    from pytest import raises
+
+    with raises(ValueError):
+        NetworkMap.new('::1/128')               # No host bits.
+
+    with raises(ValueError):
+        NetworkMap.new('::1/0')
+
+    with raises(ValueError):
+        NetworkMap.new('::x/64')
+
+    with raises(pyuavcan.transport.InvalidMediaConfigurationError):
+        NetworkMap.new('fd00::1/64')            # Suppose that the test machine does not have such interface.
+
+    with raises(pyuavcan.transport.InvalidMediaConfigurationError):
+        NetworkMap.new('::1%nonexistent0/64')
+
+    nm = NetworkMap.new('::1')                  # The default prefix length.
+    assert str(nm) == '::1/116'
+    assert nm.max_nodes == 2 ** NetworkMap.NODE_ID_BIT_LENGTH
+    assert nm.local_node_id == 1
+
+    nm = NetworkMap.new(' ::1/64 ')
+    assert isinstance(nm, NetworkMapIPv6)
+    assert str(nm) == '::1/64'
+    assert nm.multicast
+    assert nm.max_nodes == 2 ** NetworkMap.NODE_ID_BIT_LENGTH
+    assert nm.local_node_id == 1
+    assert nm.map_ip_address_to_node_id('::1') == 1
+    assert nm.map_ip_address_to_node_id('0:0::fff') == 4095
+    assert nm.map_ip_address_to_node_id('::1000') is None
+    assert nm.map_ip_address_to_node_id('fd00::1') is None
+    assert nm.map_ip_address_to_node_id('127.0.0.1') is None
+    assert nm.map_node_id_to_ip_address(0) == '::'
+    assert nm.map_node_id_to_ip_address(4095) == '::fff'
+    with raises(ValueError):
+        nm.map_node_id_to_ip_address(4096)
+    assert nm.map_subject_id_to_ip_address(0) == 'ff12::1:0'
+    assert nm.map_subject_id_to_ip_address(12345) == 'ff12::1:3039'
+    assert nm.map_subject_id_to_ip_address(32767) == 'ff12::1:7fff'
+
+    # Ensure the source IP address is specified correctly in outgoing UDP frames.
+    out = nm.make_output_socket()
+    inp = nm.make_input_socket(24321, None)
+    out.sendto(b'Well, I got here the same way the coin did.', (nm.map_node_id_to_ip_address(1), 24321))
+    data, sockaddr = inp.recvfrom(1024)
+    assert data == b'Well, I got here the same way the coin did.'
+    assert nm.map_ip_address_to_node_id(sockaddr[0]) == 1
+    out.close()
+    inp.close()
+    nm.make_input_socket(24321, 12345).close()  # Joins the group.
+
+    # The host bits exceed the node-ID range, so the node is anonymous; it is not required to exist locally.
+    iface_index, iface_name = socket.if_nameindex()[0]
+    nm = NetworkMap.new(f'fe80::1:0%{iface_name}/64')
+    assert str(nm) == f'fe80::1:0%{iface_name}/64'
+    assert nm.local_node_id is None
+    assert nm.map_node_id_to_ip_address(5) == f'fe80::5%{iface_name}'
+    assert nm.map_ip_address_to_node_id(f'fe80::5%{iface_name}') == 5
+    with raises(pyuavcan.transport.OperationNotDefinedForAnonymousNodeError):
+        nm.make_output_socket()
+    nm.make_input_socket(24321, 12345).close()
+    assert NetworkMap.new(f'fe80::1:0%{iface_index}/64').local_node_id is None    # The zone index may be numeric.
@@ -12,6 +12,12 @@ import logging
 import pyuavcan.util
 
 
+_MAX_FOREIGN_CACHE_ENTRIES = 1024
+"""
+The number of cached addresses that do not map to a node-ID is limited because they may be arbitrary
+(e.g., foreign hosts on the same network or spoofed traffic). Once the limit is reached, such entries are flushed.
+"""
+
 _logger = logging.getLogger(__name__)
 
 
@@ -29,6 +35,16 @@ class NetworkMap(abc.ABC):
 
     If none of the available network interfaces have the supplied IP address, the constructor will raise
     :class:`pyuavcan.transport.InvalidMediaConfigurationError`.
+
+    Message transfers are sent either to the broadcast address of the subnet or to a multicast group
+    dedicated to the subject (see :meth:`map_subject_id_to_ip_address`).
+    With multicast, the network interface controller and the kernel discard the traffic of the subjects
+    that no local socket is subscribed to, so the application does not have to filter it in user space.
+    All nodes on the network shall use the same mode.
+
+    The mapping from IP address to node-ID is invoked for every received datagram, so it is cached;
+    addresses that do not map to a node-ID are cached too (negative caching).
+    The configuration of the instance is immutable, so the cache never needs to be invalidated.
     """
 
     NODE_ID_BIT_LENGTH = 12
@@ -37,17 +53,22 @@ class NetworkMap(abc.ABC):
     A node-ID is the set of this many least significant bits of the IP address of the node.
     """
 
+    def __init__(self) -> None:
+        self._ip_to_nid_cache: typing.Dict[str, typing.Optional[int]] = {}
+        self._num_foreign_cache_entries = 0
+
     @staticmethod
-    def new(ip_address: str) -> NetworkMap:
+    def new(ip_address: str, multicast: bool = False) -> NetworkMap:
         """
         Use this factory to create new instances.
+        IPv6 does not support broadcast, so IPv6 networks always use multicast regardless of the second argument.
         """
         if ':' in ip_address:
             from ._ipv6 import NetworkMapIPv6
             return NetworkMapIPv6(ip_address)
         else:
             from ._ipv4 import NetworkMapIPv4
-            return NetworkMapIPv4(ip_address)
+            return NetworkMapIPv4(ip_address, multicast=multicast)
 
     @property
     @abc.abstractmethod
@@ -68,7 +89,14 @@ class NetworkMap(abc.ABC):
         """
         raise NotImplementedError
 
+    @property
     @abc.abstractmethod
+    def multicast(self) -> bool:
+        """
+        True if message transfers are sent to per-subject multicast groups; False if they are broadcast.
+        """
+        raise NotImplementedError
+
     def map_ip_address_to_node_id(self, ip: str) -> typing.Optional[int]:
         """
         Attempts to convert the IP address into a valid node-ID.
@@ -76,12 +104,43 @@ class NetworkMap(abc.ABC):
         or belongs to a different subnet.
         This method is intended to be invoked frequently, approx. once per received frame.
         """
+        # Unclean strings will decrease the cache performance. Do we want to strip() them beforehand?
+        try:
+            return self._ip_to_nid_cache[ip]
+        except LookupError:
+            node_id = self._map_ip_address_to_node_id_uncached(ip)
+            _logger.debug('%r: New IP to node-ID mapping: %r --> %s', self, ip, node_id)
+            if node_id is None:
+                if self._num_foreign_cache_entries >= _MAX_FOREIGN_CACHE_ENTRIES:
+                    _logger.debug('%r: Flushing %d cached foreign addresses', self, self._num_foreign_cache_entries)
+                    self._ip_to_nid_cache = {k: v for k, v in self._ip_to_nid_cache.items() if v is not None}
+                    self._num_foreign_cache_entries = 0
+                self._num_foreign_cache_entries += 1
+            self._ip_to_nid_cache[ip] = node_id
+            return node_id
+
+    @abc.abstractmethod
+    def map_node_id_to_ip_address(self, node_id: int) -> str:
+        """
+        Returns the IP address of the node with the specified node-ID.
+        Raises :class:`ValueError` if the node-ID cannot be mapped to an IP address.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def map_subject_id_to_ip_address(self, subject_id: int) -> str:
+        """
+        Returns the IP address that the message transfers of the specified subject are sent to:
+        the broadcast address of the subnet or the multicast group of the subject, depending on the mode.
+        """
         raise NotImplementedError
 
     @abc.abstractmethod
-    def make_output_socket(self, remote_node_id: typing.Optional[int], remote_port: int) -> socket.socket:
+    def make_output_socket(self) -> socket.socket:
         """
-        Make a new non-blocking output socket connected to the specified port at the specified node or broadcast.
+        Make a new non-blocking unconnected output socket that can be used to send datagrams to any node
+        on the network, including broadcast or multicast; the destination is specified per datagram
+        (see :meth:`map_node_id_to_ip_address` and :meth:`map_subject_id_to_ip_address`).
         The socket will be bound to an ephemeral port at the configured local network address.
         The required options (such as ``SO_BROADCAST`` etc) will be set up as needed automatically.
         Timestamping will need to be enabled separately.
@@ -90,17 +149,20 @@ class NetworkMap(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def make_input_socket(self, local_port: int, expect_broadcast: bool) -> socket.socket:
+    def make_input_socket(self, local_port: int, subject_id: typing.Optional[int]) -> socket.socket:
         r"""
         Makes a new non-blocking input socket bound to the specified port.
         The required socket options will be set up as needed automatically.
         Timestamping will need to be enabled separately.
 
-        If the "expect broadcast" parameter is True, the bind address may be INADDR_ANY
+        If the subject-ID is specified, the socket is intended for message transfers, so it shall be able to
+        accept datagrams sent to the address of the subject (see :meth:`map_subject_id_to_ip_address`);
+        in the multicast mode, the socket joins the multicast group of the subject.
+        For broadcast-capable sockets, the bind address may be INADDR_ANY
         in order to allow reception of broadcast datagrams,
         so the user of the socket will have to filter out packets manually in user space;
         the background is explained here: https://stackoverflow.com/a/58118503/1007777.
-        If that parameter is False, the socket may be bound to the local IP address,
+        If the subject-ID is not specified (service transfers), the socket may be bound to the local IP address,
         which on some OS will make it reject all broadcast traffic.
         The positive side-effect of binding to a specific address instead of INADDR_ANY
         is that on GNU/Linux it will allow multiple processes to bind to and receive unicast
@@ -123,7 +185,7 @@ class NetworkMap(abc.ABC):
                                                     \
                                                      ------>    INADDR_ANY:1234 (socket B, OK)
 
-        The expect-broadcast option allows us to run more than one node on localhost side-by-side,
+        This distinction allows us to run more than one node on localhost side-by-side,
         which is convenient for testing. Otherwise, each node interested in the same UAVCAN service
         would bind to the same UDP port at INADDR_ANY, and on GNU/Linux the result would be that
         only the latest bound node would be able to receive unicast traffic directed to that port.
@@ -131,12 +193,17 @@ class NetworkMap(abc.ABC):
         On other operating systems this problem may not exist though.
 
         :param local_port: The UDP port to bind to (function of the data specifier).
-        :param expect_broadcast: If True, the socket shall be able to accept broadcast datagrams.
-            If False, acceptance of broadcast datagrams is possible but not guaranteed.
+        :param subject_id: If specified, the socket shall be able to accept broadcast or multicast datagrams
+            carrying the messages of this subject.
+            If not specified, acceptance of such datagrams is possible but not guaranteed.
             This option enables certain optimizations depending on the underlying OS.
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def _map_ip_address_to_node_id_uncached(self, ip: str) -> typing.Optional[int]:
+        raise NotImplementedError
+
     @abc.abstractmethod
     def __str__(self) -> str:
         """
@@ -146,4 +213,4 @@ class NetworkMap(abc.ABC):
         raise NotImplementedError
 
     def __repr__(self) -> str:
-        return pyuavcan.util.repr_attributes(self, str(self), max_nodes=self.max_nodes)
+        return pyuavcan.util.repr_attributes(self, str(self), max_nodes=self.max_nodes, multicast=self.multicast)
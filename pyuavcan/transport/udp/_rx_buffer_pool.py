@@ -0,0 +1,188 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from __future__ import annotations
+import typing
+import collections
+
+
+class RxBufferPool:
+    """
+    Datagrams are received into large preallocated slabs instead of allocating a new buffer per datagram.
+    The received data is returned as a memoryview onto the slab; since the rest of the stack is zero-copy,
+    such views may be carried all the way up to the application.
+    Once the current slab is used up, it is retired and a new one is taken, preferably a retired slab
+    that is no longer referenced by any memoryview.
+    A slab cannot be recycled while at least one view onto it is alive, so an application that keeps a small
+    fraction of the received payloads can pin many slabs; the number of retired slabs tracked for recycling
+    is therefore limited, the excess is left to the garbage collector.
+    Retired slabs that are no longer referenced are kept only up to a small number of spares,
+    so that the memory pinned by a burst of retained payloads is given back once they are released.
+
+    Instances are not thread-safe.
+    """
+
+    def __init__(self, slab_size: int, max_retired_slabs: int = 16, max_spare_slabs: int = 2) -> None:
+        if slab_size < 1:
+            raise ValueError(f'Invalid slab size: {slab_size}')
+        if max_retired_slabs < 0:
+            raise ValueError(f'Invalid number of retired slabs: {max_retired_slabs}')
+        if max_spare_slabs < 0:
+            raise ValueError(f'Invalid number of spare slabs: {max_spare_slabs}')
+        self._slab_size = int(slab_size)
+        self._max_spare_slabs = int(max_spare_slabs)
+        self._retired: typing.Deque[bytearray] = collections.deque(maxlen=int(max_retired_slabs))
+        # The first slab is allocated when it is first needed to avoid wasting memory on idle instances.
+        self._slab = bytearray()
+        self._view = memoryview(self._slab)
+        self._offset = self._slab_size
+        self._slabs_allocated = 0
+        self._slabs_recycled = 0
+
+    @property
+    def slab_size(self) -> int:
+        return self._slab_size
+
+    @property
+    def slabs_allocated(self) -> int:
+        return self._slabs_allocated
+
+    @property
+    def slabs_recycled(self) -> int:
+        return self._slabs_recycled
+
+    def get_write_buffer(self, min_size: int) -> memoryview:
+        """
+        Returns a writable buffer of at least the specified size to receive the data into.
+        The buffer is valid until the next invocation of :meth:`commit` or this method.
+        """
+        if min_size > self._slab_size:
+            raise ValueError(f'Requested {min_size} bytes but the slab size is {self._slab_size} bytes')
+        if self._offset + min_size > self._slab_size:
+            self._rotate()
+        return self._view[self._offset:]
+
+    def commit(self, size: int) -> memoryview:
+        """
+        Marks the first ``size`` bytes of the write buffer as used and returns a view onto them.
+        The returned view keeps the slab from being recycled until it is released.
+        """
+        out = self._view[self._offset:self._offset + size]
+        self._offset += (size + _ALIGNMENT - 1) & ~(_ALIGNMENT - 1)
+        return out
+
+    def _rotate(self) -> None:
+        # Our own view is released so that only the views handed out to the consumers keep the slab exported.
+        self._view.release()
+        slab: typing.Optional[bytearray] = None
+        num_spare = 0
+        for _ in range(len(self._retired)):
+            candidate = self._retired.popleft()
+            if _is_exported(candidate):
+                self._retired.append(candidate)     # Still pinned, check again at the next rotation.
+            elif slab is None:
+                slab = candidate
+            elif num_spare < self._max_spare_slabs:
+                self._retired.append(candidate)
+                num_spare += 1
+            # The excess of free slabs is dropped.
+        if self._retired.maxlen and self._slab:
+            self._retired.append(self._slab)
+        if slab is None:
+            slab = bytearray(self._slab_size)
+            self._slabs_allocated += 1
+        else:
+            self._slabs_recycled += 1
+        self._slab = slab
+        self._view = memoryview(self._slab)
+        self._offset = 0
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(slab_size={self._slab_size}, ' \
+            f'allocated={self._slabs_allocated}, recycled={self._slabs_recycled}, retired={len(self._retired)})'
+
+
+_ALIGNMENT = 8
+
+
+def _is_exported(b: bytearray) -> bool:
+    """
+    A bytearray cannot be resized while there are buffer exports (e.g., memoryviews) onto it.
+    Shrinking by one byte and growing back does not reallocate the memory.
+    """
+    try:
+        last = b.pop()
+    except BufferError:
+        return True
+    b.append(last)
+    return False
+
+
+# noinspection PyProtectedMember
+def _unittest_rx_buffer_pool() -> None:
+    import gc
+    from pytest import raises
+
+    with raises(ValueError):
+        RxBufferPool(0)
+
+    pool = RxBufferPool(64, max_retired_slabs=2)
+    assert pool.slab_size == 64
+    assert pool.slabs_allocated == 0
+    with raises(ValueError):
+        pool.get_write_buffer(65)
+
+    buf = pool.get_write_buffer(30)
+    assert len(buf) == 64
+    buf[:5] = b'hello'  # type: ignore
+    a = pool.commit(5)
+    assert a == b'hello'
+    buf = pool.get_write_buffer(30)
+    assert len(buf) == 56    # Aligned.
+    buf[:5] = b'world'  # type: ignore
+    b = pool.commit(5)
+    assert a == b'hello' and b == b'world'
+    del buf
+
+    buf = pool.get_write_buffer(60)     # No space left, a new slab is allocated because the old one is referenced.
+    assert len(buf) == 64
+    pool.commit(60)
+    del buf
+    assert pool.slabs_allocated == 2 and pool.slabs_recycled == 0
+    assert a == b'hello' and b == b'world'   # The data is not affected.
+
+    pool.get_write_buffer(60)
+    pool.commit(60)     # The second slab is not referenced by anyone, but the first one is still referenced.
+    assert pool.slabs_allocated == 3 and pool.slabs_recycled == 0
+
+    del a, b
+    gc.collect()
+    pool.get_write_buffer(60)       # Now the first slab is free and it is recycled.
+    assert pool.slabs_allocated == 3 and pool.slabs_recycled == 1
+    print(pool)
+
+    # Free slabs above the limit of spares are dropped; only the pinned ones and the spares are kept.
+    pool = RxBufferPool(8, max_retired_slabs=10, max_spare_slabs=1)
+    with raises(ValueError):
+        RxBufferPool(8, max_spare_slabs=-1)
+    views = []
+    for _ in range(6):
+        pool.get_write_buffer(8)
+        views.append(pool.commit(8))
+    assert pool.slabs_allocated == 6 and len(pool._retired) == 5
+    del views[1:]
+    gc.collect()
+    pool.get_write_buffer(8)        # One free slab is recycled, one is kept as a spare, the rest are dropped.
+    assert pool.slabs_allocated == 6 and pool.slabs_recycled == 1
+    assert len(pool._retired) == 3  # The pinned one, the spare, and the one that has just been retired.
+    assert views[0] == bytes(8)
+
+    # With recycling disabled, new slabs are always allocated.
+    pool = RxBufferPool(8, max_retired_slabs=0)
+    for _ in range(3):
+        pool.get_write_buffer(8)
+        pool.commit(8)
+    assert pool.slabs_allocated == 3 and pool.slabs_recycled == 0
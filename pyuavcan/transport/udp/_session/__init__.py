@@ -14,3 +14,5 @@ from ._input import SelectiveUDPInputSessionStatistics as SelectiveUDPInputSessi
 
 from ._output import UDPOutputSession as UDPOutputSession
 from ._output import UDPFeedback as UDPFeedback
+
+from ._output_socket import UDPOutputSocket as UDPOutputSocket
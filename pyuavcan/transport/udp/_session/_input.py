@@ -11,6 +11,7 @@ import typing
 import asyncio
 import logging
 import dataclasses
+import collections
 import pyuavcan
 from pyuavcan.transport.commons.high_overhead_transport import TransferReassembler
 from .._frame import UDPFrame
@@ -128,7 +129,8 @@ class UDPInputSession(pyuavcan.transport.InputSession):
 
         # TODO: implement data type hash validation. https://github.com/UAVCAN/specification/issues/60
 
-        transfer = self._get_reassembler(source_node_id).process_frame(frame, self._transfer_id_timeout)
+        transfer = self._get_reassembler(source_node_id, frame.timestamp.monotonic_ns) \
+            .process_frame(frame, self._transfer_id_timeout)
         if transfer is not None:
             self._statistics.transfers += 1
             self._statistics.payload_bytes += sum(map(len, transfer.fragmented_payload))
@@ -186,7 +188,10 @@ class UDPInputSession(pyuavcan.transport.InputSession):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def _get_reassembler(self, source_node_id: int) -> TransferReassembler:
+    def _get_reassembler(self, source_node_id: int, monotonic_ns: int) -> TransferReassembler:
+        """
+        The second argument is the monotonic timestamp of the frame [nanosecond].
+        """
         raise NotImplementedError
 
 
@@ -198,8 +203,36 @@ class PromiscuousUDPInputSessionStatistics(UDPInputSessionStatistics):
     Keys are source node-IDs; values are dicts where keys are error enum members and values are counts.
     """
 
+    expired_reassemblers: int = 0
+    """
+    The number of reassemblers discarded because their source node has been silent for longer than
+    the transfer-ID timeout. This does not affect the behavior of the session.
+    """
+
+    evicted_reassemblers: int = 0
+    """
+    The number of reassemblers of active source nodes discarded to keep the number of reassemblers within
+    the limit (see :attr:`PromiscuousUDPInputSession.max_reassemblers`).
+    A partially received transfer or the ability to reject a duplicate transfer may be lost on eviction.
+    """
+
 
 class PromiscuousUDPInputSession(UDPInputSession):
+    """
+    A reassembler is created upon reception of the first frame from a source node.
+    Reassemblers are kept in the order of last use; those whose source node has been silent for longer than the
+    transfer-ID timeout are discarded, since their state would be reset by the transfer-ID timeout anyway.
+    The total number of reassemblers is limited; when the limit is reached, the least recently used one is evicted.
+    This keeps the memory use bounded for long-running sessions on busy or churning networks (e.g., monitors),
+    and releases the payload fragments of abandoned transfers.
+    The counters are reported via :class:`PromiscuousUDPInputSessionStatistics`.
+    """
+
+    DEFAULT_MAX_REASSEMBLERS = 1024
+    """
+    Can be overridden after instantiation if needed.
+    """
+
     def __init__(self,
                  specifier:        pyuavcan.transport.InputSessionSpecifier,
                  payload_metadata: pyuavcan.transport.PayloadMetadata,
@@ -209,7 +242,10 @@ class PromiscuousUDPInputSession(UDPInputSession):
         Do not call this directly, use the factory method instead.
         """
         self._statistics_impl = PromiscuousUDPInputSessionStatistics()
-        self._reassemblers: typing.Dict[int, TransferReassembler] = {}
+        # Ordered from the least to the most recently used. The value contains the time of the last use.
+        self._reassemblers: collections.OrderedDict[int, typing.Tuple[TransferReassembler, int]] = \
+            collections.OrderedDict()
+        self._max_reassemblers = self.DEFAULT_MAX_REASSEMBLERS
         super(PromiscuousUDPInputSession, self).__init__(specifier=specifier,
                                                          payload_metadata=payload_metadata,
                                                          loop=loop,
@@ -218,31 +254,71 @@ class PromiscuousUDPInputSession(UDPInputSession):
     def sample_statistics(self) -> PromiscuousUDPInputSessionStatistics:
         return copy.copy(self._statistics)
 
+    @property
+    def max_reassemblers(self) -> int:
+        """
+        The maximum number of source nodes whose transfer reassembly state is kept simultaneously.
+        If the value is reduced below the current number of reassemblers, the excess is evicted upon reception
+        of the next frame. The value must be a positive integer, otherwise you get a :class:`ValueError`.
+        """
+        return self._max_reassemblers
+
+    @max_reassemblers.setter
+    def max_reassemblers(self, value: int) -> None:
+        if value > 0:
+            self._max_reassemblers = int(value)
+        else:
+            raise ValueError(f'Invalid value for the maximum number of reassemblers: {value}')
+
     @property
     def _statistics(self) -> PromiscuousUDPInputSessionStatistics:
         return self._statistics_impl
 
-    def _get_reassembler(self, source_node_id: int) -> TransferReassembler:
+    def _get_reassembler(self, source_node_id: int, monotonic_ns: int) -> TransferReassembler:
         assert isinstance(source_node_id, int) and source_node_id >= 0, 'Internal protocol violation'
+        reassemblers = self._reassemblers
+
+        # The least recently used entries are at the front, so this is O(1) unless there is something to expire.
+        deadline = monotonic_ns - round(self._transfer_id_timeout * 1e9)
+        while reassemblers:
+            oldest_node_id = next(iter(reassemblers))
+            if reassemblers[oldest_node_id][1] >= deadline:
+                break
+            del reassemblers[oldest_node_id]
+            self._statistics.expired_reassemblers += 1
+            _logger.debug('%s: Reassembler of node %d expired (%d left)', self, oldest_node_id, len(reassemblers))
+
         try:
-            return self._reassemblers[source_node_id]
+            reasm, _ = reassemblers[source_node_id]
         except LookupError:
-            def on_reassembly_error(error: TransferReassembler.Error) -> None:
-                self._statistics.errors += 1
-                d = self._statistics.reassembly_errors_per_source_node_id[source_node_id]
-                try:
-                    d[error] += 1
-                except LookupError:
-                    d[error] = 1
-
-            self._statistics.reassembly_errors_per_source_node_id.setdefault(source_node_id, {})
-            reasm = TransferReassembler(source_node_id=source_node_id,
-                                        max_payload_size_bytes=self._payload_metadata.max_size_bytes,
-                                        on_error_callback=on_reassembly_error)
-            self._reassemblers[source_node_id] = reasm
-            _logger.debug('%s: New %s (%d total)', self, reasm, len(self._reassemblers))
+            pass
+        else:
+            reassemblers[source_node_id] = reasm, monotonic_ns
+            reassemblers.move_to_end(source_node_id)
             return reasm
 
+        while len(reassemblers) >= self._max_reassemblers:
+            evicted_node_id, _ = reassemblers.popitem(last=False)
+            self._statistics.evicted_reassemblers += 1
+            _logger.debug('%s: Reassembler of node %d evicted to make room for node %d',
+                          self, evicted_node_id, source_node_id)
+
+        def on_reassembly_error(error: TransferReassembler.Error) -> None:
+            self._statistics.errors += 1
+            d = self._statistics.reassembly_errors_per_source_node_id[source_node_id]
+            try:
+                d[error] += 1
+            except LookupError:
+                d[error] = 1
+
+        self._statistics.reassembly_errors_per_source_node_id.setdefault(source_node_id, {})
+        reasm = TransferReassembler(source_node_id=source_node_id,
+                                    max_payload_size_bytes=self._payload_metadata.max_size_bytes,
+                                    on_error_callback=on_reassembly_error)
+        reassemblers[source_node_id] = reasm, monotonic_ns
+        _logger.debug('%s: New %s (%d total)', self, reasm, len(reassemblers))
+        return reasm
+
 
 @dataclasses.dataclass
 class SelectiveUDPInputSessionStatistics(UDPInputSessionStatistics):
@@ -289,6 +365,60 @@ class SelectiveUDPInputSession(UDPInputSession):
     def _statistics(self) -> SelectiveUDPInputSessionStatistics:
         return self._statistics_impl
 
-    def _get_reassembler(self, source_node_id: int) -> TransferReassembler:
+    def _get_reassembler(self, source_node_id: int, monotonic_ns: int) -> TransferReassembler:
         assert source_node_id == self._reassembler.source_node_id, 'Internal protocol violation'
         return self._reassembler
+
+
+# noinspection PyProtectedMember
+def _unittest_udp_promiscuous_input_session_reassembler_eviction() -> None:
+    from pytest import raises
+    from pyuavcan.transport import InputSessionSpecifier, MessageDataSpecifier, PayloadMetadata, Priority, Timestamp
+
+    loop = asyncio.get_event_loop()
+    await_ = loop.run_until_complete
+
+    ses = PromiscuousUDPInputSession(InputSessionSpecifier(MessageDataSpecifier(1234), None),
+                                     PayloadMetadata(0, 100),
+                                     loop,
+                                     lambda: None)
+    assert ses.max_reassemblers == PromiscuousUDPInputSession.DEFAULT_MAX_REASSEMBLERS
+    with raises(ValueError):
+        ses.max_reassemblers = 0
+    ses.transfer_id_timeout = 1.0
+    ses.max_reassemblers = 3
+
+    def push(source_node_id: int, monotonic: float, transfer_id: int = 0) -> typing.Optional[int]:
+        ses._process_frame(source_node_id, UDPFrame(timestamp=Timestamp(0, round(monotonic * 1e9)),
+                                                    priority=Priority.LOW,
+                                                    transfer_id=transfer_id,
+                                                    index=0,
+                                                    end_of_transfer=True,
+                                                    payload=memoryview(b'abc'),
+                                                    data_type_hash=0))
+        tr = await_(ses.receive_until(0))
+        return tr.transfer_id if tr is not None else None
+
+    def nodes() -> typing.List[int]:
+        return list(ses._reassemblers.keys())
+
+    assert push(1, 10.0, 5) == 5
+    assert push(2, 10.2) == 0
+    assert push(1, 10.4, 5) is None     # Duplicate; the reassembler of node 1 is still there.
+    assert nodes() == [2, 1]            # Ordered by the time of last use.
+    assert push(3, 10.6) == 0
+    assert push(4, 10.8) == 0           # The limit is reached, the least recently used one is evicted.
+    assert nodes() == [1, 3, 4]
+    st = ses.sample_statistics()
+    assert st.evicted_reassemblers == 1 and st.expired_reassemblers == 0
+
+    assert push(4, 11.7) is None        # Nodes 1 and 3 have been silent for longer than the transfer-ID timeout.
+    assert nodes() == [4]
+    st = ses.sample_statistics()
+    assert st.evicted_reassemblers == 1 and st.expired_reassemblers == 2
+    assert st.transfers == 4
+
+    assert push(1, 11.8, 5) == 5        # The expired state is re-created transparently.
+    assert nodes() == [4, 1]
+    assert set(st.reassembly_errors_per_source_node_id.keys()) == {1, 2, 3, 4}
+    ses.close()
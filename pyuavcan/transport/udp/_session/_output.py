@@ -4,6 +4,7 @@
 # Author: Pavel Kirienko <pavel.kirienko@zubax.com>
 #
 
+from __future__ import annotations
 import copy
 import socket as socket_
 import typing
@@ -11,6 +12,7 @@ import asyncio
 import logging
 import pyuavcan
 from .._frame import UDPFrame
+from ._output_socket import UDPOutputSocket
 
 
 _logger = logging.getLogger(__name__)
@@ -39,18 +41,33 @@ class UDPOutputSession(pyuavcan.transport.OutputSession):
     Here we just split the transfer into frames, encode the frames, and write them into the socket one by one.
     If the transfer multiplier is greater than one (for unreliable networks),
     we repeat that the required number of times.
+
+    The socket is not owned by the session: all output sessions of a transport instance share one unconnected
+    socket, and the destination endpoint is specified per datagram.
+
+    On GNU/Linux, while the feedback is enabled, the transmission timestamps are provided by the kernel
+    (``SO_TIMESTAMPING``): hardware timestamps if the network interface is configured to generate them,
+    software timestamps otherwise.
+    The timestamps are read from the error queue of the socket by the event loop, so the feedback is delivered
+    asynchronously shortly after the transfer is sent.
+    Since the socket is shared, timestamping stays enabled while at least one session needs the feedback.
+    If the kernel does not report the timestamp in time, or if kernel timestamping is not available,
+    the feedback carries the timestamp sampled in user space when the first frame was written into the socket.
+    Hardware timestamps belong to the clock of the network interface, which is assumed to be synchronized
+    with the system clock (e.g., using PTP).
     """
     def __init__(self,
                  specifier:        pyuavcan.transport.OutputSessionSpecifier,
                  payload_metadata: pyuavcan.transport.PayloadMetadata,
                  mtu:              int,
                  multiplier:       int,
-                 sock:             socket_.socket,
+                 sock:             UDPOutputSocket,
+                 destination:      typing.Tuple[str, int],
                  loop:             asyncio.AbstractEventLoop,
                  finalizer:        typing.Callable[[], None]):
         """
         Do not call this directly. Instead, use the factory method.
-        Instances take ownership of the socket.
+        The socket is shared with other sessions, so it is not closed when the session is closed.
         """
         self._closed = False
         self._specifier = specifier
@@ -58,6 +75,7 @@ class UDPOutputSession(pyuavcan.transport.OutputSession):
         self._mtu = int(mtu)
         self._multiplier = int(multiplier)
         self._sock = sock
+        self._destination = destination
         self._loop = loop
         self._finalizer = finalizer
         self._feedback_handler: typing.Optional[typing.Callable[[pyuavcan.transport.Feedback], None]] = None
@@ -97,33 +115,29 @@ class UDPOutputSession(pyuavcan.transport.OutputSession):
             )
         ]
 
-        tx_timestamp = await self._emit(frames, monotonic_deadline)
-        if tx_timestamp is None:
+        result = await self._emit(frames, monotonic_deadline)
+        if result is None:
             return False
 
         self._statistics.transfers += 1
 
-        # Once we have transmitted at least one copy of a multiplied transfer, it's a success.
-        # We don't care if redundant copies fail.
-        for _ in range(self._multiplier - 1):
-            if not await self._emit(frames, monotonic_deadline):
-                break
-
         if self._feedback_handler is not None:
-            try:
-                self._feedback_handler(UDPFeedback(original_transfer_timestamp=transfer.timestamp,
-                                                   first_frame_transmission_timestamp=tx_timestamp))
-            except Exception as ex:  # pragma: no cover
-                _logger.exception(f'Unhandled exception in the output session feedback handler '
-                                  f'{self._feedback_handler}: {ex}')
-
+            tx_timestamp, first_datagram_id = result
+            original_transfer_timestamp = transfer.timestamp
+            self._sock.expect_tx_timestamp(first_datagram_id,
+                                           tx_timestamp,
+                                           lambda ts: self._deliver_feedback(original_transfer_timestamp, ts))
         return True
 
     def enable_feedback(self, handler: typing.Callable[[pyuavcan.transport.Feedback], None]) -> None:
+        if self._feedback_handler is None and not self._closed:
+            self._sock.acquire_tx_timestamping()
         self._feedback_handler = handler
 
     def disable_feedback(self) -> None:
-        self._feedback_handler = None
+        if self._feedback_handler is not None:
+            self._feedback_handler = None
+            self._sock.release_tx_timestamping()
 
     @property
     def specifier(self) -> pyuavcan.transport.OutputSessionSpecifier:
@@ -140,51 +154,81 @@ class UDPOutputSession(pyuavcan.transport.OutputSession):
         if not self._closed:
             self._closed = True
             try:
-                self._sock.close()
+                self.disable_feedback()
             finally:
                 self._finalizer()
 
     @property
     def socket(self) -> socket_.socket:
         """
-        Provides access to the underlying UDP socket.
+        Provides access to the underlying UDP socket. It is shared with the other output sessions
+        of the same transport instance and it is not connected.
         """
-        return self._sock
+        return self._sock.socket
+
+    @property
+    def destination_endpoint(self) -> typing.Tuple[str, int]:
+        """
+        The IP address and the UDP port that the datagrams are sent to.
+        """
+        return self._destination
 
     async def _emit(self,
                     header_payload_pairs: typing.Sequence[typing.Tuple[memoryview, memoryview]],
-                    monotonic_deadline:   float) -> typing.Optional[pyuavcan.transport.Timestamp]:
+                    monotonic_deadline:   float) -> typing.Optional[typing.Tuple[pyuavcan.transport.Timestamp, int]]:
         """
-        Returns the transmission timestamp of the first frame (which is the transfer timestamp) on success.
-        Returns None if at least one frame could not be transmitted.
+        Emits all frames of the transfer followed by its redundant copies (if the multiplier is greater than one).
+        Returns the transmission timestamp of the first frame (which is the transfer timestamp) on success
+        along with the ID of its datagram, which is needed to match the timestamp reported by the kernel.
+        The ID is captured when the first frame is actually sent because other sessions may write into
+        the shared socket while this one is waiting.
+        Returns None if at least one frame of the first copy could not be transmitted.
+        Once we have transmitted at least one copy of a multiplied transfer, it's a success;
+        we don't care if redundant copies time out, but their emission is abandoned on the first such failure.
+
+        Each frame is first written directly into the socket, which normally succeeds immediately because the
+        socket is non-blocking and the kernel buffer is rarely full. The event loop is involved only if the
+        socket is not writeable at the moment, which keeps the common case free of scheduling overhead.
         """
-        ts: typing.Optional[pyuavcan.transport.Timestamp] = None
-        for index, (header, payload) in enumerate(header_payload_pairs):
+        result: typing.Optional[typing.Tuple[pyuavcan.transport.Timestamp, int]] = None
+        num_frames = len(header_payload_pairs)
+        for copy_index in range(self._multiplier):
+            for index, (header, payload) in enumerate(header_payload_pairs):
+                try:
+                    while True:
+                        if monotonic_deadline <= self._loop.time():
+                            raise asyncio.TimeoutError
+                        datagram_id = self._sock.datagram_counter
+                        if self._sock.try_send(header, payload, self._destination):
+                            break
+                        await self._sock.wait_writable(monotonic_deadline)
+                    result = result or (pyuavcan.transport.Timestamp.now(), datagram_id)
+
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    self._statistics.drops += num_frames - index
+                    return None if copy_index == 0 else result
+                except Exception:
+                    self._statistics.errors += 1
+                    raise
+                else:
+                    self._statistics.frames += 1
+                    self._statistics.payload_bytes += len(payload)
+
+        return result
+
+    def _deliver_feedback(self,
+                          original_transfer_timestamp:        pyuavcan.transport.Timestamp,
+                          first_frame_transmission_timestamp: pyuavcan.transport.Timestamp) -> None:
+        handler = self._feedback_handler
+        if handler is not None:
             try:
-                # TODO: concatenation is inefficient. Use vectorized IO via sendmsg() instead!
-                await asyncio.wait_for(self._loop.sock_sendall(self._sock, b''.join((header, payload))),
-                                       timeout=monotonic_deadline - self._loop.time(),
-                                       loop=self._loop)
-
-                # TODO: use socket timestamping when running on Linux (Windows does not support timestamping).
-                # Depending on the chosen approach, timestamping on Linux may require us to launch a new thread
-                # reading from the socket's error message queue and then matching the returned frames with a
-                # pending loopback registry, kind of like it's done with CAN.
-                ts = ts or pyuavcan.transport.Timestamp.now()
-
-            except (asyncio.TimeoutError, asyncio.CancelledError):
-                self._statistics.drops += len(header_payload_pairs) - index
-                return None
-            except Exception:
-                self._statistics.errors += 1
-                raise
-            else:
-                self._statistics.frames += 1
-                self._statistics.payload_bytes += len(payload)
-
-        return ts
+                handler(UDPFeedback(original_transfer_timestamp=original_transfer_timestamp,
+                                    first_frame_transmission_timestamp=first_frame_transmission_timestamp))
+            except Exception as ex:  # pragma: no cover
+                _logger.exception(f'Unhandled exception in the output session feedback handler {handler}: {ex}')
 
 
+# noinspection PyProtectedMember
 def _unittest_output_session() -> None:
     from pytest import raises
     from pyuavcan.transport import OutputSessionSpecifier, MessageDataSpecifier, ServiceDataSpecifier, Priority
@@ -211,24 +255,25 @@ def _unittest_output_session() -> None:
     sock_rx.bind(destination_endpoint)
     sock_rx.settimeout(1.0)
 
-    def make_sock() -> socket_.socket:
-        sock = socket_.socket(socket_.AF_INET, socket_.SOCK_DGRAM)
-        sock.bind(('127.100.0.2', 0))
-        sock.connect(destination_endpoint)
-        sock.setblocking(False)
-        return sock
+    sock = socket_.socket(socket_.AF_INET, socket_.SOCK_DGRAM)
+    sock.bind(('127.100.0.2', 0))
+    sock.setblocking(False)
+    shared_sock = UDPOutputSocket(sock, loop)
 
     sos = UDPOutputSession(
         specifier=OutputSessionSpecifier(MessageDataSpecifier(3210), None),
         payload_metadata=PayloadMetadata(0xdead_beef_badc0ffe, 1024),
         mtu=11,
         multiplier=1,
-        sock=make_sock(),
+        sock=shared_sock,
+        destination=destination_endpoint,
         loop=asyncio.get_event_loop(),
         finalizer=do_finalize,
     )
 
     assert sos.specifier == OutputSessionSpecifier(MessageDataSpecifier(3210), None)
+    assert sos.destination_endpoint == destination_endpoint
+    assert sos.socket is sock
     assert sos.destination_node_id is None
     assert sos.payload_metadata == PayloadMetadata(0xdead_beef_badc0ffe, 1024)
     assert sos.sample_statistics() == SessionStatistics()
@@ -266,6 +311,7 @@ def _unittest_output_session() -> None:
                  fragmented_payload=[]),
         loop.time() + 10.0
     ))
+    run_until_complete(asyncio.sleep(0.1))  # The kernel timestamp is delivered asynchronously.
     assert last_feedback is not None
     assert last_feedback.original_transfer_timestamp == ts
     assert check_timestamp(last_feedback.first_frame_transmission_timestamp)
@@ -286,11 +332,11 @@ def _unittest_output_session() -> None:
         drops=0
     )
 
-    assert sos.socket.fileno() >= 0
     assert not finalized
     sos.close()
     assert finalized
-    assert sos.socket.fileno() < 0  # The socket is supposed to be disposed of.
+    assert sos.socket.fileno() >= 0  # The socket is shared, so it is not disposed of with the session.
+    assert shared_sock._maybe_tx_timestamper is None
     finalized = False
 
     # Multi-frame with multiplication
@@ -299,7 +345,8 @@ def _unittest_output_session() -> None:
         payload_metadata=PayloadMetadata(0xdead_beef_badc0ffe, 1024),
         mtu=10,
         multiplier=2,
-        sock=make_sock(),
+        sock=shared_sock,
+        destination=destination_endpoint,
         loop=asyncio.get_event_loop(),
         finalizer=do_finalize,
     )
@@ -337,12 +384,46 @@ def _unittest_output_session() -> None:
         + b'e' + pyuavcan.transport.commons.crc.CRC32C.new(b'one', b'two', b'three').value_as_bytes
     )
 
+    # The event loop is used to wait for the socket to become writeable when it is not writeable immediately.
+    # Here, every other attempt is rejected as if the socket buffer were full.
+    fast_path_attempts = 0
+    try_send_original = shared_sock.try_send
+
+    def try_send_blocked(header: memoryview, payload: memoryview, endpoint: typing.Tuple[str, int]) -> bool:
+        nonlocal fast_path_attempts
+        fast_path_attempts += 1
+        return try_send_original(header, payload, endpoint) if fast_path_attempts % 2 == 0 else False
+
+    setattr(shared_sock, 'try_send', try_send_blocked)
+    assert run_until_complete(sos.send_until(
+        Transfer(timestamp=ts,
+                 priority=Priority.OPTIONAL,
+                 transfer_id=54321,
+                 fragmented_payload=[memoryview(b'one'), memoryview(b'two'), memoryview(b'three')]),
+        loop.time() + 10.0
+    ))
+    assert fast_path_attempts == 8
+    setattr(shared_sock, 'try_send', try_send_original)
+    assert [sock_rx.recvfrom(1000)[0] for _ in range(4)] == [data_main_a, data_main_b, data_main_a, data_main_b]
+    with raises(socket_.timeout):
+        sock_rx.recvfrom(1000)
+    assert sos.sample_statistics() == SessionStatistics(
+        transfers=2,
+        frames=8,
+        payload_bytes=2 * 2 * (10 + 5),
+        errors=0,
+        drops=0
+    )
+    sos.close()
+    finalized = False
+
     sos = UDPOutputSession(
         specifier=OutputSessionSpecifier(ServiceDataSpecifier(321, ServiceDataSpecifier.Role.REQUEST), 2222),
         payload_metadata=PayloadMetadata(0xdead_beef_badc0ffe, 1024),
         mtu=10,
         multiplier=1,
-        sock=make_sock(),
+        sock=shared_sock,
+        destination=destination_endpoint,
         loop=asyncio.get_event_loop(),
         finalizer=do_finalize,
     )
@@ -365,7 +446,7 @@ def _unittest_output_session() -> None:
     )
 
     # Induced failure
-    sos.socket.close()
+    shared_sock.close()
     with raises(OSError):
         assert not run_until_complete(sos.send_until(
             Transfer(timestamp=ts,
@@ -0,0 +1,407 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+from __future__ import annotations
+import sys
+import time
+import errno
+import struct
+import socket as socket_
+import typing
+import asyncio
+import logging
+import pyuavcan
+
+
+_logger = logging.getLogger(__name__)
+
+
+class UDPOutputSocket:
+    """
+    A non-blocking unconnected UDP socket shared by all output sessions of a transport instance.
+    The destination is specified per datagram, so the number of file descriptors and kernel buffers does not depend
+    on the number of output sessions (i.e., on the number of destination nodes multiplied by the number of ports).
+
+    The datagrams sent via the socket are counted in order to match them with the transmission timestamps
+    reported by the kernel, if TX timestamping is enabled (see :meth:`acquire_tx_timestamping`).
+    """
+
+    def __init__(self, sock: socket_.socket, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        The instance takes ownership of the socket.
+        """
+        self._sock = sock
+        self._fd = sock.fileno()
+        self._loop = loop
+        self._datagram_counter = 0
+        self._writers: typing.List[asyncio.Future[None]] = []
+        self._maybe_tx_timestamper: typing.Optional[_TxTimestamper] = None
+        self._tx_timestamping_users = 0
+        self._closed = False
+
+    @property
+    def socket(self) -> socket_.socket:
+        return self._sock
+
+    @property
+    def datagram_counter(self) -> int:
+        """
+        The number of datagrams sent via the socket since TX timestamping was enabled;
+        this is the ID that the kernel assigns to the next datagram.
+        """
+        return self._datagram_counter
+
+    def try_send(self, header: memoryview, payload: memoryview, endpoint: typing.Tuple[str, int]) -> bool:
+        """
+        Attempts to write the datagram into the socket without blocking.
+        Uses vectorized IO where available to avoid copying the payload.
+        Returns False if the socket is not writeable at the moment; raises on error.
+        """
+        try:
+            if _HAS_SENDMSG:
+                self._sock.sendmsg((header, payload), (), 0, endpoint)
+            else:  # pragma: no cover
+                self._sock.sendto(b''.join((header, payload)), endpoint)
+        except (BlockingIOError, InterruptedError):
+            return False
+        self._datagram_counter += 1
+        return True
+
+    async def wait_writable(self, monotonic_deadline: float) -> None:
+        """
+        Waits until the socket becomes writeable. Any number of tasks can wait concurrently.
+        Raises :class:`asyncio.TimeoutError` if the deadline is reached first.
+        """
+        fut: asyncio.Future[None] = self._loop.create_future()
+        try:
+            if not self._writers:
+                self._loop.add_writer(self._fd, self._on_writable)
+        except NotImplementedError:  # pragma: no cover
+            # Some event loops (e.g., the proactor loop on Windows) cannot monitor sockets; fall back to polling.
+            await asyncio.sleep(min(_POLLING_INTERVAL, max(0.0, monotonic_deadline - self._loop.time())))
+            if monotonic_deadline <= self._loop.time():
+                raise asyncio.TimeoutError
+            return
+        self._writers.append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout=monotonic_deadline - self._loop.time(), loop=self._loop)
+        finally:
+            if fut in self._writers:
+                self._writers.remove(fut)
+                if not self._writers:
+                    self._loop.remove_writer(self._fd)
+
+    def acquire_tx_timestamping(self) -> None:
+        """
+        Enables kernel TX timestamping if it is not yet enabled; the calls shall be balanced with
+        :meth:`release_tx_timestamping`. Timestamping is disabled when the last user releases it.
+        """
+        self._tx_timestamping_users += 1
+        if self._maybe_tx_timestamper is None and not self._closed:
+            self._maybe_tx_timestamper = _TxTimestamper.try_new(self._sock, self._loop)
+            self._datagram_counter = 0  # The kernel restarts the datagram numbering when timestamping is enabled.
+
+    def release_tx_timestamping(self) -> None:
+        self._tx_timestamping_users -= 1
+        assert self._tx_timestamping_users >= 0
+        if self._tx_timestamping_users == 0 and self._maybe_tx_timestamper is not None:
+            self._maybe_tx_timestamper.close()
+            self._maybe_tx_timestamper = None
+
+    def expect_tx_timestamp(self,
+                            datagram_id: int,
+                            fallback:    pyuavcan.transport.Timestamp,
+                            callback:    typing.Callable[[pyuavcan.transport.Timestamp], None]) -> None:
+        """
+        The callback will be invoked with the kernel timestamp of the specified datagram.
+        If kernel timestamping is not available or the timestamp is not reported in time,
+        the callback will be invoked with the fallback timestamp (immediately if timestamping is not available).
+        """
+        if self._maybe_tx_timestamper is not None:
+            self._maybe_tx_timestamper.expect(datagram_id, fallback, callback)
+        else:
+            callback(fallback)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            if self._maybe_tx_timestamper is not None:
+                self._maybe_tx_timestamper.close()
+                self._maybe_tx_timestamper = None
+            for fut in self._writers:
+                fut.cancel()
+            if self._writers:
+                self._writers.clear()
+                self._loop.remove_writer(self._fd)
+            self._sock.close()
+
+    def _on_writable(self) -> None:
+        self._loop.remove_writer(self._fd)
+        writers, self._writers = self._writers, []
+        for fut in writers:
+            if not fut.done():
+                fut.set_result(None)
+
+    def __repr__(self) -> str:
+        return pyuavcan.util.repr_attributes_noexcept(self, self._sock, datagram_counter=self._datagram_counter)
+
+
+_HAS_SENDMSG = hasattr(socket_.socket, 'sendmsg')
+"""
+Windows does not support scatter-gather IO, so the header and the payload are concatenated there.
+"""
+
+_POLLING_INTERVAL = 0.001
+
+
+class _TxTimestamper:
+    """
+    Collects the transmission timestamps reported by the kernel via the error queue of the socket (GNU/Linux only).
+    The kernel numbers the datagrams sent via the socket sequentially starting from zero
+    (``SOF_TIMESTAMPING_OPT_ID``), which is how the timestamps are matched with the pending transfers.
+    If the timestamp of a datagram does not arrive within the timeout, the fallback timestamp is reported instead.
+    """
+
+    def __init__(self, sock: socket_.socket, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Use the factory method instead; it checks whether timestamping is supported.
+        """
+        self._sock = sock
+        self._fd = sock.fileno()
+        self._loop = loop
+        self._pending: typing.Dict[int, typing.Tuple[typing.Callable[[pyuavcan.transport.Timestamp], None],
+                                                     asyncio.Handle]] = {}
+
+    @staticmethod
+    def try_new(sock: socket_.socket, loop: asyncio.AbstractEventLoop) -> typing.Optional[_TxTimestamper]:
+        """
+        Returns None if kernel timestamping is not available on this platform, socket, or event loop.
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            sock.setsockopt(socket_.SOL_SOCKET, _SO_TIMESTAMPING, _TIMESTAMPING_FLAGS)
+        except OSError as ex:  # pragma: no cover
+            _logger.info('Kernel TX timestamping is not available for %r: %s', sock, ex)
+            return None
+        out = _TxTimestamper(sock, loop)
+        try:
+            # The socket is reported readable when there are entries in its error queue.
+            loop.add_reader(out._fd, out._on_readable)
+        except NotImplementedError:  # pragma: no cover
+            _logger.info('The event loop does not support add_reader(); TX timestamping is disabled for %r', sock)
+            sock.setsockopt(socket_.SOL_SOCKET, _SO_TIMESTAMPING, 0)
+            return None
+        return out
+
+    def expect(self,
+               datagram_id: int,
+               fallback:    pyuavcan.transport.Timestamp,
+               callback:    typing.Callable[[pyuavcan.transport.Timestamp], None]) -> None:
+        """
+        The callback will be invoked with the kernel timestamp of the specified datagram, or with the fallback
+        timestamp if the kernel timestamp does not arrive in time.
+        """
+        datagram_id &= _DATAGRAM_ID_MASK
+        handle = self._loop.call_later(_TX_TIMESTAMP_TIMEOUT, self._on_timeout, datagram_id, fallback)
+        self._pending[datagram_id] = callback, handle
+
+    def close(self) -> None:
+        for _, handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+        self._loop.remove_reader(self._fd)
+        if self._sock.fileno() >= 0:
+            self._sock.setsockopt(socket_.SOL_SOCKET, _SO_TIMESTAMPING, 0)
+
+    def _on_timeout(self, datagram_id: int, fallback: pyuavcan.transport.Timestamp) -> None:
+        try:
+            callback, _ = self._pending.pop(datagram_id)
+        except LookupError:  # pragma: no cover
+            return
+        _logger.debug('%r: The TX timestamp of datagram %d has not been reported, using the fallback',
+                      self, datagram_id)
+        callback(fallback)
+
+    def _on_readable(self) -> None:
+        # The kernel timestamps belong to the system clock; the monotonic clock is extrapolated from this reference.
+        ref_system_ns, ref_monotonic_ns = time.time_ns(), time.monotonic_ns()
+        for _ in range(_MAX_ERROR_QUEUE_ENTRIES_PER_READ):
+            try:
+                _, ancdata, _, _ = self._sock.recvmsg(0, _ERROR_QUEUE_ANCILLARY_DATA_BUFFER_SIZE,
+                                                      socket_.MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as ex:
+                if ex.errno == errno.EAGAIN:  # pragma: no cover
+                    break
+                _logger.exception('%r: Could not read the error queue: %s', self, ex)
+                self._loop.remove_reader(self._fd)
+                return
+
+            system_ns: typing.Optional[int] = None
+            datagram_id: typing.Optional[int] = None
+            for cmsg_level, cmsg_type, cmsg_data in ancdata:
+                if cmsg_level == socket_.SOL_SOCKET and cmsg_type == _SO_TIMESTAMPING:
+                    sw_sec, sw_nsec, _, _, hw_sec, hw_nsec = _SCM_TIMESTAMPING_STRUCT.unpack(cmsg_data)
+                    sec, nsec = (hw_sec, hw_nsec) if hw_sec or hw_nsec else (sw_sec, sw_nsec)
+                    system_ns = sec * 1_000_000_000 + nsec
+                elif (cmsg_level, cmsg_type) in _RECVERR_CMSG:
+                    ee_errno, ee_origin, _, _, _, ee_info, ee_data = \
+                        _SOCK_EXTENDED_ERR_STRUCT.unpack_from(cmsg_data)
+                    if ee_errno == errno.ENOMSG and ee_origin == _SO_EE_ORIGIN_TIMESTAMPING and \
+                            ee_info == _SCM_TSTAMP_SND:
+                        datagram_id = ee_data
+
+            if system_ns is not None and datagram_id is not None:
+                try:
+                    callback, handle = self._pending.pop(datagram_id)
+                except LookupError:
+                    continue    # Not the first frame of a transfer, or the timeout has already expired.
+                handle.cancel()
+                age_ns = max(0, ref_system_ns - system_ns)
+                callback(pyuavcan.transport.Timestamp(system_ns=system_ns,
+                                                      monotonic_ns=max(0, ref_monotonic_ns - age_ns)))
+
+        # The socket is not supposed to receive any data; discard it to prevent it from remaining readable forever.
+        try:
+            while True:
+                self._sock.recv(1)
+        except OSError:
+            pass
+
+    def __repr__(self) -> str:
+        return pyuavcan.util.repr_attributes_noexcept(self, self._sock, pending=len(self._pending))
+
+
+# From the Linux kernel; not exposed via the Python's socket module. SCM_TIMESTAMPING has the same value.
+_SO_TIMESTAMPING = 37
+
+_TIMESTAMPING_FLAGS = (
+    (1 << 0)        # SOF_TIMESTAMPING_TX_HARDWARE
+    | (1 << 1)      # SOF_TIMESTAMPING_TX_SOFTWARE
+    | (1 << 4)      # SOF_TIMESTAMPING_SOFTWARE
+    | (1 << 6)      # SOF_TIMESTAMPING_RAW_HARDWARE
+    | (1 << 7)      # SOF_TIMESTAMPING_OPT_ID
+    | (1 << 11)     # SOF_TIMESTAMPING_OPT_TSONLY -- don't loop the datagram back with the timestamp
+)
+
+_SCM_TSTAMP_SND = 0
+_SO_EE_ORIGIN_TIMESTAMPING = 4
+
+# (SOL_IP, IP_RECVERR) and (SOL_IPV6, IPV6_RECVERR).
+_RECVERR_CMSG = {(0, 11), (41, 25)}
+
+_SCM_TIMESTAMPING_STRUCT = struct.Struct('@llllll')    # struct scm_timestamping { struct timespec ts[3]; }
+_SOCK_EXTENDED_ERR_STRUCT = struct.Struct('=IBBBBII')
+
+_ERROR_QUEUE_ANCILLARY_DATA_BUFFER_SIZE = 512
+
+_MAX_ERROR_QUEUE_ENTRIES_PER_READ = 1000
+
+_DATAGRAM_ID_MASK = 2 ** 32 - 1
+
+_TX_TIMESTAMP_TIMEOUT = 1.0
+"""
+If the kernel does not report the timestamp within this time [second], the fallback timestamp is used.
+"""
+
+
+# noinspection PyProtectedMember
+def _unittest_output_socket() -> None:
+    from pytest import raises
+
+    loop = asyncio.get_event_loop()
+    sock_rx = socket_.socket(socket_.AF_INET, socket_.SOCK_DGRAM)
+    sock_rx.bind(('127.100.0.1', 0))
+    sock_rx.settimeout(1.0)
+    sock = socket_.socket(socket_.AF_INET, socket_.SOCK_DGRAM)
+    sock.bind(('127.100.0.2', 0))
+    sock.setblocking(False)
+    out = UDPOutputSocket(sock, loop)
+    assert out.socket is sock
+    assert out.datagram_counter == 0
+
+    assert out.try_send(memoryview(b'abc'), memoryview(b'def'), sock_rx.getsockname())
+    assert out.datagram_counter == 1
+    data, endpoint = sock_rx.recvfrom(1024)
+    assert data == b'abcdef'
+    assert endpoint == sock.getsockname()
+
+    # The socket is writeable, so all waiters are released at once.
+    async def wait_many() -> None:
+        await asyncio.gather(*[out.wait_writable(loop.time() + 1.0) for _ in range(3)])
+
+    loop.run_until_complete(wait_many())
+    assert not out._writers
+
+    # Timeout: pretend that the socket is never writeable.
+    setattr(out, '_on_writable', lambda: None)
+    with raises(asyncio.TimeoutError):
+        loop.run_until_complete(out.wait_writable(loop.time() + 0.1))
+    assert not out._writers
+
+    # Feedback without timestamping is delivered immediately with the fallback timestamp.
+    reported: typing.List[pyuavcan.transport.Timestamp] = []
+    ts = pyuavcan.transport.Timestamp.now()
+    out.expect_tx_timestamp(123, ts, reported.append)
+    assert reported == [ts]
+
+    out.acquire_tx_timestamping()
+    out.acquire_tx_timestamping()
+    assert out.datagram_counter == 0
+    assert (out._maybe_tx_timestamper is not None) == sys.platform.startswith('linux')
+    out.release_tx_timestamping()
+    assert (out._maybe_tx_timestamper is not None) == sys.platform.startswith('linux')
+    out.release_tx_timestamping()
+    assert out._maybe_tx_timestamper is None
+
+    out.close()
+    out.close()  # Idempotency.
+    assert sock.fileno() < 0
+    sock_rx.close()
+
+
+def _unittest_output_session_tx_timestamper() -> None:
+    from pytest import approx
+    from pyuavcan.transport import Timestamp
+
+    loop = asyncio.get_event_loop()
+    sock_rx = socket_.socket(socket_.AF_INET, socket_.SOCK_DGRAM)
+    sock_rx.bind(('127.100.0.1', 0))
+    sock = socket_.socket(socket_.AF_INET, socket_.SOCK_DGRAM)
+    sock.bind(('127.100.0.2', 0))
+    sock.connect(sock_rx.getsockname())
+    sock.setblocking(False)
+
+    tts = _TxTimestamper.try_new(sock, loop)
+    if not sys.platform.startswith('linux'):  # pragma: no cover
+        assert tts is None
+        return
+    assert tts is not None
+
+    reported: typing.Dict[int, Timestamp] = {}
+    before = Timestamp.now()
+    for index in range(3):
+        sock.sendmsg([b'datagram'])
+    after = Timestamp.now()
+    fallback = Timestamp(system_ns=0, monotonic_ns=0)
+    tts.expect(1, fallback, lambda t: reported.__setitem__(1, t))
+    tts.expect(7, fallback, lambda t: reported.__setitem__(7, t))     # Never sent, the timestamp will not arrive.
+    loop.run_until_complete(asyncio.sleep(0.1))
+    assert list(reported.keys()) == [1]
+    assert before.system_ns <= reported[1].system_ns <= after.system_ns
+    assert reported[1].monotonic_ns - before.monotonic_ns == approx(reported[1].system_ns - before.system_ns,
+                                                                    abs=1e6)
+    loop.run_until_complete(asyncio.sleep(_TX_TIMESTAMP_TIMEOUT))
+    assert reported[7] == fallback
+
+    tts.expect(3, fallback, lambda t: reported.__setitem__(3, t))
+    tts.close()
+    loop.run_until_complete(asyncio.sleep(_TX_TIMESTAMP_TIMEOUT))
+    assert 3 not in reported     # Pending entries are dropped on closure.
+    sock.close()
+    sock_rx.close()
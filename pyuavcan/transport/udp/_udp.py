@@ -11,11 +11,12 @@ import logging
 import dataclasses
 import pyuavcan
 from ._session import UDPInputSession, SelectiveUDPInputSession, PromiscuousUDPInputSession
-from ._session import UDPOutputSession
+from ._session import UDPOutputSession, UDPOutputSocket
 from ._frame import UDPFrame
 from ._network_map import NetworkMap
 from ._port_mapping import udp_port_from_data_specifier
 from ._demultiplexer import UDPDemultiplexer, UDPDemultiplexerStatistics
+from ._rx_buffer_pool import RxBufferPool
 
 
 # This is for internal use only: the maximum possible payload per UDP frame.
@@ -77,7 +78,9 @@ class UDPTransport(pyuavcan.transport.Transport):
                  ip_address:                  str,
                  mtu:                         int = DEFAULT_MTU,
                  service_transfer_multiplier: int = DEFAULT_SERVICE_TRANSFER_MULTIPLIER,
-                 loop:                        typing.Optional[asyncio.AbstractEventLoop] = None):
+                 loop:                        typing.Optional[asyncio.AbstractEventLoop] = None,
+                 copy_on_deliver:             bool = False,
+                 multicast:                   bool = False):
         """
         :param ip_address: Specifies which local IP address to use for this transport.
             This setting also implicitly specifies the network interface to use.
@@ -131,7 +134,8 @@ class UDPTransport(pyuavcan.transport.Transport):
 
             IPv6 addresses may be specified without the mask, in which case it will be assumed to be
             equal ``128 - NODE_ID_BIT_LENGTH``.
-            Don't forget to specify the scope-ID for link-local IPv6 addresses.
+            Don't forget to specify the scope-ID for link-local IPv6 addresses; e.g., ``fe80::1%eth0/64``.
+            IPv6 does not support broadcast, so the message transfers are always multicast (see below).
 
         :param mtu: The application-level MTU for outgoing packets.
             In other words, this is the maximum number of payload bytes per UDP frame.
@@ -145,11 +149,24 @@ class UDPTransport(pyuavcan.transport.Transport):
             This setting does not affect message transfers.
 
         :param loop: The event loop to use. Defaults to :func:`asyncio.get_event_loop`.
+
+        :param copy_on_deliver: The received datagrams are stored in pooled memory slabs which are recycled once
+            all payloads referencing them are released.
+            If the application retains received payloads for a long time, the slabs cannot be recycled;
+            set this option to copy each payload into a dedicated buffer before delivery instead.
+
+        :param multicast: IPv4 only. If True, message transfers are sent to multicast groups, one per subject,
+            instead of the subnet broadcast address; e.g., the messages of subject 12345 are sent to
+            ``239.0.48.57``. The network interface controller and the kernel then discard the traffic of
+            the subjects that are not subscribed to, instead of the application doing that.
+            All nodes on the network shall use the same mode.
+            Large networks may require IGMP snooping to be enabled in the switches to benefit from this.
         """
-        self._network_map = NetworkMap.new(ip_address)
+        self._network_map = NetworkMap.new(ip_address, multicast=multicast)
         self._mtu = int(mtu)
         self._srv_multiplier = int(service_transfer_multiplier)
         self._loop = loop if loop is not None else asyncio.get_event_loop()
+        self._copy_on_deliver = bool(copy_on_deliver)
 
         low, high = self.VALID_SERVICE_TRANSFER_MULTIPLIER_RANGE
         if not (low <= self._srv_multiplier <= high):
@@ -163,8 +180,13 @@ class UDPTransport(pyuavcan.transport.Transport):
                       f'local node-ID: {self.local_node_id}')
 
         self._demultiplexer_registry: typing.Dict[pyuavcan.transport.DataSpecifier, UDPDemultiplexer] = {}
+        # All demultiplexers are read from the same thread, so they share one receive buffer pool;
+        # it exists while there is at least one demultiplexer.
+        self._maybe_rx_buffer_pool: typing.Optional[RxBufferPool] = None
         self._input_registry: typing.Dict[pyuavcan.transport.InputSessionSpecifier, UDPInputSession] = {}
         self._output_registry: typing.Dict[pyuavcan.transport.OutputSessionSpecifier, UDPOutputSession] = {}
+        # All output sessions share one unconnected socket; it exists while there is at least one output session.
+        self._maybe_output_socket: typing.Optional[UDPOutputSocket] = None
 
         self._closed = False
         self._statistics = UDPTransportStatistics()
@@ -212,20 +234,30 @@ class UDPTransport(pyuavcan.transport.Transport):
         if specifier not in self._output_registry:
             def finalizer() -> None:
                 del self._output_registry[specifier]
+                if not self._output_registry and self._maybe_output_socket is not None:
+                    _logger.debug('%r: Closing the output socket %r', self, self._maybe_output_socket)
+                    self._maybe_output_socket.close()
+                    self._maybe_output_socket = None
 
             multiplier = \
                 self._srv_multiplier if isinstance(specifier.data_specifier, pyuavcan.transport.ServiceDataSpecifier) \
                 else 1
-            sock = self._network_map.make_output_socket(
-                specifier.remote_node_id,
-                udp_port_from_data_specifier(specifier.data_specifier)
-            )
+            ds = specifier.data_specifier
+            if specifier.remote_node_id is not None:
+                ip_address = self._network_map.map_node_id_to_ip_address(specifier.remote_node_id)
+            else:
+                assert isinstance(ds, pyuavcan.transport.MessageDataSpecifier)
+                ip_address = self._network_map.map_subject_id_to_ip_address(ds.subject_id)
+            destination = ip_address, udp_port_from_data_specifier(ds)
+            if self._maybe_output_socket is None:
+                self._maybe_output_socket = UDPOutputSocket(self._network_map.make_output_socket(), self._loop)
             self._output_registry[specifier] = UDPOutputSession(
                 specifier=specifier,
                 payload_metadata=payload_metadata,
                 mtu=self._mtu,
                 multiplier=multiplier,
-                sock=sock,
+                sock=self._maybe_output_socket,
+                destination=destination,
                 loop=self._loop,
                 finalizer=finalizer,
             )
@@ -270,17 +302,22 @@ class UDPTransport(pyuavcan.transport.Transport):
         try:
             if specifier.data_specifier not in self._demultiplexer_registry:
                 _logger.debug('%r: Setting up new demultiplexer for %s', self, specifier.data_specifier)
-                # Service transfers cannot be broadcast.
-                expect_broadcast = not isinstance(specifier.data_specifier, pyuavcan.transport.ServiceDataSpecifier)
-                udp_port = udp_port_from_data_specifier(specifier.data_specifier)
-                self._demultiplexer_registry[specifier.data_specifier] = UDPDemultiplexer(
-                    sock=self._network_map.make_input_socket(udp_port, expect_broadcast),
+                # Service transfers cannot be broadcast or multicast.
+                ds = specifier.data_specifier
+                subject_id = ds.subject_id if isinstance(ds, pyuavcan.transport.MessageDataSpecifier) else None
+                udp_port = udp_port_from_data_specifier(ds)
+                if self._maybe_rx_buffer_pool is None:
+                    self._maybe_rx_buffer_pool = UDPDemultiplexer.make_buffer_pool(_MAX_UDP_MTU)
+                self._demultiplexer_registry[ds] = UDPDemultiplexer(
+                    sock=self._network_map.make_input_socket(udp_port, subject_id),
                     udp_mtu=_MAX_UDP_MTU,
                     node_id_mapper=self._network_map.map_ip_address_to_node_id,
                     local_node_id=self.local_node_id,
                     statistics=self._statistics.demultiplexer.setdefault(specifier.data_specifier,
                                                                          UDPDemultiplexerStatistics()),
                     loop=self.loop,
+                    copy_on_deliver=self._copy_on_deliver,
+                    buffer_pool=self._maybe_rx_buffer_pool,
                 )
 
             cls: typing.Union[typing.Type[PromiscuousUDPInputSession], typing.Type[SelectiveUDPInputSession]] = \
@@ -330,6 +367,8 @@ class UDPTransport(pyuavcan.transport.Transport):
                     demux.close()
                 finally:
                     del self._demultiplexer_registry[specifier.data_specifier]
+                    if not self._demultiplexer_registry:
+                        self._maybe_rx_buffer_pool = None
 
     def _ensure_not_closed(self) -> None:
         if self._closed:
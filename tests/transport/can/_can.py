@@ -874,6 +874,265 @@ async def _unittest_can_transport_non_anon(caplog: typing.Any) -> None:
     await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
 
 
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_transport_batch_reconfiguration() -> None:
+    from pyuavcan.transport import MessageDataSpecifier, PayloadMetadata, InputSessionSpecifier
+    from .media.mock import MockMedia
+
+    peers: typing.Set[MockMedia] = set()
+    media_batched = MockMedia(peers, 64, 4)
+    media_reference = MockMedia(peers, 64, 4)
+    tr_batched = can.CANTransport(media_batched, 42)
+    tr_reference = can.CANTransport(media_reference, 42)
+    initial_filters = media_batched.acceptance_filters
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 1000)
+
+    def make_sessions(tr: can.CANTransport) -> typing.List[pyuavcan.transport.InputSession]:
+        return [tr.get_input_session(InputSessionSpecifier(MessageDataSpecifier(x * 7), None), meta)
+                for x in range(50)]
+
+    sessions_reference = make_sessions(tr_reference)
+
+    with tr_batched.batch_reconfiguration():
+        with tr_batched.batch_reconfiguration():        # Nesting is allowed.
+            sessions_batched = make_sessions(tr_batched)
+        assert media_batched.acceptance_filters == initial_filters     # Deferred until the outermost context exits.
+    assert media_batched.acceptance_filters == media_reference.acceptance_filters != initial_filters
+
+    with pytest.raises(RuntimeError):
+        with tr_batched.batch_reconfiguration():
+            for s in sessions_batched[1:]:
+                s.close()
+            for s in sessions_reference[1:]:
+                s.close()
+            assert media_batched.acceptance_filters != media_reference.acceptance_filters
+            raise RuntimeError('Filters are reconfigured anyway')
+    assert media_batched.acceptance_filters == media_reference.acceptance_filters
+
+    tr_batched.close()
+    tr_reference.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_transport_batch_reception(monkeypatch: typing.Any) -> None:
+    """
+    Large batches of received frames are processed by a dedicated vectorized pipeline;
+    make sure that its outcome is identical to frame-by-frame processing.
+    """
+    from pyuavcan.transport import MessageDataSpecifier, ServiceDataSpecifier, PayloadMetadata, Priority
+    from pyuavcan.transport import InputSessionSpecifier
+    from pyuavcan.transport.can._identifier import MessageCANID, ServiceCANID
+    from pyuavcan.transport.can._frame import UAVCANFrame, TimestampedUAVCANFrame
+    from .media.mock import MockMedia
+
+    media_batched = MockMedia(set(), 64, 1)
+    media_reference = MockMedia(set(), 64, 1)
+    tr_batched = can.CANTransport(media_batched, 42)
+    tr_reference = can.CANTransport(media_reference, 42)
+    for m in (media_batched, media_reference):
+        m.configure_acceptance_filters([can.media.FilterConfiguration.new_promiscuous()])
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 1000)
+
+    specifiers = [
+        InputSessionSpecifier(MessageDataSpecifier(100), None),
+        InputSessionSpecifier(MessageDataSpecifier(100), 5),
+        InputSessionSpecifier(MessageDataSpecifier(200), 6),
+        InputSessionSpecifier(ServiceDataSpecifier(300, ServiceDataSpecifier.Role.REQUEST), None),
+    ]
+    sessions_batched = [tr_batched.get_input_session(x, meta) for x in specifiers]
+    sessions_reference = [tr_reference.get_input_session(x, meta) for x in specifiers]
+    sessions_batched[0].eager_reassembly = True
+    sessions_reference[0].eager_reassembly = True
+
+    def make_frame(can_id: int, payload: bytes, transfer_id: int) -> can.media.DataFrame:
+        return UAVCANFrame(identifier=can_id,
+                           padded_payload=memoryview(payload),
+                           transfer_id=transfer_id,
+                           start_of_transfer=True,
+                           end_of_transfer=True,
+                           toggle_bit=True,
+                           loopback=False).compile()
+
+    frames: typing.List[can.media.DataFrame] = []
+    for transfer_id in range(8):
+        for source_node_id in range(1, 8):
+            payload = bytes([transfer_id, source_node_id])
+            for subject_id in (100, 200, 201):
+                can_id = MessageCANID(Priority.LOW, source_node_id, subject_id).compile([])
+                frames.append(make_frame(can_id, payload, transfer_id))
+            for destination_node_id in (42, 43):        # The latter is not addressed to us.
+                can_id = ServiceCANID(Priority.HIGH, source_node_id, destination_node_id, 300, True).compile([])
+                frames.append(make_frame(can_id, payload, transfer_id))
+    frames += [
+        make_frame(MessageCANID(Priority.LOW, None, 100).compile([memoryview(b'anon')]), b'anon', 0),
+        can.media.DataFrame(0x123, bytearray(b'base'), can.media.FrameFormat.BASE, loopback=False),
+        can.media.DataFrame(MessageCANID(Priority.LOW, 9, 100).compile([]), bytearray(b'\x80'),  # SOT without toggle
+                            can.media.FrameFormat.EXTENDED, loopback=False),
+        can.media.DataFrame(MessageCANID(Priority.LOW, 9, 100).compile([]), bytearray(b'loop\xE0'),
+                            can.media.FrameFormat.EXTENDED, loopback=True),
+    ]
+
+    assert tr_batched.bit_rate is None
+    assert not tr_batched.traffic_accounting
+    for t in (tr_batched, tr_reference):
+        t.bit_rate = 1_000_000, 4_000_000
+        t.traffic_accounting = True
+    assert tr_batched.bit_rate == (1_000_000, 4_000_000)
+
+    media_batched.inject_received(frames)
+    for f in frames:
+        media_reference.inject_received([f])
+
+    assert tr_batched.sample_statistics() == tr_reference.sample_statistics()
+    stats = tr_batched.sample_statistics()
+    assert stats.in_frames == len(frames) - 2       # The base frame is filtered out by the media; one is loopback.
+    assert stats.in_frames_loopback == 1
+    assert stats.in_frames_uavcan == len(frames) - 3
+    assert stats.in_frames_uavcan_accepted == 8 * 7 + 8 + 8 * 7 + 1
+
+    # The traffic accounting is identical, too. Loopback frames and frames with non-UAVCAN CAN IDs are not included.
+    stats_reference = tr_reference.sample_statistics()
+    assert {k: (v.frames, v.bytes) for k, v in stats.traffic.items()} == \
+        {k: (v.frames, v.bytes) for k, v in stats_reference.traffic.items()}
+    assert stats.traffic[MessageDataSpecifier(100)].frames == 8 * 7 + 2
+    assert stats.traffic[MessageDataSpecifier(100)].bytes == 8 * 7 * 3 + 5 + 1
+    assert stats.traffic[MessageDataSpecifier(100)].frame_rate == pytest.approx(8 * 7 + 2, rel=0.1)
+    assert stats.traffic[ServiceDataSpecifier(300, ServiceDataSpecifier.Role.REQUEST)].frames == 8 * 7 * 2
+    assert sum(x.frames for x in stats.traffic.values()) == len(frames) - 2
+    assert set(stats.bus_utilization.keys()) == {1.0, 10.0, 60.0}
+    assert stats.bus_utilization[1.0] == pytest.approx(stats_reference.bus_utilization[1.0], rel=0.1)
+    # Each frame takes about 100 microseconds, so the 1-second window shows about 3% utilization.
+    assert 0.01 < stats.bus_utilization[1.0] < 0.05
+    tr_batched.bit_rate = None
+    assert tr_batched.sample_statistics().bus_utilization == {}
+    tr_batched.traffic_accounting = True        # No effect if already enabled.
+    assert tr_batched.sample_statistics().traffic[MessageDataSpecifier(100)].frames == 8 * 7 + 2
+    tr_batched.traffic_accounting = False
+    assert not tr_batched.traffic_accounting
+    assert tr_batched.sample_statistics().traffic == {}
+
+    for sb, sr in zip(sessions_batched, sessions_reference):
+        received_batched = []
+        received_reference = []
+        while True:
+            tb = await sb.receive_until(0)
+            tr = await sr.receive_until(0)
+            assert (tb is None) == (tr is None)
+            if tb is None or tr is None:
+                break
+            received_batched.append((tb.source_node_id, tb.transfer_id, b''.join(tb.fragmented_payload)))
+            received_reference.append((tr.source_node_id, tr.transfer_id, b''.join(tr.fragmented_payload)))
+        assert received_batched == received_reference
+        assert received_batched
+        assert sb.sample_statistics() == sr.sample_statistics()
+
+    # If the vectorized stage fails, the batch is processed frame by frame instead of being lost.
+    def parse_batch_failure(_: typing.Any) -> typing.NoReturn:
+        raise RuntimeError('Injected failure')
+
+    monkeypatch.setattr(TimestampedUAVCANFrame, 'parse_batch', parse_batch_failure)
+    more_frames = [make_frame(MessageCANID(Priority.LOW, 5, 100).compile([]), b'more', transfer_id)
+                   for transfer_id in range(8, 24)]
+    media_batched.inject_received(more_frames)
+    for f in more_frames:
+        media_reference.inject_received([f])
+    assert tr_batched.sample_statistics() == tr_reference.sample_statistics()
+    assert tr_batched.sample_statistics().in_frames == stats.in_frames + len(more_frames)
+    assert tr_batched.sample_statistics().in_frames_errored == 0
+    for sb, sr in zip(sessions_batched[:2], sessions_reference[:2]):
+        for transfer_id in range(8, 24):
+            tb = await sb.receive_until(0)
+            assert tb is not None and tb.transfer_id == transfer_id
+            assert tb.fragmented_payload == (await sr.receive_until(0)).fragmented_payload  # type: ignore
+        assert sb.sample_statistics() == sr.sample_statistics()
+
+    tr_batched.close()
+    tr_reference.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_transport_tx_priority() -> None:
+    from pyuavcan.transport import MessageDataSpecifier, PayloadMetadata, Transfer, Priority, Timestamp
+    from pyuavcan.transport import OutputSessionSpecifier
+    from .media.mock import MockMedia, FrameCollector
+
+    class GatedMockMedia(MockMedia):
+        """
+        Holds the bus after the first chunk of frames is accepted until the test lets it go,
+        so that other transfers can queue up.
+        """
+        def __init__(self, peers: typing.Set[MockMedia], mtu: int, number_of_acceptance_filters: int):
+            super(GatedMockMedia, self).__init__(peers, mtu, number_of_acceptance_filters)
+            self.first_chunk_accepted = asyncio.Event()
+            self.gate = asyncio.Event()
+
+        async def send_until(self, frames: typing.Iterable[can.media.DataFrame], monotonic_deadline: float) -> int:
+            out = await super(GatedMockMedia, self).send_until(frames, monotonic_deadline)
+            self.first_chunk_accepted.set()
+            await self.gate.wait()
+            return out
+
+    peers: typing.Set[MockMedia] = set()
+    media = GatedMockMedia(peers, 8, 1)
+    peeper = MockMedia(peers, 8, 1)
+    peeper.configure_acceptance_filters([can.media.FilterConfiguration.new_promiscuous()])
+    collector = FrameCollector()
+    peeper.start(collector.give, False)
+
+    tr = can.CANTransport(media, 42)
+    tr.traffic_accounting = True
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 10000)
+    low = tr.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(1000), None), meta)
+    high = tr.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(2000), None), meta)
+
+    deadline = tr.loop.time() + 1.0
+    low_task = tr.loop.create_task(low.send_until(
+        Transfer(timestamp=Timestamp.now(), priority=Priority.SLOW, transfer_id=0,
+                 fragmented_payload=[_mem('x' * 300)]),  # Dozens of frames.
+        deadline))
+    await asyncio.wait_for(media.first_chunk_accepted.wait(), 1.0)     # The low-priority transfer holds the bus.
+    high_task = tr.loop.create_task(high.send_until(
+        Transfer(timestamp=Timestamp.now(), priority=Priority.EXCEPTIONAL, transfer_id=0,
+                 fragmented_payload=[_mem('urgent')]),
+        deadline))
+    # Let the bus go once the high-priority transfer is waiting for it. Any pending transmitter preempts this key.
+    for _ in range(1000):
+        # noinspection PyProtectedMember
+        if tr._tx_scheduler.is_preempted((2 ** 29, 0)):
+            break
+        await asyncio.sleep(0)
+    else:
+        assert False, 'The high-priority transfer did not get queued'
+    assert not low_task.done()
+    media.gate.set()
+    assert await asyncio.wait_for(high_task, 1.0)
+    assert await asyncio.wait_for(low_task, 1.0)
+
+    frames = []
+    while not collector.empty:
+        frames.append(collector.pop())
+    priorities = [f.identifier >> 26 for f in frames]
+    assert priorities.count(int(Priority.EXCEPTIONAL)) == 1
+    assert 0 < priorities.index(int(Priority.EXCEPTIONAL)) < len(frames) - 1
+
+    stats = tr.sample_statistics()
+    assert stats.out_frames == len(frames)
+    assert stats.traffic[MessageDataSpecifier(2000)].frames == 1
+    assert stats.traffic[MessageDataSpecifier(2000)].bytes == len('urgent') + 1     # Plus the tail byte.
+    assert stats.traffic[MessageDataSpecifier(1000)].frames == len(frames) - 1
+    assert stats.out_queue_latency[Priority.EXCEPTIONAL].transfers == 1
+    assert stats.out_queue_latency[Priority.SLOW].transfers == 1
+    assert stats.out_queue_latency[Priority.NOMINAL].transfers == 0
+    assert stats.out_queue_latency[Priority.NOMINAL].mean == 0
+    assert stats.out_queue_latency[Priority.EXCEPTIONAL].max >= stats.out_queue_latency[Priority.EXCEPTIONAL].mean > 0
+
+    tr.close()
+    peeper.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
 def _mem(data: typing.Union[str, bytes, bytearray]) -> memoryview:
     return memoryview(data.encode() if isinstance(data, str) else data)
 
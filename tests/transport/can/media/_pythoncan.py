@@ -0,0 +1,182 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import time
+import typing
+import asyncio
+import pytest
+import pyuavcan.transport
+from pyuavcan.transport import can
+from pyuavcan.transport.can.media import DataFrame, FrameFormat, FilterConfiguration
+from pyuavcan.transport.can.media.pythoncan import PythonCANMedia
+from .mock import FrameCollector
+
+
+# noinspection PyProtectedMember
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_pythoncan() -> None:
+    loop = asyncio.get_event_loop()
+
+    media_a = PythonCANMedia('virtual:0', 8)
+    media_b = PythonCANMedia('virtual:0', 64)
+
+    assert media_a.loop is loop
+    assert media_a.mtu == 8
+    assert media_b.mtu == 64
+    assert media_a.interface_name == 'virtual:0'
+    assert media_a.number_of_acceptance_filters > 0
+
+    with pytest.raises(ValueError):
+        PythonCANMedia('virtual:0', 7)
+    with pytest.raises(ValueError):
+        PythonCANMedia('virtual', 8)
+
+    rx_a, rx_b = FrameCollector(), FrameCollector()
+    media_a.start(rx_a.give, False)
+    media_b.start(rx_b.give, True)
+    with pytest.raises(RuntimeError):
+        media_a.start(rx_a.give, False)
+
+    # All frames are rejected by default.
+    assert 1 == await media_a.send_until([DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=False)],
+                                         loop.time() + 1.0)
+    await asyncio.sleep(0.3)
+    assert rx_a.empty and rx_b.empty
+
+    media_b.configure_acceptance_filters([FilterConfiguration(123, 2 ** 29 - 1, FrameFormat.EXTENDED),
+                                          FilterConfiguration(456, 2 ** 11 - 1, FrameFormat.BASE)])
+    media_a.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+
+    assert 3 == await media_a.send_until([
+        DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=True),
+        DataFrame(456, bytearray(b'def'), FrameFormat.BASE, loopback=False),
+        DataFrame(124, bytearray(b'ghi'), FrameFormat.EXTENDED, loopback=False),    # Rejected by the filters.
+    ], loop.time() + 1.0)
+    assert 1 == await media_b.send_until([DataFrame(789, bytearray(range(12)), FrameFormat.EXTENDED, loopback=False)],
+                                         loop.time() + 1.0)
+    await asyncio.sleep(0.3)
+
+    fb = rx_b.pop()
+    assert fb.is_same_manifestation(DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=False))
+    assert not fb.loopback
+    assert rx_b.pop().is_same_manifestation(DataFrame(456, bytearray(b'def'), FrameFormat.BASE, loopback=False))
+    assert rx_b.empty
+
+    lb = rx_a.pop()     # The loopback frame is delivered first because it does not go through the bus.
+    assert lb.loopback
+    assert lb.is_same_manifestation(DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=True))
+    fa = rx_a.pop()
+    assert fa.is_same_manifestation(DataFrame(789, bytearray(range(12)), FrameFormat.EXTENDED, loopback=False))
+    assert rx_a.empty
+
+    # An expired deadline prevents transmission.
+    assert 0 == await media_a.send_until([DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=False)],
+                                         loop.time() - 1.0)
+
+    media_a.close()
+    assert media_a._maybe_thread is not None and not media_a._maybe_thread.is_alive()
+    media_a.close()     # Idempotency.
+    with pytest.raises(pyuavcan.transport.ResourceClosedError):
+        await media_a.send_until([DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=False)],
+                                 loop.time() + 1.0)
+    with pytest.raises(pyuavcan.transport.ResourceClosedError):
+        media_a.configure_acceptance_filters([])
+    media_b.close()
+    await asyncio.sleep(0.3)    # Let the reader threads terminate.
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_pythoncan_batching() -> None:
+    """
+    Many frames sent at once are passed to the event loop in a few large batches rather than one by one.
+    """
+    loop = asyncio.get_event_loop()
+    media_a = PythonCANMedia('virtual:batch', 8)
+    media_b = PythonCANMedia('virtual:batch', 8)
+    batches: typing.List[int] = []
+    media_b.start(lambda frames: batches.append(len(list(frames))), False)
+    media_b.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+
+    num_frames = 10_000
+    started_at = time.monotonic()
+    assert num_frames == await media_a.send_until(
+        [DataFrame(i, bytearray(i.to_bytes(4, 'little')), FrameFormat.EXTENDED, loopback=False)
+         for i in range(num_frames)],
+        loop.time() + 10.0
+    )
+    while sum(batches) < num_frames and time.monotonic() - started_at < 10.0:
+        await asyncio.sleep(0.01)
+    elapsed = time.monotonic() - started_at
+    print(f'{num_frames} frames in {len(batches)} batches; {elapsed:.3f} s, {num_frames / elapsed:.0f} frame/s')
+    assert sum(batches) == num_frames
+    assert len(batches) < num_frames
+
+    media_a.close()
+    media_b.close()
+    await asyncio.sleep(0.3)
+
+
+# noinspection PyProtectedMember
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_pythoncan_close() -> None:
+    """
+    The bus is shut down only after the transmission in progress is finished and the reader thread has exited.
+    """
+    loop = asyncio.get_event_loop()
+    media = PythonCANMedia('virtual:close', 8)
+    media.start(lambda _: None, False)
+    events: typing.List[str] = []
+    original_send, original_shutdown = media._bus.send, media._bus.shutdown
+
+    def send(*args: typing.Any, **kwargs: typing.Any) -> None:
+        time.sleep(0.3)     # Emulate a slow adapter.
+        original_send(*args, **kwargs)
+        events.append('send')
+
+    def shutdown() -> None:
+        assert media._maybe_thread is not None and not media._maybe_thread.is_alive()
+        events.append('shutdown')
+        original_shutdown()
+
+    media._bus.send = send
+    media._bus.shutdown = shutdown
+    task = loop.create_task(media.send_until(
+        [DataFrame(i, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=False) for i in range(10)],
+        loop.time() + 10.0
+    ))
+    await asyncio.sleep(0.1)            # The first frame is being sent now.
+    media.close()
+    assert events == ['send', 'shutdown']
+    assert 1 == await task              # The remaining frames are not sent because the media is closed.
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_pythoncan_transport() -> None:
+    from pyuavcan.transport import MessageDataSpecifier, PayloadMetadata, Transfer, Priority, Timestamp
+    from pyuavcan.transport import InputSessionSpecifier, OutputSessionSpecifier
+
+    loop = asyncio.get_event_loop()
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 100)
+    tr_a = can.CANTransport(PythonCANMedia('virtual:transport', 8), 1)
+    tr_b = can.CANTransport(PythonCANMedia('virtual:transport', 8), 2)
+
+    sub = tr_b.get_input_session(InputSessionSpecifier(MessageDataSpecifier(1234), None), meta)
+    pub = tr_a.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(1234), None), meta)
+    payload = memoryview(bytes(range(100)))
+    assert await pub.send_until(Transfer(timestamp=Timestamp.now(),
+                                         priority=Priority.NOMINAL,
+                                         transfer_id=7,
+                                         fragmented_payload=[payload]),
+                                loop.time() + 1.0)
+    transfer = await sub.receive_until(loop.time() + 1.0)
+    assert transfer is not None
+    assert transfer.source_node_id == 1
+    assert transfer.transfer_id == 7
+    assert b''.join(transfer.fragmented_payload) == payload
+
+    tr_a.close()
+    tr_b.close()
+    await asyncio.sleep(0.3)
@@ -28,7 +28,7 @@ async def _unittest_can_socketcan() -> None:
         'Please ensure that the virtual SocketCAN interface "vcan0" is available, and its MTU is set to 64+8.'
 
     media_a = SocketCANMedia('vcan0', 12)
-    media_b = SocketCANMedia('vcan0', 64)
+    media_b = SocketCANMedia('vcan0', 64, reader_thread=False)
 
     assert media_a.mtu == 12
     assert media_b.mtu == 64
@@ -58,7 +58,8 @@ async def _unittest_can_socketcan() -> None:
     media_b.start(on_rx_b, True)
 
     assert media_a._maybe_thread is not None
-    assert media_b._maybe_thread is not None
+    assert media_b._maybe_thread is None            # The event loop is used instead.
+    assert media_b._maybe_reader_fd is not None
 
     await asyncio.sleep(2.0)    # This wait is needed to ensure that the RX thread handles select() timeout properly
 
@@ -113,5 +114,132 @@ async def _unittest_can_socketcan() -> None:
 
     media_a.close()
     media_b.close()
+    assert media_b._maybe_reader_fd is None
 
     await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
+# noinspection PyProtectedMember
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_socketcan_io_modes() -> None:
+    """
+    Compares the round-trip latency and the reception throughput of the threaded and the event-loop-native modes.
+    Both modes shall deliver every frame before the deadline; the figures are printed for comparison.
+    """
+    import time
+    from pyuavcan.transport.can.media import TimestampedDataFrame, DataFrame, FrameFormat, FilterConfiguration
+
+    if sys.platform != 'linux':  # pragma: no cover
+        pytest.skip('SocketCAN test skipped because we do not seem to be on a GNU/Linux-based system')
+
+    from pyuavcan.transport.can.media.socketcan import SocketCANMedia
+    loop = asyncio.get_event_loop()
+
+    for reader_thread in (True, False):
+        tx = SocketCANMedia('vcan0', 8)
+        rx = SocketCANMedia('vcan0', 8, reader_thread=reader_thread)
+        rx.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+        received: typing.List[float] = []
+
+        def on_rx(frames: typing.Iterable[TimestampedDataFrame]) -> None:
+            now = time.monotonic()
+            received.extend(now for _ in frames)
+
+        tx.start(lambda _: None, False)
+        rx.start(on_rx, False)
+        frame = DataFrame(identifier=0xbadc0fe, data=bytearray(8), format=FrameFormat.EXTENDED, loopback=False)
+
+        # Round-trip latency, one frame at a time.
+        latencies: typing.List[float] = []
+        for _ in range(100):
+            received.clear()
+            started_at = time.monotonic()
+            assert 1 == await tx.send_until([frame], loop.time() + 1.0)
+            wait_deadline = started_at + 1.0
+            while not received:
+                assert time.monotonic() < wait_deadline, f'Frame lost; reader_thread={reader_thread}'
+                await asyncio.sleep(0)
+            latencies.append(received[0] - started_at)
+
+        # Throughput: send a burst in chunks; every frame shall be received before the deadline.
+        received.clear()
+        burst = 5000
+        chunk = 50
+        started_at = time.monotonic()
+        wait_deadline = started_at + 10.0
+        for index in range(burst // chunk):
+            assert chunk == await tx.send_until([frame] * chunk, loop.time() + 1.0)
+            # Wait for the chunk before sending the next one to avoid overrunning the socket buffer of the receiver.
+            while len(received) < (index + 1) * chunk:
+                assert time.monotonic() < wait_deadline, \
+                    f'Received {len(received)} of {(index + 1) * chunk} frames; reader_thread={reader_thread}'
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        assert len(received) == burst
+        elapsed = received[-1] - started_at
+
+        latencies.sort()
+        print(f'reader_thread={reader_thread}: '
+              f'latency median {latencies[len(latencies) // 2] * 1e6:.0f} us, '
+              f'max {latencies[-1] * 1e6:.0f} us; '
+              f'throughput {len(received) / elapsed:.0f} frames/s, received {len(received)} of {burst}')
+
+        tx.close()
+        rx.close()
+
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
+# noinspection PyProtectedMember
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_socketcan_tx_deadline_and_fallback() -> None:
+    from pyuavcan.transport.can.media import TimestampedDataFrame, DataFrame, FrameFormat, FilterConfiguration
+
+    if sys.platform != 'linux':  # pragma: no cover
+        pytest.skip('SocketCAN test skipped because we do not seem to be on a GNU/Linux-based system')
+
+    from pyuavcan.transport.can.media.socketcan import SocketCANMedia
+    loop = asyncio.get_event_loop()
+
+    tx = SocketCANMedia('vcan0', 8)
+    rx = SocketCANMedia('vcan0', 8, reader_thread=False)
+    rx.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+    received: typing.List[TimestampedDataFrame] = []
+    tx.start(lambda _: None, False)
+    rx.start(received.extend, False)
+
+    def make(index: int) -> DataFrame:
+        return DataFrame(identifier=0xbadc0fe, data=bytearray([index]), format=FrameFormat.EXTENDED, loopback=False)
+
+    async def wait_received(count: int) -> None:
+        for _ in range(100):
+            if len(received) >= count:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)    # Ensure there is nothing extra.
+        assert len(received) == count
+
+    # The deadline is already in the past, so nothing is sent.
+    assert 0 == await tx.send_until([make(0), make(1)], loop.time() - 0.001)
+    assert 0 == await tx.send_until([make(0), make(1)], loop.time())
+    await wait_received(0)
+
+    # Simulate a full socket buffer: the fast path sends at most one frame per invocation, so that
+    # the remaining frames are sent through the fallback path that awaits the socket.
+    original_send_while_possible = tx._send_while_possible
+    num_fast_path_invocations = 0
+
+    def send_while_possible(frames: typing.Sequence[DataFrame], buffer: bytearray, index: int) -> int:
+        nonlocal num_fast_path_invocations
+        num_fast_path_invocations += 1
+        return original_send_while_possible(frames[:index + 1], buffer, index)
+
+    tx._send_while_possible = send_while_possible   # type: ignore
+    assert 5 == await tx.send_until([make(i) for i in range(5)], loop.time() + 1.0)
+    assert num_fast_path_invocations == 3
+    await wait_received(5)
+    assert [f.data[0] for f in received] == list(range(5))
+
+    tx.close()
+    rx.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
@@ -0,0 +1,265 @@
+#
+# Copyright (c) 2019 UAVCAN Development Team
+# This software is distributed under the terms of the MIT License.
+# Author: Pavel Kirienko <pavel.kirienko@zubax.com>
+#
+
+import time
+import typing
+import asyncio
+import pytest
+import pyuavcan.transport
+from pyuavcan.transport import can
+from pyuavcan.transport.can.media import DataFrame, FrameFormat, FilterConfiguration
+from pyuavcan.transport.can.media.virtual import VirtualBus, VirtualMedia
+from .mock import FrameCollector
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_virtual_media() -> None:
+    loop = asyncio.get_event_loop()
+    bus = VirtualBus('vbus')
+    assert bus.bit_rate is None
+    assert bus.loss_probability == 0
+
+    a = VirtualMedia(bus, 64)
+    b = VirtualMedia(bus, 8, 2)
+    c = VirtualMedia(bus, 8)
+    assert a.bus is b.bus is bus
+    assert a.loop is loop
+    assert a.interface_name == 'vbus'
+    assert a.mtu == 64 and b.mtu == 8
+    assert b.number_of_acceptance_filters == 2
+    assert list(VirtualMedia.list_available_interface_names()) == []
+    assert 'vbus' in repr(bus)
+
+    with pytest.raises(ValueError):
+        VirtualMedia(bus, 7)
+    with pytest.raises(ValueError):
+        VirtualMedia(bus, 8, 0)
+    with pytest.raises(ValueError):
+        VirtualBus(bit_rate=0)
+    with pytest.raises(ValueError):
+        VirtualBus(loss_probability=1)
+
+    rx_a, rx_b, rx_c = FrameCollector(), FrameCollector(), FrameCollector()
+    a.start(rx_a.give, False)
+    b.start(rx_b.give, False)
+    c.start(rx_c.give, True)
+    with pytest.raises(RuntimeError):
+        c.start(rx_c.give, True)
+
+    # All frames are rejected by default.
+    assert 1 == await a.send_until([DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=True)],
+                                   loop.time() + 1.0)
+    await asyncio.sleep(0.01)
+    assert rx_a.empty and rx_b.empty and rx_c.empty
+    assert bus.frames_transmitted == 1
+
+    a.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+    b.configure_acceptance_filters([FilterConfiguration(123, 2 ** 29 - 1, FrameFormat.EXTENDED),
+                                    FilterConfiguration(456, 2 ** 11 - 1, FrameFormat.BASE)])
+    c.configure_acceptance_filters([FilterConfiguration(123, 2 ** 11 - 1, None)])
+    with pytest.raises(ValueError):
+        b.configure_acceptance_filters([FilterConfiguration.new_promiscuous()] * 3)
+
+    data = bytearray(b'abc')
+    assert 2 == await b.send_until([DataFrame(123, data, FrameFormat.EXTENDED, loopback=True),
+                                    DataFrame(123, bytearray(b'def'), FrameFormat.EXTENDED, loopback=False)],
+                                   loop.time() + 1.0)
+    assert 1 == await c.send_until([DataFrame(456, bytearray(b'ghi'), FrameFormat.BASE, loopback=False)],
+                                   loop.time() + 1.0)
+    await asyncio.sleep(0.01)
+
+    # The data is shared by all receivers without copying.
+    fa = rx_a.pop()
+    fc = rx_c.pop()
+    assert fa is fc
+    assert fa.data is data
+    assert not fa.loopback
+    assert rx_a.pop().data == b'def'
+    assert rx_a.pop().is_same_manifestation(DataFrame(456, bytearray(b'ghi'), FrameFormat.BASE, loopback=False))
+    assert rx_a.empty
+    assert rx_c.pop().data == b'def'
+    assert rx_c.empty
+
+    lb = rx_b.pop()     # The loopback is subject to acceptance filtering, too.
+    assert lb.loopback and lb.data is data
+    assert rx_b.pop().is_same_manifestation(DataFrame(456, bytearray(b'ghi'), FrameFormat.BASE, loopback=False))
+    assert rx_b.empty
+
+    with pytest.raises(ValueError):
+        await b.send_until([DataFrame(123, bytearray(12), FrameFormat.EXTENDED, loopback=False)], loop.time() + 1.0)
+
+    c.close()
+    c.close()   # Idempotency.
+    assert c.closed
+    with pytest.raises(pyuavcan.transport.ResourceClosedError):
+        await c.send_until([DataFrame(123, bytearray(b'abc'), FrameFormat.EXTENDED, loopback=False)],
+                           loop.time() + 1.0)
+    with pytest.raises(pyuavcan.transport.ResourceClosedError):
+        c.configure_acceptance_filters([])
+    with pytest.raises(pyuavcan.transport.ResourceClosedError):
+        c.start(rx_c.give, False)
+
+    await b.send_until([DataFrame(123, bytearray(b'jkl'), FrameFormat.EXTENDED, loopback=False)], loop.time() + 1.0)
+    await asyncio.sleep(0.01)
+    assert rx_a.pop().data == b'jkl'
+    assert rx_c.empty
+
+    a.close()
+    b.close()
+
+
+# noinspection PyProtectedMember
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_virtual_media_arbitration() -> None:
+    loop = asyncio.get_event_loop()
+    bus = VirtualBus(bit_rate=100_000)
+    assert bus.bit_rate == 100_000
+    a, b, c, d = VirtualMedia(bus, 8), VirtualMedia(bus, 8), VirtualMedia(bus, 8), VirtualMedia(bus, 8)
+    rx = FrameCollector()
+    d.start(rx.give, False)
+    d.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+
+    def make(identifier: int, index: int, fmt: FrameFormat = FrameFormat.EXTENDED) -> DataFrame:
+        return DataFrame(identifier, bytearray([index] * 8), fmt, loopback=False)
+
+    # A long low-priority transmission takes the idle bus; then higher-priority frames arrive and they preempt it
+    # after the frame that is currently on the bus, in the order of arbitration.
+    # Base frame 0x001 vs extended frame 0x001 << 18: equal arbitration fields, but the base frame wins.
+    # A low bit rate is used here to ensure that the event loop latency does not affect the outcome.
+    slow_bus = VirtualBus(bit_rate=10_000)
+    sa, sb, sc, sd = VirtualMedia(slow_bus, 8), VirtualMedia(slow_bus, 8), VirtualMedia(slow_bus, 8), \
+        VirtualMedia(slow_bus, 8)
+    sd.start(rx.give, False)
+    sd.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+    started_at = time.monotonic()
+    low = loop.create_task(sa.send_until([make(0x1000000, i) for i in range(4)], loop.time() + 1.0))
+    while slow_bus._in_flight is None:
+        await asyncio.sleep(0)
+    high = [
+        loop.create_task(sb.send_until([make(0x1 << 18, 10)], loop.time() + 1.0)),
+        loop.create_task(sc.send_until([make(0x1, 20, FrameFormat.BASE)], loop.time() + 1.0)),
+    ]
+    assert await low == 4
+    assert all(x == 1 for x in await asyncio.gather(*high))
+    elapsed = time.monotonic() - started_at
+    await asyncio.sleep(0.01)
+
+    received = []
+    while not rx.empty:
+        received.append(rx.pop().data[0])
+    assert received == [0, 20, 10, 1, 2, 3]
+
+    # Five extended frames and one base frame of 8 bytes at 10 kbit/s take about 77 milliseconds.
+    # noinspection PyProtectedMember
+    from pyuavcan.transport.can.media.virtual._virtual import _FRAME_OVERHEAD_BITS
+    assert elapsed >= (5 * (_FRAME_OVERHEAD_BITS[FrameFormat.EXTENDED] + 64)
+                       + 1 * (_FRAME_OVERHEAD_BITS[FrameFormat.BASE] + 64)) / 10_000
+    for m in (sa, sb, sc, sd):
+        m.close()
+
+    # The frames that could not win the arbitration before the deadline are discarded.
+    blocker = loop.create_task(a.send_until([make(0x10, i) for i in range(20)], loop.time() + 1.0))
+    await asyncio.sleep(0)
+    assert 0 < await b.send_until([make(0x20, i) for i in range(100)], loop.time() + 0.03) < 100
+    assert await blocker == 20
+
+    # Closing cancels the pending transmissions.
+    blocker = loop.create_task(a.send_until([make(0x10, i) for i in range(100)], loop.time() + 1.0))
+    await asyncio.sleep(0.01)
+    a.close()
+    assert 0 < await blocker < 100
+
+    for m in (b, c, d):
+        m.close()
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_virtual_media_loss() -> None:
+    loop = asyncio.get_event_loop()
+    bus = VirtualBus(loss_probability=0.3, seed=42)
+    a, b = VirtualMedia(bus, 8), VirtualMedia(bus, 8)
+    rx_a, rx_b = FrameCollector(), FrameCollector()
+    a.start(rx_a.give, False)
+    b.start(rx_b.give, False)
+    for m in (a, b):
+        m.configure_acceptance_filters([FilterConfiguration.new_promiscuous()])
+
+    frames = [DataFrame(123, bytearray([i % 256]), FrameFormat.EXTENDED, loopback=True) for i in range(1000)]
+    assert 1000 == await a.send_until(frames, loop.time() + 1.0)
+    await asyncio.sleep(0.01)
+    assert bus.frames_transmitted == 1000
+    assert 200 < bus.frames_lost < 400
+
+    num_received = 0
+    while not rx_b.empty:
+        rx_b.pop()
+        num_received += 1
+    assert num_received == 1000 - bus.frames_lost
+
+    num_loopback = 0    # The sender does not know about the loss.
+    while not rx_a.empty:
+        assert rx_a.pop().loopback
+        num_loopback += 1
+    assert num_loopback == 1000
+
+    a.close()
+    b.close()
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_can_virtual_media_many_nodes() -> None:
+    """
+    The maximum number of CAN transport instances on one bus; each publishes a message that is received by all others.
+    """
+    from pyuavcan.transport import MessageDataSpecifier, PayloadMetadata, Transfer, Priority, Timestamp
+    from pyuavcan.transport import InputSessionSpecifier, OutputSessionSpecifier
+
+    loop = asyncio.get_event_loop()
+    num_nodes = 127
+    bus = VirtualBus(bit_rate=1_000_000)
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 100)
+    transports = [can.CANTransport(VirtualMedia(bus, 64), node_id) for node_id in range(1, num_nodes + 1)]
+    subscribers = [tr.get_input_session(InputSessionSpecifier(MessageDataSpecifier(1234), None), meta)
+                   for tr in transports]
+    for sub in subscribers:
+        sub.eager_reassembly = True
+    publishers = [tr.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(1234), None), meta)
+                  for tr in transports]
+
+    started_at = time.monotonic()
+    results = await asyncio.gather(*[
+        pub.send_until(Transfer(timestamp=Timestamp.now(),
+                                priority=Priority.NOMINAL,
+                                transfer_id=0,
+                                fragmented_payload=[memoryview(bytes([index]) * 100)]),
+                       loop.time() + 5.0)
+        for index, pub in enumerate(publishers)
+    ])
+    assert all(results)
+    elapsed = time.monotonic() - started_at
+    print(f'{num_nodes} nodes published in {elapsed:.3f} s; frames transmitted: {bus.frames_transmitted}')
+    # Each transfer takes two frames: 63 + 39 bytes of data, about 1.2 milliseconds at 1 Mbit/s.
+    assert bus.frames_transmitted == num_nodes * 2
+    assert elapsed >= num_nodes * 2 * 67 / 1_000_000
+
+    # Receiving every transfer through the API would take long in the debug mode; check the statistics instead.
+    await asyncio.sleep(0.1)
+    for sub in subscribers:
+        assert sub.sample_statistics().transfers == num_nodes - 1
+
+    for sub, node_id in zip(subscribers[:3], range(1, 4)):
+        sources = set()
+        while True:
+            transfer = await sub.receive_until(0)
+            if transfer is None:
+                break
+            assert transfer.fragmented_payload[0][0] + 1 == transfer.source_node_id
+            sources.add(transfer.source_node_id)
+        assert sources == set(range(1, num_nodes + 1)) - {node_id}
+
+    for tr in transports:
+        tr.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
@@ -65,6 +65,10 @@ class MockMedia(_media.Media):
         assert len(configuration) == len(self._acceptance_filters)
         self._acceptance_filters = configuration
 
+    @property
+    def acceptance_filters(self) -> typing.Sequence[_media.FilterConfiguration]:
+        return list(self._acceptance_filters)
+
     @property
     def automatic_retransmission_enabled(self) -> bool:
         return self._automatic_retransmission_enabled
@@ -6,6 +6,7 @@
 
 import typing
 import asyncio
+import threading
 import xml.etree.ElementTree
 import pytest
 import pyuavcan.transport
@@ -233,5 +234,103 @@ async def _unittest_udp_transport() -> None:
     await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
 
 
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_udp_transport_many_subscriptions() -> None:
+    """
+    The number of threads and receive buffer pools does not depend on the number of input sessions;
+    the number of sockets does not depend on the number of output sessions.
+    """
+    from pyuavcan.transport import MessageDataSpecifier, PayloadMetadata, Transfer, TransferFrom, Priority, Timestamp
+    from pyuavcan.transport import InputSessionSpecifier, OutputSessionSpecifier
+
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 100)
+    tr = UDPTransport('127.0.0.111/8')
+    tr2 = UDPTransport('127.0.0.222/8')
+    threads = set(threading.enumerate())
+    subscribers = [tr.get_input_session(InputSessionSpecifier(MessageDataSpecifier(subject_id), None), meta)
+                   for subject_id in range(100, 400)]
+    assert set(threading.enumerate()) <= threads  # Threads left over from other tests may terminate meanwhile.
+
+    publishers = [tr2.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(subject_id), None), meta)
+                  for subject_id in range(100, 400)]
+    assert len({pub.socket for pub in publishers}) == 1   # All output sessions share the same socket.
+    output_socket = publishers[0].socket
+    assert {pub.destination_endpoint for pub in publishers} == {('127.255.255.255', 16384 + x) for x in range(100, 400)}
+    for pub in publishers:
+        assert await pub.send_until(Transfer(timestamp=Timestamp.now(),
+                                             priority=Priority.NOMINAL,
+                                             transfer_id=0,
+                                             fragmented_payload=[_mem('Hello')]),
+                                    tr.loop.time() + 1.0)
+    for sub in subscribers:
+        rx = await sub.receive_until(tr.loop.time() + 1.0)
+        assert isinstance(rx, TransferFrom)
+        assert rx.source_node_id == 222
+        assert b''.join(rx.fragmented_payload) == b'Hello'
+
+    # All demultiplexers receive into the same buffer pool, which is dropped together with the last input session.
+    # noinspection PyProtectedMember
+    pool = tr._maybe_rx_buffer_pool
+    assert pool is not None
+    # noinspection PyProtectedMember
+    assert all(demux._buffer_pool is pool for demux in tr._demultiplexer_registry.values())
+    assert pool.slabs_allocated == 1
+    for sub in subscribers:
+        sub.close()
+    # noinspection PyProtectedMember
+    assert tr._maybe_rx_buffer_pool is None
+
+    # The shared socket is closed together with the last output session.
+    for pub in publishers[1:]:
+        pub.close()
+    assert output_socket.fileno() >= 0
+    publishers[0].close()
+    assert output_socket.fileno() < 0
+
+    tr.close()
+    tr2.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
+@pytest.mark.asyncio    # type: ignore
+async def _unittest_udp_transport_multicast() -> None:
+    """
+    In the multicast mode, message transfers are delivered only to the nodes that are subscribed to the subject.
+    """
+    from pyuavcan.transport import MessageDataSpecifier, ServiceDataSpecifier, PayloadMetadata, Transfer, Priority
+    from pyuavcan.transport import Timestamp, InputSessionSpecifier, OutputSessionSpecifier, TransferFrom
+
+    meta = PayloadMetadata(0x_bad_c0ffee_0dd_f00d, 100)
+    tr = UDPTransport('127.0.0.111/8', multicast=True)
+    tr2 = UDPTransport('127.0.0.222/8', multicast=True)
+    sub = tr.get_input_session(InputSessionSpecifier(MessageDataSpecifier(2345), None), meta)
+    pub_a = tr2.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(2345), None), meta)
+    pub_b = tr2.get_output_session(OutputSessionSpecifier(MessageDataSpecifier(2346), None), meta)
+    assert pub_a.destination_endpoint == ('239.0.9.41', 16384 + 2345)
+    assert pub_b.destination_endpoint == ('239.0.9.42', 16384 + 2346)
+    server = tr.get_input_session(
+        InputSessionSpecifier(ServiceDataSpecifier(333, ServiceDataSpecifier.Role.REQUEST), None), meta)
+    client = tr2.get_output_session(
+        OutputSessionSpecifier(ServiceDataSpecifier(333, ServiceDataSpecifier.Role.REQUEST), 111), meta)
+    assert client.destination_endpoint[0] == '127.0.0.111'     # Service transfers are unicast.
+
+    for index, pub in enumerate([pub_a, pub_b, client]):
+        assert await pub.send_until(Transfer(timestamp=Timestamp.now(),
+                                             priority=Priority.NOMINAL,
+                                             transfer_id=index,
+                                             fragmented_payload=[_mem(f'Hello {index}')]),
+                                    tr.loop.time() + 1.0)
+    for listener, index in [(sub, 0), (server, 2)]:
+        rx = await listener.receive_until(tr.loop.time() + 1.0)
+        assert isinstance(rx, TransferFrom)
+        assert rx.source_node_id == 222
+        assert b''.join(rx.fragmented_payload) == f'Hello {index}'.encode()
+    assert await sub.receive_until(tr.loop.time() + 0.1) is None
+
+    tr.close()
+    tr2.close()
+    await asyncio.sleep(1)  # Let all pending tasks finalize properly to avoid stack traces in the output.
+
+
 def _mem(data: typing.Union[str, bytes, bytearray]) -> memoryview:
     return memoryview(data.encode() if isinstance(data, str) else data)